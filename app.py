@@ -1,71 +1,617 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from flask_sqlalchemy import SQLAlchemy
+from flask import (Blueprint, Flask, Response, current_app, render_template, request, jsonify,
+                   send_from_directory, stream_with_context)
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 import os
 import json
-from datetime import datetime
+import heapq
+import hashlib
+import math
+import numbers
+import base64
+import zipfile
+import threading
+import contextlib
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-import openpyxl
-import pandas as pd
-from models import db, Match, Player, PlayerMatch
+# pandas、openpyxl 导入较慢，只在解析Excel的函数中导入
+import numpy as np
+from models import db, Match, Player, PlayerMatch, MatchTeamStats, PlayerStats, PlayerPairStats, RatingHistory, DataVersion, IngestJob, ParseCache, match_result, sample_stddev
+from jobs import IngestWorkers, enqueue_job, pending_job_count, start_ingest_workers, update_job_progress
+from migrations import LATEST_VERSION, database_version, run_migrations
+from columnar import SnapshotCache, py_round
+from rating import rate_new_matches, replay_ratings_from
+from export import EXPORT_FORMATS, EXPORT_TABLES, check_export_format, stream_export
+from sqlite_tuning import SQLITE_ENGINE_OPTIONS, SQLITE_PRAGMAS, configure_sqlite, engine_options_for
+from metrics import (PROMETHEUS_MIMETYPE, collect_ingest_stages, finish_request, ingest_stage, instrument_engine,
+                     record_ingest_stages, render_metrics, start_request)
+from serialization import (FastJSONProvider, compress_response, encode_json, encode_msgpack, msgpack,
+                           MSGPACK_MIMETYPE, negotiate_encoding, set_encoded_body, sql_date_text, wants_msgpack)
 
-app = Flask(__name__)
-import os
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'cs2_tournament.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# 默认配置，可用 CS2_ 前缀的环境变量覆盖（如 CS2_UPLOAD_FOLDER=/data/uploads、CS2_SLOW_REQUEST_MS=500，
+# 值按JSON解析，不是合法JSON时作为字符串）
+DEFAULT_CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'cs2_tournament.db'),
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'SQLALCHEMY_ENGINE_OPTIONS': SQLITE_ENGINE_OPTIONS,
+    'SQLITE_PRAGMAS': SQLITE_PRAGMAS,  # 每个数据库连接建立时设置（WAL等）
+    'UPLOAD_FOLDER': 'uploads',
+    'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB max file size
+    'BULK_PARSE_WORKERS': os.cpu_count() or 1,  # 批量上传解析进程数
+    'BULK_MAX_FILES': 200,  # 单次批量上传最多文件数
+    'BULK_MAX_EXTRACT_SIZE': 256 * 1024 * 1024,  # 单次批量上传ZIP解压后的总大小上限
+    'INGEST_WORKERS': 2,  # 每个进程的后台解析线程数，0不启动（如只执行建表和迁移时）
+    'INGEST_HEARTBEAT_SECONDS': 10,  # 处理中任务的心跳间隔
+    'INGEST_STALE_SECONDS': 120,  # 心跳超过该时间未更新的处理中任务重新排队
+    'INGEST_MAX_ATTEMPTS': 3,  # 任务最多处理次数，每次都因进程退出而中断的任务不再重新排队
+    'INGEST_QUEUE_MAX': 50,  # 排队+处理中任务上限，超过返回429
+    'DUPLICATE_UPLOAD_POLICY': 'reject',  # 重复上传同一文件：reject返回409，link关联已有比赛
+    'SLOW_REQUEST_MS': None,  # 超过该耗时（毫秒）的请求连同SQL明细写入日志，None不记录
+}
+
+bp = Blueprint('tracker', __name__)
+
+def create_app(config=None):
+    """创建应用：默认配置，依次被 CS2_ 前缀的环境变量和 config 参数覆盖
+    
+    不创建数据库表，建表和迁移由 init_database 单独执行；不启动后台解析线程，
+    服务入口（wsgi.py、python app.py）另外调用 start_background_workers，命令行脚本不处理上传任务。
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    app.config.from_prefixed_env('CS2')
+    if config:
+        app.config.from_mapping(config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'],
+                                                                 app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    
+    # 确保上传目录存在
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    db.init_app(app)
+    # 缓存按应用保存，多个应用（不同数据库）的数据版本号相同时也不会互相串用
+    app.extensions['response_cache'] = ResponseCache()
+    app.extensions['snapshot_cache'] = SnapshotCache()
+    app.extensions['ingest_workers'] = IngestWorkers()
+    with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        instrument_engine(db.engine)
+    
+    app.before_request(start_request_metrics)
+    # after_request 按注册的相反顺序执行，先注册的指标记录在压缩之后执行，耗时包含压缩
+    app.after_request(record_request_metrics)
+    app.after_request(compress_api_response)
+    app.register_blueprint(bp)
+    return app
+
+def init_database(app):
+    """创建数据库表并执行迁移，返回迁移后的数据库版本（部署或升级时执行）"""
+    with app.app_context():
+        db.create_all()
+        version = run_migrations(db.engine)
+        # 多个进程同时执行时只会插入一次
+        db.session.execute(sqlite_insert(DataVersion).values(id=1, version=0).on_conflict_do_nothing())
+        db.session.commit()
+        # 旧数据库没有累计统计表数据时，从比赛记录回填一次
+        if PlayerStats.query.first() is None and PlayerMatch.query.first() is not None:
+            rebuild_player_stats()
+            bump_data_version()
+            db.session.commit()
+    return version
+
+def start_background_workers(app):
+    """启动应用的后台解析线程（服务进程启动时调用），立即开始处理排队中的任务（包括重启前未完成的任务）
+    
+    INGEST_WORKERS 为0或已启动时不启动；数据库未迁移到最新版本时不启动，避免后台线程反复报错。
+    """
+    with app.app_context():
+        migrated = database_version(db.engine) >= LATEST_VERSION
+    if not migrated:
+        app.logger.warning('数据库未迁移到最新版本，未启动后台解析线程，请先运行 python init_db.py')
+        return
+    start_ingest_workers(app, process_ingest_job, app.config['INGEST_WORKERS'],
+                         heartbeat_interval=app.config['INGEST_HEARTBEAT_SECONDS'],
+                         stale_seconds=app.config['INGEST_STALE_SECONDS'],
+                         max_attempts=app.config['INGEST_MAX_ATTEMPTS'])
+
+def start_request_metrics():
+    """开始记录本次请求的耗时和SQL语句"""
+    start_request()
+
+def record_request_metrics(response):
+    """记录请求耗时和SQL统计，慢请求写入日志"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    report = finish_request(request.method, route, response.status_code, current_app.config['SLOW_REQUEST_MS'])
+    if report:
+        current_app.logger.warning(report)
+    return response
+
+def compress_api_response(response):
+    """按 Accept-Encoding 压缩响应"""
+    return compress_response(response, request.accept_encodings)
+
+def get_player_stats(player_id):
+    """获取选手累计统计记录，不存在时创建"""
+    stats = db.session.get(PlayerStats, player_id)
+    if stats is None:
+        stats = PlayerStats(player_id=player_id)
+        db.session.add(stats)
+    return stats
+
+# SQLite单条语句的参数个数有限，IN查询按批执行
+SQL_IN_BATCH_SIZE = 500
+
+def batched(items, size=SQL_IN_BATCH_SIZE):
+    """将列表按固定大小分批"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def resolve_player_ids(names):
+    """批量获取选手ID，不存在的选手一次性创建，返回 {选手名: ID}"""
+    names = list(dict.fromkeys(names))
+    player_ids = {}
+    for batch in batched(names):
+        player_ids.update(db.session.query(Player.name, Player.id).filter(Player.name.in_(batch)).all())
+    
+    missing = [name for name in names if name not in player_ids]
+    if missing:
+        # 并发上传可能同时创建同名选手，冲突时忽略后重新查询
+        now = datetime.utcnow()
+        db.session.execute(
+            sqlite_insert(Player).on_conflict_do_nothing(index_elements=['name']),
+            [{'name': name, 'created_at': now} for name in missing]
+        )
+        for batch in batched(missing):
+            player_ids.update(db.session.query(Player.name, Player.id).filter(Player.name.in_(batch)).all())
+    
+    return player_ids
+
+@ingest_stage('db_write')
+def save_matches(uploads):
+    """批量写入比赛：uploads为 [(解析结果, 文件路径, 内容哈希)]，同步更新选手累计统计（不提交事务）"""
+    matches = []
+    for parsed_data, file_path, content_hash in uploads:
+        # 提取队伍信息
+        team_data = parsed_data['team_data']
+        team_a_info = team_data.get('A', {})
+        team_b_info = team_data.get('B', {})
+        
+        matches.append(Match(
+            name=parsed_data['match_info']['name'],
+            map=parsed_data['match_info']['map'],
+            date=datetime.now(),
+            file_path=file_path,
+            content_hash=content_hash,
+            team_a_name=team_a_info.get('name', '队伍A'),
+            team_b_name=team_b_info.get('name', '队伍B'),
+            team_a_score=int(team_a_info.get('score', 0)) if team_a_info.get('score', '').isdigit() else 0,
+            team_b_score=int(team_b_info.get('score', 0)) if team_b_info.get('score', '').isdigit() else 0
+        ))
+    db.session.add_all(matches)
+    db.session.flush()  # 获取match.id
+    
+    player_ids = resolve_player_ids([
+        player_data['name']
+        for parsed_data, _, _ in uploads
+        for team_data in parsed_data['team_data'].values()
+        for player_data in team_data['players']
+    ])
+    
+    # 选手比赛记录
+    rows = []
+    for match, (parsed_data, _, _) in zip(matches, uploads):
+        for team_key, team_data in parsed_data['team_data'].items():
+            for player_data in team_data['players']:
+                rows.append({
+                    'player_id': player_ids[player_data['name']],
+                    'match_id': match.id,
+                    'team': team_key,
+                    'result': match_result(team_key, match.team_a_score, match.team_b_score),
+                    'kills': player_data.get('kills', 0),
+                    'deaths': player_data.get('deaths', 0),
+                    'assists': player_data.get('assists', 0),
+                    'headshots': player_data.get('headshots', 0),
+                    'first_kills': player_data.get('first_kills', 0),
+                    'rws': player_data.get('rws', 0.0),
+                    'rating': player_data.get('rating', 0.0),
+                    'rating_plus': player_data.get('rating_plus', 0.0),
+                    'adr': player_data.get('adr', 0.0),
+                    'headshot_rate': player_data.get('headshot_rate', 0.0),
+                    'kast': player_data.get('kast', 0.0),
+                    'sniper_kills': player_data.get('sniper_kills', 0),
+                    'first_deaths': player_data.get('first_deaths', 0),
+                    'created_at': datetime.utcnow()
+                })
+    if not rows:
+        return matches
+    db.session.execute(PlayerMatch.__table__.insert(), rows)
+    
+    # 每场比赛每支队伍的汇总数据
+    team_members = {}
+    for row in rows:
+        team_members.setdefault((row['match_id'], row['team']), []).append(row)
+    team_stats = {}
+    for (match_id, team), members in team_members.items():
+        player_count = len(members)
+        team_stats[(match_id, team)] = MatchTeamStats(
+            match_id=match_id,
+            team=team,
+            player_count=player_count,
+            avg_rating_plus=sum(member['rating_plus'] or 0 for member in members) / player_count,
+            avg_adr=sum(member['adr'] or 0 for member in members) / player_count,
+            avg_kast=sum(member['kast'] or 0 for member in members) / player_count,
+            total_kills=sum(member['kills'] or 0 for member in members)
+        )
+    db.session.add_all(team_stats.values())
+    
+    # 同一事务内累加选手统计（一次查询取出所有涉及选手的累计记录）
+    stats_by_player = {}
+    affected_ids = list(dict.fromkeys(row['player_id'] for row in rows))
+    for batch in batched(affected_ids):
+        stats_by_player.update(
+            (stats.player_id, stats)
+            for stats in PlayerStats.query.filter(PlayerStats.player_id.in_(batch)).all()
+        )
+    for row in rows:
+        stats = stats_by_player.get(row['player_id'])
+        if stats is None:
+            stats = stats_by_player[row['player_id']] = PlayerStats(player_id=row['player_id'])
+            db.session.add(stats)
+        stats.accumulate(PlayerMatch(**row), team_stats[(row['match_id'], row['team'])])
+    
+    # 选手两两之间的队友/对手累计数据
+    update_pair_stats(team_members_by_match(rows))
+    
+    # 按比赛日期顺序计算Elo分
+    rate_new_matches(matches)
+    
+    return matches
+
+def team_members_by_match(rows):
+    """将选手比赛记录按比赛分组，返回 [[记录, ...], ...]"""
+    members = {}
+    for row in rows:
+        members.setdefault(row['match_id'], []).append(row)
+    return list(members.values())
+
+# 选手配对累计值的列，顺序与 PlayerPairStats.match_pairs 的返回值一致
+PAIR_TOTAL_FIELDS = ('matches', 'wins', 'total_rating_plus', 'total_other_rating_plus')
+
+def update_pair_stats(match_members, sign=1):
+    """将比赛的选手配对数据累加（sign=1）或扣除（sign=-1）到配对统计表（不提交事务）"""
+    deltas = {}
+    for members in match_members:
+        for key, values in PlayerPairStats.match_pairs(members).items():
+            totals = deltas.setdefault(key, [0, 0, 0.0, 0.0])
+            for position, value in enumerate(values):
+                totals[position] += value
+    if not deltas:
+        return
+    
+    # 一条upsert语句批量执行：不存在的配对插入，已存在的在原值上累加
+    table = PlayerPairStats.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['player_id', 'relation', 'other_player_id'],
+        set_={field: table.c[field] + statement.excluded[field] for field in PAIR_TOTAL_FIELDS}
+    )
+    db.session.execute(statement, [
+        {
+            'player_id': player_id,
+            'relation': relation,
+            'other_player_id': other_player_id,
+            **{field: sign * value for field, value in zip(PAIR_TOTAL_FIELDS, totals)}
+        }
+        for (player_id, relation, other_player_id), totals in deltas.items()
+    ])
+    
+    if sign < 0:
+        # 不再同场的配对直接删除
+        player_ids = list({player_id for player_id, _, _ in deltas})
+        for batch in batched(player_ids):
+            PlayerPairStats.query.filter(PlayerPairStats.player_id.in_(batch),
+                                         PlayerPairStats.matches <= 0) \
+                .delete(synchronize_session=False)
+
+def save_match(parsed_data, file_path, content_hash=None):
+    """将解析结果写入数据库并同步更新选手累计统计（不提交事务）"""
+    return save_matches([(parsed_data, file_path, content_hash)])[0]
+
+def player_aggregate_query(*criteria):
+    """按选手分组汇总比赛记录的SQL查询（联表获取选手姓名和比赛信息），列名与PlayerStats一致"""
+    columns = [
+        PlayerMatch.player_id,
+        Player.name.label('name'),
+        func.count(PlayerMatch.id).label('total_matches')
+    ]
+    for total_field, match_field in PlayerStats.ACCUMULATED_FIELDS:
+        columns.append(func.coalesce(func.sum(getattr(PlayerMatch, match_field)), 0).label(total_field))
+    
+    # 败场累计
+    is_loss = PlayerMatch.result == 'L'
+    columns.append(func.coalesce(func.sum(case((is_loss, 1), else_=0)), 0).label('total_loss_matches'))
+    columns.append(func.coalesce(func.sum(case((is_loss, PlayerMatch.rating_plus), else_=0.0)), 0.0)
+                   .label('total_loss_rating_plus'))
+    
+    # 胜场中与本队平均Rating+的差值
+    is_win = and_(PlayerMatch.result == 'W', MatchTeamStats.match_id.isnot(None))
+    columns.append(func.coalesce(func.sum(case((is_win, 1), else_=0)), 0).label('total_win_matches'))
+    columns.append(func.coalesce(func.sum(case((is_win, func.coalesce(PlayerMatch.rating_plus, 0)
+                                                - MatchTeamStats.avg_rating_plus), else_=0.0)), 0.0)
+                   .label('total_win_rating_plus_diff'))
+    
+    # 单场数据的离差平方和（按平方和计算，用于筛选后的标准差）
+    for field in PlayerStats.VARIANCE_FIELDS:
+        value = func.coalesce(getattr(PlayerMatch, field), 0.0)
+        columns.append((func.sum(value * value) - func.sum(value) * func.sum(value) / func.count(PlayerMatch.id))
+                       .label(f'm2_{field}'))
+    
+    return db.session.query(*columns) \
+        .join(Player, Player.id == PlayerMatch.player_id) \
+        .join(Match, Match.id == PlayerMatch.match_id) \
+        .outerjoin(MatchTeamStats, and_(MatchTeamStats.match_id == PlayerMatch.match_id,
+                                        MatchTeamStats.team == PlayerMatch.team)) \
+        .filter(*criteria) \
+        .group_by(PlayerMatch.player_id, Player.name)
 
-# 确保上传目录存在
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs('static', exist_ok=True)
-os.makedirs('templates', exist_ok=True)
+def copy_aggregate_row(stats, row):
+    """将分组汇总结果写入累计统计记录"""
+    stats.total_matches = row.total_matches
+    for total_field, _ in PlayerStats.ACCUMULATED_FIELDS:
+        setattr(stats, total_field, getattr(row, total_field))
+    stats.total_loss_matches = row.total_loss_matches
+    stats.total_loss_rating_plus = row.total_loss_rating_plus
+    stats.total_win_matches = row.total_win_matches
+    stats.total_win_rating_plus_diff = row.total_win_rating_plus_diff
 
-# 初始化数据库
-db.init_app(app)
+def remove_match_stats(match_id):
+    """从选手累计统计中移除指定比赛的数据（不提交事务）"""
+    removed = db.session.query(PlayerMatch.player_id, PlayerMatch.team, PlayerMatch.result,
+                               *[getattr(PlayerMatch, field) for field in PlayerStats.VARIANCE_FIELDS]) \
+        .filter_by(match_id=match_id).all()
+    if not removed:
+        return
+    player_ids = [row.player_id for row in removed]
+    
+    update_pair_stats([[dict(row._mapping) for row in removed]], sign=-1)
+    
+    # 均值/离差平方和按Welford逆运算移除该场数据（需在更新场次之前）
+    for row in removed:
+        stats = get_player_stats(row.player_id)
+        stats.remove_variance_sample(stats.total_matches, row)
+    
+    # 一次分组查询重算受影响选手的剩余记录
+    remaining = {
+        row.player_id: row
+        for row in player_aggregate_query(PlayerMatch.player_id.in_(player_ids),
+                                          PlayerMatch.match_id != match_id).all()
+    }
+    
+    for player_id in player_ids:
+        if player_id not in remaining:
+            # 没有剩余比赛的选手不再出现在统计中
+            stats = db.session.get(PlayerStats, player_id)
+            if stats is not None:
+                db.session.delete(stats)
+            continue
+        copy_aggregate_row(get_player_stats(player_id), remaining[player_id])
+
+def rebuild_player_stats():
+    """根据全部选手比赛记录重建累计统计表（不提交事务）"""
+    PlayerStats.query.delete()
+    all_stats = {}
+    for row in player_aggregate_query().all():
+        stats = all_stats[row.player_id] = PlayerStats(player_id=row.player_id)
+        copy_aggregate_row(stats, row)
+        db.session.add(stats)
+    
+    # 按记录顺序逐条计算均值/离差平方和
+    counts = dict.fromkeys(all_stats, 0)
+    rows = db.session.query(PlayerMatch.player_id, *[getattr(PlayerMatch, field) for field in PlayerStats.VARIANCE_FIELDS]) \
+        .order_by(PlayerMatch.id)
+    for row in rows.yield_per(1000):
+        counts[row.player_id] += 1
+        all_stats[row.player_id].add_variance_sample(counts[row.player_id], row)
+    
+    # Elo分按比赛顺序全部重算
+    replay_ratings_from()
+
+RESPONSE_CACHE_MAX_ENTRIES = 256
+
+class ResponseCache:
+    """响应缓存：{缓存键: (数据版本, 数据, {(格式, 压缩方式): 响应体})}，按最近使用淘汰
+    
+    保存在 app.extensions 中，每个应用（数据库）、每个进程各自一份。
+    """
+    
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+def current_data_version():
+    """读取当前数据版本号"""
+    version = db.session.query(DataVersion.version).filter_by(id=1).scalar()
+    return version or 0
 
-# 创建数据库表
-with app.app_context():
-    db.create_all()
+def bump_data_version(deleted=False):
+    """递增数据版本号，使所有进程的响应缓存失效（不提交事务）
+    
+    删除比赛时同时递增删除次数，列式快照据此判断能否只追加新记录。
+    """
+    values = {'version': DataVersion.version + 1}
+    if deleted:
+        values['deletions'] = DataVersion.deletions + 1
+    db.session.execute(update(DataVersion).where(DataVersion.id == 1).values(**values))
+
+def cached_json_response(cache_key, compute, allow_msgpack=False):
+    """按数据版本缓存JSON响应，并通过ETag支持304 Not Modified
+    
+    allow_msgpack为True时客户端可以请求MessagePack格式。编码和压缩后的响应体按格式/压缩方式分别缓存。
+    """
+    representation = 'msgpack' if allow_msgpack and wants_msgpack(request) else 'json'
+    if representation == 'msgpack' and msgpack is None:
+        return jsonify({'error': '服务器未安装msgpack，不支持MessagePack格式'}), 406
+    encoding = negotiate_encoding(request.accept_encodings)
+    
+    version = current_data_version()
+    # 不同格式/压缩方式的响应体不同，ETag也要区分
+    etag = '-'.join([cache_key, str(version)] + [part for part in (representation, encoding) if part != 'json' and part])
+    
+    # 客户端已有最新数据，直接返回304，不做任何计算
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        cache = current_app.extensions['response_cache']
+        with cache.lock:
+            cached = cache.entries.get(cache_key)
+            if cached is not None:
+                cache.entries.move_to_end(cache_key)
+        if cached is None or cached[0] != version:
+            cached = (version, compute(), {})
+            with cache.lock:
+                cache.entries[cache_key] = cached
+                cache.entries.move_to_end(cache_key)
+                # 不同筛选条件各占一个缓存项，超出上限时淘汰最久未使用的
+                while len(cache.entries) > RESPONSE_CACHE_MAX_ENTRIES:
+                    cache.entries.popitem(last=False)
+        
+        _, data, bodies = cached
+        response = current_app.response_class(mimetype=MSGPACK_MIMETYPE if representation == 'msgpack' else 'application/json')
+        body = bodies.get((representation, encoding))
+        if body is None:
+            body = encode_msgpack(data) if representation == 'msgpack' else encode_json(data)
+            set_encoded_body(response, body, encoding)
+            bodies[(representation, encoding)] = (response.get_data(), response.headers.get('Content-Encoding'))
+        else:
+            response.set_data(body[0])
+            if body[1]:
+                response.headers['Content-Encoding'] = body[1]
+            response.vary.add('Accept-Encoding')
+    
+    response.set_etag(etag)
+    if allow_msgpack:
+        response.vary.add('Accept')
+    # 要求浏览器每次都带ETag回源校验
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# 垂直布局固定读取的行数（DataFrame第0-17行，即工作表第2-19行）
+VERTICAL_LAYOUT_ROWS = 18
+
 def parse_excel_data(file_path):
     """解析Excel文件数据"""
+    # 优先使用只读流式解析固定布局，布局不符时再走完整的pandas解析
+    try:
+        parsed_data = parse_excel_fast(file_path)
+        if parsed_data is not None:
+            return parsed_data
+        print(f"文件不是标准垂直布局，使用完整解析: {file_path}")
+    except Exception as e:
+        print(f"快速解析失败: {e}，使用完整解析")
+    
+    import openpyxl
+    import pandas as pd
+    
     try:
         # 首先尝试使用pandas直接读取，如果失败则使用openpyxl
         try:
-            data = pd.read_excel(file_path)
+            with ingest_stage('read'):
+                data = pd.read_excel(file_path)
             print(f"使用pandas成功读取文件: {file_path}")
         except Exception as e1:
             print(f"pandas读取失败: {e1}，尝试使用openpyxl")
-            # 使用openpyxl读取
-            workbook = openpyxl.load_workbook(file_path)
-            sheet_name = workbook.sheetnames[0]
-            worksheet = workbook[sheet_name]
-            
-            # 转换为pandas DataFrame
-            data = pd.read_excel(file_path, sheet_name=sheet_name)
+            # 使用openpyxl读取第一个工作表，首行作为列名
+            with ingest_stage('read'):
+                workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+                try:
+                    rows = [list(row) for row in workbook.worksheets[0].iter_rows(values_only=True)]
+                finally:
+                    workbook.close()
+                
+                # 转换为pandas DataFrame
+                data = pd.DataFrame(rows[1:], columns=rows[0] if rows else None)
             print(f"使用openpyxl成功读取文件: {file_path}")
         
         # 解析比赛数据
-        match_info = parse_match_info(data)
-        team_data = parse_team_data_new(data, match_info)
+        with ingest_stage('match_info'):
+            match_info = parse_match_info(data)
+        with ingest_stage('team_parse'):
+            team_data = parse_team_data_new(data, match_info)
         
         return {
             'match_info': match_info,
-            'team_data': team_data,
-            'raw_data': data.to_dict('records')
+            'team_data': team_data
         }
     except Exception as e:
         print(f"解析Excel错误: {e}")
         return None
 
+def normalize_cell(value):
+    """将openpyxl单元格值转换为与pandas读取结果一致的形式"""
+    if value is None:
+        return float('nan')
+    # pandas会把整数值的浮点数转换为int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def read_sheet_rows(file_path, row_count):
+    """以只读流式模式读取第一个工作表首行之后的row_count行，返回等宽的二维列表"""
+    import openpyxl
+    
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        # 第1行是pandas的列名行，从第2行开始与DataFrame行号对应
+        rows = [[normalize_cell(value) for value in row]
+                for row in worksheet.iter_rows(min_row=2, max_row=row_count + 1, values_only=True)]
+    finally:
+        workbook.close()
+    
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([float('nan')] * (width - len(row)))
+    return rows
+
+def is_vertical_layout(rows):
+    """检查是否为标准垂直布局：有两支队伍的行，第3行为包含击杀列的标题行"""
+    if len(rows) < 12 or len(rows[3]) < 2:
+        return False
+    header_row = rows[3]
+    return isinstance(header_row[1], str) and any(isinstance(header, str) and '击杀' in header for header in header_row)
+
+def parse_excel_fast(file_path):
+    """只读流式解析垂直布局Excel，不构建DataFrame；布局不符时返回None"""
+    with ingest_stage('read'):
+        rows = read_sheet_rows(file_path, VERTICAL_LAYOUT_ROWS)
+    if not is_vertical_layout(rows):
+        return None
+    
+    # 固定布局的比赛信息与队伍在同一遍解析中读取
+    match_info = {}
+    with ingest_stage('team_parse'):
+        team_data = parse_vertical_layout(rows, match_info)
+    print(f"使用只读模式快速解析文件: {file_path}")
+    
+    return {
+        'match_info': match_info,
+        'team_data': team_data
+    }
+
 def parse_match_info(data):
     """解析比赛基本信息"""
     match_info = {}
@@ -102,91 +648,181 @@ def parse_match_info(data):
 
 def parse_team_data_new(data, match_info):
     """解析队伍和选手数据 - 针对垂直布局Excel的新解析逻辑"""
-    teams = {}
-    
     try:
-        print("开始解析新格式Excel文件...")
-        
-        # 解析比赛基本信息
-        match_name = str(data.iloc[0, 0]).strip()  # 第0行第0列：比赛名称
-        game_map = str(data.iloc[0, 1]).strip()    # 第0行第1列：地图
-        
-        print(f"比赛名称: {match_name}")
-        print(f"地图: {game_map}")
-        
-        # 解析队伍A信息
-        team_a_name = str(data.iloc[2, 0]).strip()  # 第2行第0列：队伍A
-        team_a_score = str(data.iloc[2, 1]).strip() # 第2行第1列：13
-        
-        # 解析队伍B信息
-        team_b_name = str(data.iloc[11, 0]).strip() # 第11行第0列：队伍B
-        team_b_score = str(data.iloc[11, 1]).strip() # 第11行第1列：7
-        
-        print(f"队伍A: {team_a_name}, 得分: {team_a_score}")
-        print(f"队伍B: {team_b_name}, 得分: {team_b_score}")
-        
-        # 获取列标题（第3行和第12行都是标题行，取第一个）
-        headers = []
-        for col_idx in range(len(data.columns)):
-            header = str(data.iloc[3, col_idx]).strip()
-            headers.append(header)
-        
-        print(f"列标题: {headers}")
-        
-        # 解析队伍A的选手数据（第4-8行）
-        team_a_players = []
-        for row_idx in range(4, 9):  # 第4-8行
-            if row_idx < len(data):
-                player_data = parse_player_from_row(data.iloc[row_idx], headers, f"队伍{team_a_name}")
-                if player_data:
-                    team_a_players.append(player_data)
-                    print(f"队伍A选手: {player_data['name']}")
-        
-        # 解析队伍B的选手数据（第13-17行）
-        team_b_players = []
-        for row_idx in range(13, 18):  # 第13-17行
-            if row_idx < len(data):
-                player_data = parse_player_from_row(data.iloc[row_idx], headers, f"队伍{team_b_name}")
-                if player_data:
-                    team_b_players.append(player_data)
-                    print(f"队伍B选手: {player_data['name']}")
-        
-        # 构建队伍数据
-        if team_a_players:
-            teams['A'] = {
-                'name': team_a_name,
-                'score': team_a_score,
-                'players': team_a_players
-            }
-            
-        if team_b_players:
-            teams['B'] = {
-                'name': team_b_name,
-                'score': team_b_score,
-                'players': team_b_players
-            }
-        
-        print(f"解析完成: 队伍A {len(team_a_players)}人, 队伍B {len(team_b_players)}人")
-        
-        # 更新match_info
-        match_info['name'] = match_name
-        match_info['map'] = game_map
-        
-        return teams
-        
+        return parse_vertical_layout(data.values.tolist(), match_info)
     except Exception as e:
         print(f"新解析逻辑错误: {e}")
         import traceback
         traceback.print_exc()
         return parse_team_data(data, match_info)
 
-def parse_player_from_row(row, headers, team_name):
-    """从单行数据解析选手信息"""
+def parse_vertical_layout(rows, match_info):
+    """按固定行号解析垂直布局的队伍和选手数据，rows为按行排列的单元格列表"""
+    teams = {}
+    
+    print("开始解析新格式Excel文件...")
+    
+    # 解析比赛基本信息
+    match_name = str(rows[0][0]).strip()  # 第0行第0列：比赛名称
+    game_map = str(rows[0][1]).strip()    # 第0行第1列：地图
+    
+    print(f"比赛名称: {match_name}")
+    print(f"地图: {game_map}")
+    
+    # 解析队伍A信息
+    team_a_name = str(rows[2][0]).strip()  # 第2行第0列：队伍A
+    team_a_score = str(rows[2][1]).strip() # 第2行第1列：13
+    
+    # 解析队伍B信息
+    team_b_name = str(rows[11][0]).strip() # 第11行第0列：队伍B
+    team_b_score = str(rows[11][1]).strip() # 第11行第1列：7
+    
+    print(f"队伍A: {team_a_name}, 得分: {team_a_score}")
+    print(f"队伍B: {team_b_name}, 得分: {team_b_score}")
+    
+    # 获取列标题（第3行和第12行都是标题行，取第一个）
+    headers = [str(header).strip() for header in rows[3]]
+    
+    print(f"列标题: {headers}")
+    
+    # 列标题到字段的映射只解析一次，所有选手行共用
+    schema = compile_header_schema(headers, PLAYER_FIELD_RULES)
+    
+    # 解析队伍A的选手数据（第4-8行）
+    team_a_players = []
+    for row_idx in range(4, 9):  # 第4-8行
+        if row_idx < len(rows):
+            player_data = parse_player_from_row(rows[row_idx], schema, f"队伍{team_a_name}")
+            if player_data:
+                team_a_players.append(player_data)
+                print(f"队伍A选手: {player_data['name']}")
+    
+    # 解析队伍B的选手数据（第13-17行）
+    team_b_players = []
+    for row_idx in range(13, 18):  # 第13-17行
+        if row_idx < len(rows):
+            player_data = parse_player_from_row(rows[row_idx], schema, f"队伍{team_b_name}")
+            if player_data:
+                team_b_players.append(player_data)
+                print(f"队伍B选手: {player_data['name']}")
+    
+    # 构建队伍数据
+    if team_a_players:
+        teams['A'] = {
+            'name': team_a_name,
+            'score': team_a_score,
+            'players': team_a_players
+        }
+        
+    if team_b_players:
+        teams['B'] = {
+            'name': team_b_name,
+            'score': team_b_score,
+            'players': team_b_players
+        }
+    
+    print(f"解析完成: 队伍A {len(team_a_players)}人, 队伍B {len(team_b_players)}人")
+    
+    # 更新match_info
+    match_info['name'] = match_name
+    match_info['map'] = game_map
+    
+    return teams
+
+def is_blank_cell(value):
+    """单元格为空（None、NaN、空字符串或'nan'）"""
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value)
+    if isinstance(value, numbers.Number):
+        return False
+    text = str(value).strip()
+    return not text or text == 'nan'
+
+def to_int(value):
+    """单元格值转换为整数（兼容'12'、'12.0'等文本）"""
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return int(value)
+    return int(float(str(value).strip()))
+
+def to_float(value):
+    """单元格值转换为浮点数"""
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return float(value)
+    return float(str(value).strip())
+
+def to_legacy_int(value):
+    """旧解析逻辑的整数转换：只接受纯数字，否则记为0"""
+    text = str(value).strip()
+    return int(text) if text.isdigit() else 0
+
+# 选手字段规则：(字段名, 列标题匹配条件, 类型转换)，按顺序取第一个匹配的规则
+PLAYER_FIELD_RULES = (
+    ('kills', lambda header: '击杀' in header and '爆头击杀' not in header and '首杀' not in header, to_int),
+    ('deaths', lambda header: '死亡' in header, to_int),
+    ('assists', lambda header: '助攻' in header, to_int),
+    ('headshots', lambda header: '爆头击杀' in header, to_int),
+    ('first_kills', lambda header: '首杀' in header, to_int),
+    ('rws', lambda header: 'RWS' in header, to_float),
+    ('rating_plus', lambda header: 'Rating+' in header, to_float),
+    ('rating', lambda header: 'Rating' in header, to_float),
+    ('adr', lambda header: 'ADR' in header, to_float),
+    ('headshot_rate', lambda header: '爆头率' in header, to_float),
+    ('kast', lambda header: 'KAST' in header, to_float),
+    ('sniper_kills', lambda header: '狙杀数' in header, to_int),
+    ('first_deaths', lambda header: '首死数' in header, to_int),
+)
+
+# 旧格式只有基础击杀数据
+BASIC_FIELD_RULES = PLAYER_FIELD_RULES[:5]
+
+# 旧解析逻辑按列名关键字匹配
+LEGACY_FIELD_RULES = (
+    ('kills', lambda header: '击杀' in header, to_legacy_int),
+    ('deaths', lambda header: '死亡' in header, to_legacy_int),
+    ('assists', lambda header: '助攻' in header, to_legacy_int),
+    ('headshots', lambda header: '爆头' in header, to_legacy_int),
+    ('first_kills', lambda header: '首杀' in header, to_legacy_int),
+)
+
+def compile_header_schema(headers, rules, skip_columns=()):
+    """将列标题编译为 [(列号, 列标题, 字段名, 类型转换)]，每张表只需匹配一次"""
+    schema = []
+    for col_idx, header in enumerate(headers):
+        if col_idx in skip_columns:
+            continue
+        header = str(header).strip()
+        for field, matches, convert in rules:
+            if matches(header):
+                schema.append((col_idx, header, field, convert))
+                break
+    return schema
+
+def extract_player_fields(values, schema, player_data, report_errors=True):
+    """按编译好的表头映射从一行单元格中提取选手字段"""
+    for col_idx, header, field, convert in schema:
+        if col_idx >= len(values):
+            continue
+        value = values[col_idx]
+        if is_blank_cell(value):
+            continue
+        
+        try:
+            player_data[field] = convert(value)
+        except Exception as e:
+            if report_errors:
+                print(f"解析选手{player_data.get('name')}的{header}数据失败: {value}, 错误: {e}")
+    
+    return player_data
+
+def parse_player_from_row(row, schema, team_name):
+    """从单行数据（单元格列表）解析选手信息，schema由compile_header_schema生成"""
     player_data = {}
     
     try:
         # 选手名称在第0列
-        player_name = str(row.iloc[0]).strip()
+        player_name = str(row[0]).strip()
         if not player_name or player_name == 'nan' or player_name == '选手名称':
             return None
         
@@ -194,46 +830,7 @@ def parse_player_from_row(row, headers, team_name):
         player_data['team'] = team_name
         
         # 解析统计数据
-        for col_idx, header in enumerate(headers):
-            if col_idx >= len(row):
-                continue
-                
-            value = str(row.iloc[col_idx]).strip()
-            if value == 'nan' or not value:
-                continue
-            
-            try:
-                # 根据列标题解析数据
-                if '击杀' in header and '爆头击杀' not in header and '首杀' not in header:
-                    player_data['kills'] = int(float(value))
-                elif '死亡' in header:
-                    player_data['deaths'] = int(float(value))
-                elif '助攻' in header:
-                    player_data['assists'] = int(float(value))
-                elif '爆头击杀' in header:
-                    player_data['headshots'] = int(float(value))
-                elif '首杀' in header:
-                    player_data['first_kills'] = int(float(value))
-                elif 'RWS' in header:
-                    player_data['rws'] = float(value)
-                elif 'Rating' in header:
-                    if 'Rating+' in header:
-                        player_data['rating_plus'] = float(value)
-                    else:
-                        player_data['rating'] = float(value)
-                elif 'ADR' in header:
-                    player_data['adr'] = float(value)
-                elif '爆头率' in header:
-                    player_data['headshot_rate'] = float(value)
-                elif 'KAST' in header:
-                    player_data['kast'] = float(value)
-                elif '狙杀数' in header:
-                    player_data['sniper_kills'] = int(float(value))
-                elif '首死数' in header:
-                    player_data['first_deaths'] = int(float(value))
-            except Exception as e:
-                print(f"解析选手{player_name}的{header}数据失败: {value}, 错误: {e}")
-                continue
+        extract_player_fields(row, schema, player_data)
         
         # 设置默认值
         player_data.setdefault('kills', 0)
@@ -256,7 +853,7 @@ def parse_player_from_row(row, headers, team_name):
         print(f"解析选手数据失败: {e}")
         return None
 
-def parse_player_row_new(row, columns, headers):
+def parse_player_row_new(row, columns, headers, schema=None):
     """解析单行选手数据 - 新逻辑"""
     player_data = {}
     
@@ -278,30 +875,9 @@ def parse_player_row_new(row, columns, headers):
     player_data['name'] = player_name
     
     # 使用headers（列标题）来匹配统计数据
-    for i, col in enumerate(columns):
-        value = str(row[col]).strip()
-        
-        if value == 'nan' or not value:
-            continue
-            
-        # 获取对应的列标题
-        header = headers[i] if i < len(headers) else ""
-        
-        try:
-            # 根据列标题匹配统计数据
-            if '击杀' in header and '爆头击杀' not in header and '首杀' not in header:
-                player_data['kills'] = int(float(value))
-            elif '死亡' in header:
-                player_data['deaths'] = int(float(value))
-            elif '助攻' in header:
-                player_data['assists'] = int(float(value))
-            elif '爆头击杀' in header:
-                player_data['headshots'] = int(float(value))
-            elif '首杀' in header:
-                player_data['first_kills'] = int(float(value))
-        except Exception as e:
-            print(f"解析{player_data['name']}第{i}列数据失败: {value}, 错误: {e}")
-            continue
+    if schema is None:
+        schema = compile_header_schema(headers, BASIC_FIELD_RULES)
+    extract_player_fields([row[col] for col in columns], schema, player_data)
     
     # 设置默认值
     player_data.setdefault('kills', 0)
@@ -312,7 +888,7 @@ def parse_player_row_new(row, columns, headers):
     
     return player_data
 
-def parse_player_row(row, columns):
+def parse_player_row(row, columns, schema=None):
     """解析单行选手数据"""
     player_data = {}
     
@@ -330,26 +906,9 @@ def parse_player_row(row, columns):
         return None
     
     # 解析统计数据
-    for col in columns:
-        col_str = str(col).strip()
-        value = str(row[col]).strip()
-        
-        if value == 'nan' or not value:
-            continue
-            
-        try:
-            if '击杀' in col_str:
-                player_data['kills'] = int(value) if value.isdigit() else 0
-            elif '死亡' in col_str:
-                player_data['deaths'] = int(value) if value.isdigit() else 0
-            elif '助攻' in col_str:
-                player_data['assists'] = int(value) if value.isdigit() else 0
-            elif '爆头' in col_str:
-                player_data['headshots'] = int(value) if value.isdigit() else 0
-            elif '首杀' in col_str:
-                player_data['first_kills'] = int(value) if value.isdigit() else 0
-        except:
-            continue
+    if schema is None:
+        schema = compile_header_schema(columns, LEGACY_FIELD_RULES)
+    extract_player_fields([row[col] for col in columns], schema, player_data, report_errors=False)
     
     # 设置默认值
     player_data.setdefault('kills', 0)
@@ -450,8 +1009,11 @@ def parse_teams_with_improved_logic(data, data_column):
 
 def parse_players_from_position(data, start_idx, start_col, team):
     """从指定位置开始解析选手数据"""
+    import pandas as pd
+    
     players = []
     current_player = {}
+    schema = compile_header_schema(data.columns, LEGACY_FIELD_RULES)
     
     # 从队伍标识的下一行开始
     for idx in range(start_idx + 1, len(data)):
@@ -484,20 +1046,7 @@ def parse_players_from_position(data, start_idx, start_col, team):
             current_player = {'name': player_name}
             
             # 解析该行的统计数据
-            for col in data.columns:
-                value = row[col]
-                if pd.notna(value) and str(value).strip():
-                    stat_name = str(col).strip()
-                    if '击杀' in stat_name:
-                        current_player['kills'] = int(value) if str(value).isdigit() else 0
-                    elif '死亡' in stat_name:
-                        current_player['deaths'] = int(value) if str(value).isdigit() else 0
-                    elif '助攻' in stat_name:
-                        current_player['assists'] = int(value) if str(value).isdigit() else 0
-                    elif '爆头' in stat_name:
-                        current_player['headshots'] = int(value) if str(value).isdigit() else 0
-                    elif '首杀' in stat_name:
-                        current_player['first_kills'] = int(value) if str(value).isdigit() else 0
+            extract_player_fields(row.tolist(), schema, current_player, report_errors=False)
     
     # 添加最后一个选手
     if current_player and 'name' in current_player:
@@ -519,7 +1068,9 @@ def parse_players_from_column(data, data_column, team):
     if start_row == 0:
         return players
     
-    # 解析选手数据
+    # 解析选手数据（数据列本身不参与统计）
+    schema = compile_header_schema(data.columns, LEGACY_FIELD_RULES,
+                                   skip_columns={data.columns.get_loc(data_column)})
     current_player = {}
     for idx in range(start_row + 1, len(data)):
         row = data.iloc[idx]
@@ -542,21 +1093,7 @@ def parse_players_from_column(data, data_column, team):
                     break
         
         # 解析其他统计数据
-        for col in data.columns:
-            if col != data_column:
-                value = row[col]
-                if pd.notna(value) and str(value).strip():
-                    stat_name = str(col).strip()
-                    if '击杀' in stat_name:
-                        current_player['kills'] = int(value) if str(value).isdigit() else 0
-                    elif '死亡' in stat_name:
-                        current_player['deaths'] = int(value) if str(value).isdigit() else 0
-                    elif '助攻' in stat_name:
-                        current_player['assists'] = int(value) if str(value).isdigit() else 0
-                    elif '爆头' in stat_name:
-                        current_player['headshots'] = int(value) if str(value).isdigit() else 0
-                    elif '首杀' in stat_name:
-                        current_player['first_kills'] = int(value) if str(value).isdigit() else 0
+        extract_player_fields(row.tolist(), schema, current_player, report_errors=False)
     
     # 添加最后一个选手
     if current_player and 'name' in current_player:
@@ -564,40 +1101,114 @@ def parse_players_from_column(data, data_column, team):
     
     return players
 
-@app.route('/')
+@bp.route('/metrics')
+def get_metrics():
+    """Prometheus格式的运行指标（当前进程）"""
+    return Response(render_metrics(), content_type=PROMETHEUS_MIMETYPE)
+
+@bp.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
-@app.route('/api/matches', methods=['GET'])
+# 比赛列表可返回的字段
+MATCH_LIST_FIELDS = ('id', 'name', 'map', 'date', 'team_a_name', 'team_b_name',
+                     'team_a_score', 'team_b_score', 'file_path')
+MATCH_PAGE_SIZE = 50
+MAX_MATCH_PAGE_SIZE = 200
+
+def encode_match_cursor(match_date, match_id):
+    """将列表最后一条比赛的 (date, id) 编码为游标"""
+    raw = f'{match_date.isoformat()}|{match_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_match_cursor(cursor):
+    """解析游标，格式错误时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        match_date, match_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(match_date), int(match_id)
+    except ValueError as e:
+        raise ValueError(f'无效的游标: {cursor}') from e
+
+def parse_date_arg(value, end_of_day=False):
+    """解析日期参数（YYYY-MM-DD 或 ISO 时间），end_of_day为True时只有日期则取次日零点"""
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@bp.route('/api/matches', methods=['GET'])
 def get_matches():
-    """获取所有比赛"""
-    matches = Match.query.order_by(Match.date.desc()).all()
-    matches_list = []
-    
-    for match in matches:
-        matches_list.append({
-            'id': match.id,
-            'name': match.name,
-            'map': match.map,
-            'date': match.date.strftime('%Y-%m-%d %H:%M'),
-            'team_a_name': match.team_a_name,
-            'team_b_name': match.team_b_name,
-            'team_a_score': match.team_a_score,
-            'team_b_score': match.team_b_score,
-            'file_path': match.file_path
-        })
+    """获取比赛列表（按日期倒序，基于 (date, id) 的游标分页）"""
+    # 查询参数: limit, cursor, map, team, date_from, date_to, fields
+    # 下一页游标通过响应头 X-Next-Cursor 返回，没有更多数据时不返回该响应头
+    try:
+        limit = min(max(int(request.args.get('limit', MATCH_PAGE_SIZE)), 1), MAX_MATCH_PAGE_SIZE)
+        
+        fields = MATCH_LIST_FIELDS
+        if request.args.get('fields'):
+            fields = tuple(field.strip() for field in request.args['fields'].split(',') if field.strip())
+            unknown = [field for field in fields if field not in MATCH_LIST_FIELDS]
+            if unknown:
+                raise ValueError(f'不支持的字段: {", ".join(unknown)}')
+        
+        filters = []
+        if request.args.get('map'):
+            filters.append(Match.map == request.args['map'])
+        if request.args.get('team'):
+            team = request.args['team']
+            filters.append(or_(Match.team_a_name == team, Match.team_b_name == team))
+        if request.args.get('date_from'):
+            filters.append(Match.date >= parse_date_arg(request.args['date_from']))
+        if request.args.get('date_to'):
+            filters.append(Match.date < parse_date_arg(request.args['date_to'], end_of_day=True))
+        if request.args.get('cursor'):
+            cursor_date, cursor_id = decode_match_cursor(request.args['cursor'])
+            filters.append(or_(Match.date < cursor_date,
+                               and_(Match.date == cursor_date, Match.id < cursor_id)))
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    
+    # 只查询需要的列；id和date用于生成游标
+    extra_fields = [field for field in fields if field not in ('id', 'date')]
+    rows = db.session.query(Match.id, Match.date, sql_date_text(Match.date).label('date_text'),
+                            *[getattr(Match, field) for field in extra_fields]) \
+        .filter(*filters) \
+        .order_by(Match.date.desc(), Match.id.desc()) \
+        .limit(limit + 1) \
+        .all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    return jsonify(matches_list)
+    matches_list = []
+    for row in rows:
+        match_data = {}
+        for field in fields:
+            if field == 'date':
+                match_data['date'] = row.date_text
+            else:
+                match_data[field] = getattr(row, field)
+        matches_list.append(match_data)
+    
+    response = jsonify(matches_list)
+    if has_more:
+        response.headers['X-Next-Cursor'] = encode_match_cursor(rows[-1].date, rows[-1].id)
+    return response
 
-@app.route('/api/matches/<int:match_id>', methods=['GET'])
+@bp.route('/api/matches/<int:match_id>', methods=['GET'])
 def get_match_detail(match_id):
     """获取比赛详情"""
     match = Match.query.get(match_id)
     if not match:
         return jsonify({'error': '比赛不存在'}), 404
     
-    players = PlayerMatch.query.filter_by(match_id=match_id).all()
+    # 联表一次取出选手姓名
+    players = db.session.query(PlayerMatch, Player.name) \
+        .join(Player, Player.id == PlayerMatch.player_id) \
+        .filter(PlayerMatch.match_id == match_id) \
+        .all()
     
     match_data = {
         'id': match.id,
@@ -618,10 +1229,9 @@ def get_match_detail(match_id):
         }
     }
     
-    for player_match in players:
-        player = player_match.player
+    for player_match, player_name in players:
         player_data = {
-            'name': player.name,
+            'name': player_name,
             'kills': player_match.kills,
             'deaths': player_match.deaths,
             'assists': player_match.assists,
@@ -635,7 +1245,85 @@ def get_match_detail(match_id):
     
     return jsonify(match_data)
 
-@app.route('/api/upload', methods=['POST'])
+def build_upload_path(original_filename):
+    """生成上传文件的保存路径（添加时间戳，重名时追加序号）"""
+    filename = secure_filename(original_filename)
+    # 添加时间戳避免重名
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{timestamp}_{filename}")
+    
+    counter = 1
+    while os.path.exists(file_path):
+        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{timestamp}_{counter}_{filename}")
+        counter += 1
+    return file_path
+
+# 上传文件分块写入磁盘的块大小
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# 解析逻辑变化导致解析结果不同时递增，使旧的解析缓存失效
+PARSE_CACHE_VERSION = 1
+
+def save_upload_stream(stream, original_filename):
+    """将上传内容分块写入磁盘并同时计算SHA-256，返回 (保存路径, 内容哈希)"""
+    file_path = build_upload_path(original_filename)
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'wb') as target:
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                target.write(chunk)
+    except Exception:
+        # 读取失败（如ZIP条目损坏）时不留下不完整的文件
+        os.remove(file_path)
+        raise
+    return file_path, digest.hexdigest()
+
+def find_duplicate_match(content_hash):
+    """查找内容相同的已导入比赛"""
+    return Match.query.filter_by(content_hash=content_hash).first()
+
+def duplicate_upload_response(match):
+    """重复上传时按配置拒绝或关联到已有比赛"""
+    if current_app.config['DUPLICATE_UPLOAD_POLICY'] == 'link':
+        return jsonify({
+            'success': True,
+            'message': '文件已上传过，已关联到已有比赛',
+            'match_id': match.id,
+            'duplicate': True
+        })
+    return jsonify({'error': '文件已上传过', 'match_id': match.id}), 409
+
+def load_cached_parse(content_hash):
+    """读取解析结果缓存，未命中返回None"""
+    entry = db.session.get(ParseCache, content_hash)
+    if entry is None or entry.parser_version != PARSE_CACHE_VERSION:
+        return None
+    return json.loads(entry.parsed_data)
+
+def store_parse_result(content_hash, parsed_data):
+    """写入解析结果缓存（不提交事务）"""
+    values = {
+        'content_hash': content_hash,
+        'parser_version': PARSE_CACHE_VERSION,
+        'parsed_data': json.dumps(parsed_data, ensure_ascii=False),
+        'created_at': datetime.utcnow()
+    }
+    statement = sqlite_insert(ParseCache).values(**values)
+    db.session.execute(statement.on_conflict_do_update(index_elements=['content_hash'], set_=values))
+
+def parse_upload(file_path, content_hash):
+    """解析上传文件，相同内容直接使用缓存结果"""
+    parsed_data = load_cached_parse(content_hash)
+    if parsed_data is not None:
+        return parsed_data
+    
+    parsed_data = parse_excel_data(file_path)
+    if parsed_data:
+        store_parse_result(content_hash, parsed_data)
+    return parsed_data
+
+@bp.route('/api/upload', methods=['POST'])
 def upload_file():
     """上传Excel文件"""
     if 'file' not in request.files:
@@ -646,70 +1334,23 @@ def upload_file():
         return jsonify({'error': '没有选择文件'}), 400
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        # 添加时间戳避免重名
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
+        file_path, content_hash = save_upload_stream(file.stream, file.filename)
         
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        # 相同内容的文件已经导入过
+        existing = find_duplicate_match(content_hash)
+        if existing:
+            os.remove(file_path)
+            return duplicate_upload_response(existing)
         
         # 解析Excel数据
-        parsed_data = parse_excel_data(file_path)
+        parsed_data = parse_upload(file_path, content_hash)
         if not parsed_data:
             return jsonify({'error': '文件解析失败'}), 400
         
         # 保存到数据库
         try:
-            # 提取队伍信息
-            team_data = parsed_data['team_data']
-            team_a_info = team_data.get('A', {})
-            team_b_info = team_data.get('B', {})
-            
-            match = Match(
-                name=parsed_data['match_info']['name'],
-                map=parsed_data['match_info']['map'],
-                date=datetime.now(),
-                file_path=file_path,
-                team_a_name=team_a_info.get('name', '队伍A'),
-                team_b_name=team_b_info.get('name', '队伍B'),
-                team_a_score=int(team_a_info.get('score', 0)) if team_a_info.get('score', '').isdigit() else 0,
-                team_b_score=int(team_b_info.get('score', 0)) if team_b_info.get('score', '').isdigit() else 0
-            )
-            db.session.add(match)
-            db.session.flush()  # 获取match.id
-            
-            # 保存选手数据
-            for team_key, team_data in parsed_data['team_data'].items():
-                for player_data in team_data['players']:
-                    # 查找或创建选手
-                    player = Player.query.filter_by(name=player_data['name']).first()
-                    if not player:
-                        player = Player(name=player_data['name'])
-                        db.session.add(player)
-                        db.session.flush()
-                    
-                    # 创建选手比赛记录
-                    player_match = PlayerMatch(
-                        player_id=player.id,
-                        match_id=match.id,
-                        team=team_key,
-                        kills=player_data.get('kills', 0),
-                        deaths=player_data.get('deaths', 0),
-                        assists=player_data.get('assists', 0),
-                        headshots=player_data.get('headshots', 0),
-                        first_kills=player_data.get('first_kills', 0),
-                        rws=player_data.get('rws', 0.0),
-                        rating=player_data.get('rating', 0.0),
-                        rating_plus=player_data.get('rating_plus', 0.0),
-                        adr=player_data.get('adr', 0.0),
-                        headshot_rate=player_data.get('headshot_rate', 0.0),
-                        kast=player_data.get('kast', 0.0),
-                        sniper_kills=player_data.get('sniper_kills', 0),
-                        first_deaths=player_data.get('first_deaths', 0)
-                    )
-                    db.session.add(player_match)
-            
+            match = save_match(parsed_data, file_path, content_hash)
+            bump_data_version()
             db.session.commit()
             
             return jsonify({
@@ -718,13 +1359,264 @@ def upload_file():
                 'match_id': match.id
             })
             
+        except IntegrityError:
+            # 同一文件被并发上传，另一个请求已先导入
+            db.session.rollback()
+            os.remove(file_path)
+            existing = find_duplicate_match(content_hash)
+            if existing:
+                return duplicate_upload_response(existing)
+            return jsonify({'error': '数据保存失败'}), 500
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'数据保存失败: {str(e)}'}), 500
     
     return jsonify({'error': '不支持的文件格式'}), 400
 
-@app.route('/api/matches/<int:match_id>', methods=['DELETE'])
+def list_bulk_uploads(files, archives):
+    """列出批量上传中要导入的Excel文件，ZIP只读取目录、不解压
+    
+    返回 ([(文件名, 打开文件内容的函数, 解压后大小)], 失败结果列表)；打开的ZIP加入 archives，由调用方关闭。
+    """
+    entries = []
+    rejected = []
+    
+    for file in files:
+        if not file or file.filename == '':
+            continue
+        
+        if file.filename.lower().endswith('.zip'):
+            try:
+                archive = zipfile.ZipFile(file.stream)
+            except zipfile.BadZipFile:
+                rejected.append({'file': file.filename, 'success': False, 'error': 'ZIP文件损坏'})
+                continue
+            archives.append(archive)
+            for info in archive.infolist():
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not name or info.filename.startswith('__MACOSX/'):
+                    continue
+                if not allowed_file(name):
+                    rejected.append({'file': info.filename, 'success': False, 'error': '不支持的文件格式'})
+                    continue
+                if info.file_size > current_app.config['MAX_CONTENT_LENGTH']:
+                    rejected.append({'file': info.filename, 'success': False, 'error': '文件过大'})
+                    continue
+                # 解压时读取的字节数不会超过目录中记录的 file_size
+                entries.append((info.filename, functools.partial(archive.open, info), info.file_size))
+        elif allowed_file(file.filename):
+            # 普通文件已包含在请求体中，大小受 MAX_CONTENT_LENGTH 限制
+            entries.append((file.filename, functools.partial(contextlib.nullcontext, file.stream), 0))
+        else:
+            rejected.append({'file': file.filename, 'success': False, 'error': '不支持的文件格式'})
+    
+    return entries, rejected
+
+def save_bulk_uploads(entries):
+    """将列出的文件写入磁盘，返回 ([(文件名, 路径, 内容哈希)], 失败结果列表)"""
+    saved = []
+    rejected = []
+    for filename, open_source, _ in entries:
+        try:
+            with open_source() as source:
+                file_path, content_hash = save_upload_stream(source, os.path.basename(filename))
+        except zipfile.BadZipFile:
+            rejected.append({'file': filename, 'success': False, 'error': 'ZIP文件损坏'})
+            continue
+        saved.append((filename, file_path, content_hash))
+    return saved, rejected
+
+def parse_excel_data_timed(file_path):
+    """在解析子进程中执行：返回 (解析结果, 各阶段耗时)"""
+    with collect_ingest_stages() as timings:
+        parsed_data = parse_excel_data(file_path)
+    return parsed_data, timings
+
+def parse_excel_files(file_paths):
+    """并行解析多个Excel文件，结果顺序与输入一致
+    
+    子进程以 spawn 方式启动：当前进程有后台解析线程和请求线程，fork 可能复制其他线程持有的锁导致子进程死锁。
+    """
+    workers = min(len(file_paths), current_app.config['BULK_PARSE_WORKERS'])
+    if workers <= 1:
+        return [parse_excel_data(file_path) for file_path in file_paths]
+    
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for parsed_data, timings in executor.map(parse_excel_data_timed, file_paths):
+            record_ingest_stages(timings)
+            results.append(parsed_data)
+    return results
+
+@bp.route('/api/upload/bulk', methods=['POST'])
+def upload_files_bulk():
+    """批量上传多个Excel文件或ZIP压缩包，所有比赛在一个事务中写入"""
+    files = request.files.getlist('files') + request.files.getlist('file')
+    archives = []
+    try:
+        entries, results = list_bulk_uploads(files, archives)
+        
+        # 文件数和解压后总大小在写入磁盘之前检查
+        if not entries and not results:
+            return jsonify({'error': '没有文件'}), 400
+        if len(entries) > current_app.config['BULK_MAX_FILES']:
+            return jsonify({'error': f'单次最多上传{current_app.config["BULK_MAX_FILES"]}个文件'}), 400
+        max_extract_size = current_app.config['BULK_MAX_EXTRACT_SIZE']
+        if sum(size for _, _, size in entries) > max_extract_size:
+            return jsonify({'error': f'ZIP解压后总大小超过{max_extract_size // (1024 * 1024)}MB'}), 400
+        
+        saved, failed = save_bulk_uploads(entries)
+        results.extend(failed)
+    finally:
+        for archive in archives:
+            archive.close()
+    
+    # 去掉重复文件，缓存命中的文件不再解析
+    to_import = []
+    seen_hashes = {}
+    for filename, file_path, content_hash in saved:
+        existing = find_duplicate_match(content_hash)
+        if existing or content_hash in seen_hashes:
+            os.remove(file_path)
+            if existing and current_app.config['DUPLICATE_UPLOAD_POLICY'] == 'link':
+                results.append({'file': filename, 'success': True, 'match_id': existing.id, 'duplicate': True})
+            elif existing:
+                results.append({'file': filename, 'success': False, 'error': '文件已上传过', 'match_id': existing.id})
+            else:
+                results.append({'file': filename, 'success': False,
+                                'error': f'与{seen_hashes[content_hash]}内容相同'})
+            continue
+        seen_hashes[content_hash] = filename
+        to_import.append((filename, file_path, content_hash, load_cached_parse(content_hash)))
+    
+    uncached = [file_path for _, file_path, _, parsed_data in to_import if parsed_data is None]
+    parsed_uncached = iter(parse_excel_files(uncached))
+    
+    # 保存到数据库（一个事务）
+    pending = []
+    uploads = []
+    try:
+        for filename, file_path, content_hash, parsed_data in to_import:
+            if parsed_data is None:
+                parsed_data = next(parsed_uncached)
+                if parsed_data:
+                    store_parse_result(content_hash, parsed_data)
+            if not parsed_data:
+                os.remove(file_path)
+                results.append({'file': filename, 'success': False, 'error': '文件解析失败'})
+                continue
+            pending.append(filename)
+            uploads.append((parsed_data, file_path, content_hash))
+        
+        if uploads:
+            pending = list(zip(pending, save_matches(uploads)))
+            bump_data_version()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for filename, file_path, _ in saved:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return jsonify({'error': f'数据保存失败: {str(e)}', 'results': results}), 500
+    
+    for filename, match in pending:
+        results.append({'file': filename, 'success': True, 'match_id': match.id})
+    
+    failed = sum(1 for result in results if not result['success'])
+    return jsonify({
+        'success': bool(pending),
+        'message': f'成功导入{len(pending)}个文件，失败{failed}个',
+        'imported': len(pending),
+        'failed': failed,
+        'results': results
+    })
+
+def process_ingest_job(job_id):
+    """后台线程中处理一个上传任务：解析Excel并写入数据库"""
+    job = db.session.get(IngestJob, job_id)
+    
+    # 排队期间同一文件可能已被其他请求导入
+    existing = find_duplicate_match(job.content_hash) if job.content_hash else None
+    if existing:
+        if current_app.config['DUPLICATE_UPLOAD_POLICY'] != 'link':
+            raise ValueError('文件已上传过')
+        os.remove(job.file_path)
+        job.status = 'done'
+        job.stage = '文件已上传过，已关联到已有比赛'
+        job.progress = 100
+        job.match_id = existing.id
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return
+    
+    update_job_progress(job, '解析中', 10)
+    if job.content_hash:
+        parsed_data = parse_upload(job.file_path, job.content_hash)
+    else:
+        parsed_data = parse_excel_data(job.file_path)
+    if not parsed_data:
+        raise ValueError('文件解析失败')
+    
+    update_job_progress(job, '保存中', 70)
+    match = save_match(parsed_data, job.file_path, job.content_hash)
+    bump_data_version()
+    
+    # 比赛数据与任务完成状态在同一事务中提交
+    job.status = 'done'
+    job.stage = '完成'
+    job.progress = 100
+    job.match_id = match.id
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+@bp.route('/api/jobs', methods=['POST'])
+def create_ingest_job():
+    """异步上传Excel文件：保存后立即返回任务ID，由后台线程解析入库"""
+    if 'file' not in request.files:
+        return jsonify({'error': '没有文件'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': '没有选择文件'}), 400
+    
+    if not allowed_file(file.filename):
+        return jsonify({'error': '不支持的文件格式'}), 400
+    
+    # 队列已满时不保存文件，直接让客户端稍后重试
+    if pending_job_count() >= current_app.config['INGEST_QUEUE_MAX']:
+        response = jsonify({'error': '上传任务过多，请稍后重试'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    
+    file_path, content_hash = save_upload_stream(file.stream, file.filename)
+    
+    # 相同内容的文件已经导入过，无需排队
+    existing = find_duplicate_match(content_hash)
+    if existing:
+        os.remove(file_path)
+        return duplicate_upload_response(existing)
+    
+    job = enqueue_job(file.filename, file_path, content_hash)
+    
+    response = jsonify({
+        'success': True,
+        'message': '文件已加入处理队列',
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}'
+    })
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response, 202
+
+@bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_ingest_job(job_id):
+    """查询上传任务状态"""
+    job = db.session.get(IngestJob, job_id)
+    if not job:
+        return jsonify({'error': '任务不存在'}), 404
+    
+    return jsonify(job.to_dict())
+
+@bp.route('/api/matches/<int:match_id>', methods=['DELETE'])
 def delete_match(match_id):
     """删除比赛"""
     match = Match.query.get(match_id)
@@ -732,9 +1624,14 @@ def delete_match(match_id):
         return jsonify({'error': '比赛不存在'}), 404
     
     try:
-        # 删除相关数据
+        # 删除相关数据（同一事务内扣除选手累计统计）
+        remove_match_stats(match_id)
         PlayerMatch.query.filter_by(match_id=match_id).delete()
         db.session.delete(match)
+        db.session.flush()
+        # 从该比赛的位置开始重算Elo分
+        replay_ratings_from(match.date, match.id)
+        bump_data_version(deleted=True)
         db.session.commit()
         
         # 删除文件
@@ -747,509 +1644,796 @@ def delete_match(match_id):
         db.session.rollback()
         return jsonify({'error': f'删除失败: {str(e)}'}), 500
 
-def calculate_players_data():
-    """计算所有选手的统计数据（不筛选）"""
-    # 获取所有选手的比赛数据
-    players_data = {}
+def build_player_info(player_name, totals):
+    """根据累计值（PlayerStats或分组查询结果行）生成选手统计数据"""
+    total_matches = totals.total_matches
+    player_info = {
+        'name': player_name,
+        'totalKills': totals.total_kills,
+        'totalDeaths': totals.total_deaths,
+        'totalAssists': totals.total_assists,
+        'totalHeadshots': totals.total_headshots,
+        'totalFirstKills': totals.total_first_kills,
+        'totalFirstDeaths': totals.total_first_deaths,
+        'totalRatingPlus': totals.total_rating_plus,
+        'totalADR': totals.total_adr,
+        'totalRWS': totals.total_rws,
+        'totalKAST': totals.total_kast,
+        'totalSniperKills': totals.total_sniper_kills,
+        'totalMatches': total_matches
+    }
     
-    # 查询所有选手的比赛记录
-    player_matches = PlayerMatch.query.all()
+    # 计算衍生数据
+    player_info['kdRatio'] = round(totals.total_kills / max(totals.total_deaths, 1), 2)
+    player_info['avgKills'] = round(totals.total_kills / total_matches, 1)
+    player_info['avgDeaths'] = round(totals.total_deaths / total_matches, 1)
+    player_info['avgAssists'] = round(totals.total_assists / total_matches, 1)
+    player_info['avgHeadshots'] = round(totals.total_headshots / total_matches, 1)
+    player_info['avgFirstKills'] = round(totals.total_first_kills / total_matches, 1)
+    player_info['avgFirstDeaths'] = round(totals.total_first_deaths / total_matches, 1)
+    player_info['avgRatingPlus'] = round(totals.total_rating_plus / total_matches, 2)
+    player_info['avgADR'] = round(totals.total_adr / total_matches, 1)
+    player_info['avgRWS'] = round(totals.total_rws / total_matches, 1)
+    player_info['avgKAST'] = round(totals.total_kast / total_matches, 1)
+    player_info['headshotRatio'] = round(totals.total_headshots / max(totals.total_kills, 1) * 100, 1)
+    player_info['avgsniperkills'] = round(totals.total_sniper_kills / max(totals.total_kills, 1) * 100, 1)
+    
+    # 单场数据的标准差（稳定性）
+    player_info['stdRatingPlus'] = round(sample_stddev(totals.m2_rating_plus, total_matches), 2)
+    player_info['stdADR'] = round(sample_stddev(totals.m2_adr, total_matches), 1)
+    player_info['stdKAST'] = round(sample_stddev(totals.m2_kast, total_matches), 2)
+    
+    # 胜场中个人Rating+比本队平均高出多少
+    player_info['totalWinMatches'] = totals.total_win_matches
+    player_info['avgWinRatingPlusDiff'] = round(totals.total_win_rating_plus_diff / max(totals.total_win_matches, 1), 2)
+    
+    # Elo分（不受筛选条件影响）
+    player_info['eloRating'] = round(totals.elo_rating, 1)
+    player_info['eloMatches'] = totals.elo_matches
+    
+    return player_info
+
+def query_player_stats(min_matches=1):
+    """单次联表查询所有选手的累计统计记录，返回 [(PlayerStats, 姓名)]"""
+    return db.session.query(PlayerStats, Player.name) \
+        .join(Player, Player.id == PlayerStats.player_id) \
+        .filter(PlayerStats.total_matches >= max(min_matches, 1)) \
+        .all()
+
+def parse_stats_filters(args):
+    """解析选手统计/榜单的筛选参数（map, team, date_from, date_to, min_matches），只保留指定了的参数"""
+    filters = {}
+    for key in ('map', 'team'):
+        if args.get(key):
+            filters[key] = args[key]
+    for key in ('date_from', 'date_to'):
+        if args.get(key):
+            # 先校验格式，保留原始字符串作为缓存键的一部分
+            parse_date_arg(args[key])
+            filters[key] = args[key]
+    if args.get('min_matches'):
+        min_matches = int(args['min_matches'])
+        if min_matches < 1:
+            raise ValueError('min_matches 必须大于0')
+        filters['min_matches'] = min_matches
+    return filters
+
+def match_filter_criteria(filters):
+    """将比赛筛选条件转换为 player_matches 联表 matches 的SQL条件（地图、日期走 matches 索引）"""
+    criteria = []
+    if 'map' in filters:
+        criteria.append(Match.map == filters['map'])
+    if 'team' in filters:
+        # 只统计选手代表该队伍出战的比赛
+        player_team_name = case((PlayerMatch.team == 'A', Match.team_a_name), else_=Match.team_b_name)
+        criteria.append(player_team_name == filters['team'])
+    if 'date_from' in filters:
+        criteria.append(Match.date >= parse_date_arg(filters['date_from']))
+    if 'date_to' in filters:
+        criteria.append(Match.date < parse_date_arg(filters['date_to'], end_of_day=True))
+    return criteria
+
+def query_filtered_player_stats(filters):
+    """按筛选条件获取 [(累计值, 姓名)]：没有比赛条件时读取累计统计表，否则只汇总符合条件的比赛记录"""
+    criteria = match_filter_criteria(filters)
+    min_matches = filters.get('min_matches', 1)
+    if not criteria:
+        return query_player_stats(min_matches)
+    
+    # 当前Elo分取自累计统计表
+    rows = player_aggregate_query(*criteria) \
+        .outerjoin(PlayerStats, PlayerStats.player_id == PlayerMatch.player_id) \
+        .add_columns(func.coalesce(func.max(PlayerStats.elo_rating), PlayerStats.INITIAL_ELO_RATING).label('elo_rating'),
+                     func.coalesce(func.max(PlayerStats.elo_matches), 0).label('elo_matches')) \
+        .having(func.count(PlayerMatch.id) >= min_matches) \
+        .all()
+    return [(row, row.name) for row in rows]
+
+def stats_cache_key(name, filters):
+    """筛选条件对应的响应缓存键（同时用作ETag，只含ASCII字符）"""
+    if not filters:
+        return name
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return f'{name}-{digest}'
+
+def calculate_players_data(stats_rows=None):
+    """计算选手的统计数据，stats_rows 为 [(累计值, 姓名)]，默认为所有选手（不筛选）"""
+    # 直接读取累计统计表，每名选手一行
+    if stats_rows is None:
+        stats_rows = query_player_stats()
     
-    for pm in player_matches:
-        player_name = pm.player.name
-        
-        if player_name not in players_data:
-            players_data[player_name] = {
-                'name': player_name,
-                'totalKills': 0,
-                'totalDeaths': 0,
-                'totalAssists': 0,
-                'totalHeadshots': 0,
-                'totalFirstKills': 0,
-                'totalFirstDeaths': 0,
-                'totalMatches': 0,
-                'totalRatingPlus': 0.0,
-                'totalADR': 0.0,
-                'totalRWS': 0.0,
-                'totalKAST': 0.0,
-                'totalSniperKills': 0
-            }
-        
-        players_data[player_name]['totalKills'] += pm.kills
-        players_data[player_name]['totalDeaths'] += pm.deaths
-        players_data[player_name]['totalAssists'] += pm.assists
-        players_data[player_name]['totalHeadshots'] += pm.headshots
-        players_data[player_name]['totalFirstKills'] += pm.first_kills
-        players_data[player_name]['totalFirstDeaths'] += pm.first_deaths
-        players_data[player_name]['totalRatingPlus'] += pm.rating_plus
-        players_data[player_name]['totalADR'] += pm.adr
-        players_data[player_name]['totalRWS'] += pm.rws
-        players_data[player_name]['totalKAST'] += pm.kast
-        players_data[player_name]['totalSniperKills'] += pm.sniper_kills
-        players_data[player_name]['totalMatches'] += 1
-    
-    # 转换为数组并计算统计数据
-    players_array = []
-    for player_name, data in players_data.items():
-        player_info = {
-            'name': player_name,
-            'totalKills': data['totalKills'],
-            'totalDeaths': data['totalDeaths'],
-            'totalAssists': data['totalAssists'],
-            'totalHeadshots': data['totalHeadshots'],
-            'totalFirstKills': data['totalFirstKills'],
-            'totalFirstDeaths': data['totalFirstDeaths'],
-            'totalRatingPlus': data['totalRatingPlus'],
-            'totalADR': data['totalADR'],
-            'totalRWS': data['totalRWS'],
-            'totalKAST': data['totalKAST'],
-            'totalSniperKills': data['totalSniperKills'],
-            'totalMatches': data['totalMatches']
-        }
-        
-        # 计算衍生数据
-        player_info['kdRatio'] = round(data['totalKills'] / max(data['totalDeaths'], 1), 2)
-        player_info['avgKills'] = round(data['totalKills'] / data['totalMatches'], 1)
-        player_info['avgDeaths'] = round(data['totalDeaths'] / data['totalMatches'], 1)
-        player_info['avgAssists'] = round(data['totalAssists'] / data['totalMatches'], 1)
-        player_info['avgHeadshots'] = round(data['totalHeadshots'] / data['totalMatches'], 1)
-        player_info['avgFirstKills'] = round(data['totalFirstKills'] / data['totalMatches'], 1)
-        player_info['avgFirstDeaths'] = round(data['totalFirstDeaths'] / data['totalMatches'], 1)
-        player_info['avgRatingPlus'] = round(data['totalRatingPlus'] / data['totalMatches'], 2)
-        player_info['avgADR'] = round(data['totalADR'] / data['totalMatches'], 1)
-        player_info['avgRWS'] = round(data['totalRWS'] / data['totalMatches'], 1)
-        player_info['avgKAST'] = round(data['totalKAST'] / data['totalMatches'], 1)
-        player_info['headshotRatio'] = round(data['totalHeadshots'] / max(data['totalKills'], 1) * 100, 1)
-        player_info['avgsniperkills'] = round(data['totalSniperKills'] / max(data['totalKills'], 1) * 100, 1)
-        players_array.append(player_info)
+    players_array = [build_player_info(player_name, stats) for stats, player_name in stats_rows]
     
     # 按姓名排序
     players_array.sort(key=lambda x: x['name'])
     
     return players_array
 
-@app.route('/api/players', methods=['GET'])
+@bp.route('/api/players', methods=['GET'])
 def get_players():
-    """获取所有选手的统计数据（不筛选）"""
-    players_array = calculate_players_data()
-    return jsonify(players_array)
+    """获取选手的统计数据"""
+    # 查询参数（均可选）: map, team, date_from, date_to, min_matches；format=msgpack 返回MessagePack
+    try:
+        filters = parse_stats_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    
+    return cached_json_response(stats_cache_key('players', filters),
+                                lambda: calculate_players_data(query_filtered_player_stats(filters)),
+                                allow_msgpack=True)
 
-@app.route('/api/leaderboards', methods=['GET'])
+@bp.route('/api/leaderboards', methods=['GET'])
 def get_leaderboards():
     """获取所有榜单数据"""
-    players_array = calculate_players_data()
-    
-    # 计算各种榜单
-    leaderboards = {
-        'mvp': calculate_mvp_leaderboard(players_array),
-        'headshot_maniac': calculate_headshot_maniac_leaderboard(players_array),
-        'first_kill_assassin': calculate_first_kill_assassin_leaderboard(players_array),
-        'immortal_warrior': calculate_immortal_warrior_leaderboard(players_array),
-        'team_glue': calculate_team_glue_leaderboard(players_array),
-        'sniper_god': calculate_sniper_god_leaderboard(players_array),
-        'economic_destroyer': calculate_economic_destroyer_leaderboard(players_array),
-        'adversity_hero': calculate_adversity_hero_leaderboard(players_array),
-        'steady_player': calculate_steady_player_leaderboard(players_array),
-        'high_risk_high_reward': calculate_high_risk_high_reward_leaderboard(players_array),
-        'no_free_wins': calculate_no_free_wins_leaderboard(players_array),
-        'rws_dominance': calculate_rws_dominance_leaderboard(players_array)
-    }
-    
-    return jsonify(leaderboards)
-
-def calculate_mvp_leaderboard(players):
-    """计算MVP榜单（按平均Rating+降序排列）"""
-    mvp_leaderboard = []
-    
-    for player in players:
-        # 筛选条件：至少1场比赛且Rating+ ≥ 1.0
-        if player['totalMatches'] >= 1 and player['avgRatingPlus'] >= 1.0:
-            mvp_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgRatingPlus'],
-                'avgRatingPlus': player['avgRatingPlus'],
-                'totalMatches': player['totalMatches'],
-                'tag': '🏆【官方认证】'
-            })
+    # 查询参数与 /api/players 相同
+    try:
+        filters = parse_stats_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
     
-    # 排序
-    sorted_leaderboard = sorted(mvp_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+    return cached_json_response(stats_cache_key('leaderboards', filters),
+                                lambda: calculate_leaderboards(filters),
+                                allow_msgpack=True)
+
+# 配对列表支持的排序方式 -> 排序表达式
+PAIR_SORT_KEYS = {
+    'matches': PlayerPairStats.matches,
+    'win_rate': PlayerPairStats.wins * 1.0 / PlayerPairStats.matches,
+    'rating': (PlayerPairStats.total_rating_plus + PlayerPairStats.total_other_rating_plus) / PlayerPairStats.matches,
+}
+PAIR_RELATIONS = {'teammates': PlayerPairStats.TEAMMATE, 'opponents': PlayerPairStats.OPPONENT}
+PAIR_PAGE_SIZE = 10
+MAX_PAIR_PAGE_SIZE = 100
+
+@bp.route('/api/players/<path:player_name>/pairs', methods=['GET'])
+def get_player_pairs(player_name):
+    """获取选手最常同场的队友或对手（读取配对统计表，不扫描比赛记录）"""
+    # 查询参数: relation (teammates/opponents), sort (matches/win_rate/rating), limit, min_matches
+    try:
+        relation = request.args.get('relation', 'teammates')
+        if relation not in PAIR_RELATIONS:
+            raise ValueError(f'不支持的关系: {relation}')
+        sort = request.args.get('sort', 'matches')
+        if sort not in PAIR_SORT_KEYS:
+            raise ValueError(f'不支持的排序: {sort}')
+        limit = min(max(int(request.args.get('limit', PAIR_PAGE_SIZE)), 1), MAX_PAIR_PAGE_SIZE)
+        min_matches = max(int(request.args.get('min_matches', 1)), 1)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    
+    player_id = db.session.query(Player.id).filter_by(name=player_name).scalar()
+    if player_id is None:
+        return jsonify({'error': '选手不存在'}), 404
+    
+    params = {'player': player_name, 'relation': relation, 'sort': sort, 'limit': limit, 'min_matches': min_matches}
+    return cached_json_response(stats_cache_key('pairs', params),
+                                lambda: calculate_player_pairs(player_id, params))
+
+@bp.route('/api/players/<path:player_name>/ratings', methods=['GET'])
+def get_player_ratings(player_name):
+    """获取选手的Elo分变化历史（按比赛顺序）"""
+    player_id = db.session.query(Player.id).filter_by(name=player_name).scalar()
+    if player_id is None:
+        return jsonify({'error': '选手不存在'}), 404
+    
+    def compute():
+        history = RatingHistory.query.filter_by(player_id=player_id) \
+            .order_by(RatingHistory.rated_matches) \
+            .all()
+        return {'player': player_name, 'history': [entry.to_dict() for entry in history]}
+    
+    return cached_json_response(stats_cache_key('ratings', {'player': player_name}), compute)
+
+def calculate_player_pairs(player_id, params):
+    """按参数查询选手的配对统计"""
+    rows = db.session.query(PlayerPairStats, Player.name) \
+        .join(Player, Player.id == PlayerPairStats.other_player_id) \
+        .filter(PlayerPairStats.player_id == player_id,
+                PlayerPairStats.relation == PAIR_RELATIONS[params['relation']],
+                PlayerPairStats.matches >= params['min_matches']) \
+        .order_by(PAIR_SORT_KEYS[params['sort']].desc(), PlayerPairStats.matches.desc(), Player.name) \
+        .limit(params['limit']) \
+        .all()
+    
+    pairs = []
+    for pair, other_name in rows:
+        pairs.append({
+            'name': other_name,
+            'matches': pair.matches,
+            'wins': pair.wins,
+            'winRate': round(pair.wins / pair.matches * 100, 1),
+            'avgRatingPlus': round(pair.total_rating_plus / pair.matches, 2),
+            'avgOtherRatingPlus': round(pair.total_other_rating_plus / pair.matches, 2),
+            'combinedRatingPlus': round((pair.total_rating_plus + pair.total_other_rating_plus) / pair.matches, 2)
+        })
     
-    return sorted_leaderboard
+    return {'player': params['player'], 'relation': params['relation'], 'pairs': pairs}
+
+def export_filter_criteria(table, filters):
+    """导出的筛选条件：map, team, date_from, date_to 作用于比赛，player 只用于 player_matches"""
+    filters = dict(filters)
+    player_name = filters.pop('player', None)
+    filters = parse_stats_filters(filters)
+    
+    if table == 'player_matches':
+        criteria = match_filter_criteria(filters)
+        if player_name:
+            criteria.append(Player.name == player_name)
+        return criteria
+    
+    team = filters.pop('team', None)
+    criteria = match_filter_criteria(filters)
+    if team:
+        # 比赛导出按任一方队伍名匹配
+        criteria.append(or_(Match.team_a_name == team, Match.team_b_name == team))
+    return criteria
+
+@bp.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """流式导出比赛或选手比赛记录"""
+    # 查询参数: format (csv/ndjson/parquet), map, team, date_from, date_to, player
+    if table not in EXPORT_TABLES:
+        return jsonify({'error': '不支持导出该数据'}), 404
+    
+    export_format = request.args.get('format', 'csv')
+    try:
+        check_export_format(export_format)
+        filters = {key: request.args[key] for key in ('map', 'team', 'date_from', 'date_to', 'player')
+                   if request.args.get(key)}
+        criteria = export_filter_criteria(table, filters)
+    except ValueError as e:
+        return jsonify({'error': f'参数错误: {str(e)}'}), 400
+    
+    content_type, extension = EXPORT_FORMATS[export_format]
+    filename = f'{table}_{datetime.now().strftime("%Y%m%d%H%M%S")}.{extension}'
+    return Response(
+        stream_with_context(stream_export(table, export_format, criteria)),
+        content_type=content_type,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
-def calculate_headshot_maniac_leaderboard(players):
-    """计算爆头狂魔榜（按平均爆头率降序排列）"""
-    headshot_maniac_leaderboard = []
+def calculate_leaderboards(filters=None):
+    """计算所有榜单数据"""
+    filters = filters or {}
     
-    for player in players:
-        # 筛选条件：爆头率 ≥ 40% 且场均击杀 ≥ 10
-        tag = ''
-        if player['headshotRatio'] >= 60 and player['avgKills'] >= 10:
-            tag = '🔥【kuku爆头开了】'
-        elif player['headshotRatio'] >= 50 and player['avgKills'] >= 10:
-            tag = '💀【颅骨粉碎者】'
-        else:
-            tag = ''
-        if player['headshotRatio'] >= 40 and player['avgKills'] >= 10:
-            headshot_maniac_leaderboard.append({
-                'name': player['name'],
-                'score': player['headshotRatio'],
-                'headshotRatio': player['headshotRatio'],
-                'avgKills': player['avgKills'],
-                'tag': tag
-            })
+    if match_filter_criteria(filters):
+        # 按比赛筛选时实时汇总符合条件的记录
+        stats_rows = query_filtered_player_stats(filters)
+        context = {'loss_data': calculate_loss_data(stats_rows)}
+        return rank_leaderboards(calculate_players_data(stats_rows), context)
     
-    # 排序
-    sorted_leaderboard = sorted(headshot_maniac_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+    snapshot = current_app.extensions['snapshot_cache'].get(current_data_version())
     
-    return sorted_leaderboard
-
-def calculate_first_kill_assassin_leaderboard(players):
-    """计算突破刺客榜（按突破效率指数EI降序排列）"""
-    breakthrough_assassin_leaderboard = []
+    # 逆境英雄榜需要的败场数据
+    context = {'loss_data': snapshot.loss_data()}
     
-    for player in players:
-        # 计算突破效率指数EI
-        avg_first_kills = player['avgFirstKills']
-        avg_first_deaths = player['avgFirstDeaths']
-        avg_kd = player['kdRatio']
-        avg_adr = player['avgADR']
-        avg_kast = player['avgKAST']
-        
-        # 首杀成功率 = 平均首杀数 / (平均首杀数 + 平均首死数)
-        first_kill_success_rate = avg_first_kills / (avg_first_kills + avg_first_deaths + 0.1)
-        
-        # EI = (平均首杀数 × 首杀成功率^1.3) × (1 + (平均K/D - 1) / 3) × (1 - 平均首死数 / (平均首杀数 + 平均首死数 + 0.1)) × min(1.0, 平均ADR / 80)
-        ei = (avg_first_kills * (first_kill_success_rate ** 1.3)) * \
-             (1 + (avg_kd - 1) / 3) * \
-             (1 - avg_first_deaths / (avg_first_kills + avg_first_deaths + 0.1)) * \
-             min(1.0, avg_adr / 80)
-        
-        # 确定特效标签
-        tag = ''
-        if ei >= 0.8 and first_kill_success_rate >= 0.5:
-            tag = '💥【破门专家】'
-        elif avg_first_kills >= 0.7 and first_kill_success_rate < 0.4:
-            tag = '☠️【烈士型先锋】'
-        elif ei >= 0.7 and avg_kast >= 75:
-            tag = '🔄【全能突破手】'
-        elif first_kill_success_rate >= 0.55 and avg_adr >= 85:
-            tag = '🎯【高效尖刀】'
-        elif avg_first_deaths > avg_first_kills and avg_kd < 0.9:
-            tag = '🛑【伪突破手】'
-        else:
-            tag = '🔪【突破手】'
-        
-        # 筛选条件：总场次 ≥ 1 且有基本的首杀数据
-        if player['totalMatches'] >= 1 and (ei >0.3):
-            breakthrough_assassin_leaderboard.append({
-                'name': player['name'],
-                'score': round(ei, 2),
-                'ei': round(ei, 2),
-                'avgFirstKills': avg_first_kills,
-                'avgFirstDeaths': avg_first_deaths,
-                'firstKillSuccessRate': round(first_kill_success_rate * 100, 1),
-                'avgKD': round(avg_kd, 2),
-                'avgADR': round(avg_adr, 1),
-                'avgKAST': round(avg_kast, 1),
-                'tag': tag
-            })
+    return rank_leaderboards_columnar(snapshot, context, filters.get('min_matches', 1))
+
+def push_leaderboard_entry(heap, index, entry, ascending=False):
+    """将榜单条目放入最小堆，只保留前LEADERBOARD_SIZE名"""
+    # 同分时按选手原顺序（姓名）排序，与稳定排序结果一致；升序榜单以负分数比较
+    item = (-entry['score'] if ascending else entry['score'], -index, entry)
+    if len(heap) < LEADERBOARD_SIZE:
+        heapq.heappush(heap, item)
+    elif item[:2] > heap[0][:2]:
+        heapq.heapreplace(heap, item)
+
+def sorted_leaderboard(heap):
+    """按分数降序输出榜单条目"""
+    return [entry for _, _, entry in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+def rank_leaderboards(players, context=None):
+    """单次遍历所有选手，依次调用各榜单评分函数，每个榜单只保留前LEADERBOARD_SIZE名"""
+    heaps = {board: [] for board in LEADERBOARDS}
     
-    # 排序
-    sorted_leaderboard = sorted(breakthrough_assassin_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+    for index, player in enumerate(players):
+        for board, scorer in LEADERBOARDS.items():
+            entry = scorer(player, context)
+            if entry is not None:
+                push_leaderboard_entry(heaps[board], index, entry, board in ASCENDING_LEADERBOARDS)
     
-    return sorted_leaderboard
+    return {board: sorted_leaderboard(heap) for board, heap in heaps.items()}
 
-def calculate_immortal_warrior_leaderboard(players):
-    """计算生存榜（按survival_score降序排列）"""
-    immortal_warrior_leaderboard = []
-    
-    for player in players:
-        # 计算生存分数：综合考虑死亡数、KAST和Rating+
-        # 公式：生存分数 = (25 - 平均死亡数) * KAST * Rating+ / 25
-        base_survival = max(0, 25 - player['avgDeaths'])
-        survival_score = (base_survival / 25) * player['avgKAST'] * min(2.0, player['avgRatingPlus'])
-        
-        # 确定特效标签
-        tag = ''
-        if player['avgDeaths'] <= 12 and player['avgKAST'] >= 0.7 and player['avgRatingPlus'] >= 1.2:
-            tag = '🛡️【钢铁意志】'
-        elif player['avgDeaths'] <= 15 and player['avgKAST'] >= 0.75 and player['avgRatingPlus'] >= 1.0:
-            tag = '🎯【高效生存者】'
-        elif player['avgDeaths'] >= 18 and player['avgKAST'] >= 0.7:
-            tag = '☠️【送头王】'
-        elif player['avgKAST'] >= 0.65 and player['avgRatingPlus'] < 0.95:
-            tag = '🐢【龟甲战神】'
-        elif player['avgDeaths'] <= 10 and player['kdRatio'] >= 1.5:
-            tag = '⚔️【生存大师】'
+def rank_leaderboards_columnar(snapshot, context=None, min_matches=1):
+    """用快照的列数组为每个榜单预筛选并排序选手，只对排名靠前的候选调用评分函数生成条目
+    
+    结果与对所有选手执行 rank_leaderboards 相同：预筛选分数与评分函数使用相同的累计值、公式和舍入，
+    候选按预筛选分数从高到低评分，排在当前第LEADERBOARD_SIZE名之后时停止。
+    """
+    columns = snapshot.player_columns()
+    player_infos = snapshot.player_infos
+    eligible = columns['totalMatches'] >= min_matches
+    
+    def player_info(index):
+        info = player_infos.get(index)
+        if info is None:
+            info = player_infos[index] = build_player_info(snapshot.player_names[index],
+                                                           snapshot.player_totals(index))
+        return info
+    
+    leaderboards = {}
+    for board, scorer in LEADERBOARDS.items():
+        ascending = board in ASCENDING_LEADERBOARDS
+        prefilter = LEADERBOARD_PREFILTERS.get(board)
+        if prefilter is None:
+            # 没有向量化实现的榜单逐个评分
+            keys = None
+            candidates = np.flatnonzero(eligible).tolist()
         else:
-            tag = '🔰【普通生存者】'
+            scores, mask = prefilter(columns)
+            keys = -scores if ascending else scores
+            candidates = np.flatnonzero(mask & eligible)
+            # 排名从高到低，同分按姓名顺序
+            candidates = candidates[np.lexsort((candidates, -keys[candidates]))].tolist()
         
-        # 筛选条件：场均死亡 ≤ 20 且有一定KAST贡献
-        if player['avgDeaths'] <= 20 and player['avgKAST'] >= 0.6:
-            immortal_warrior_leaderboard.append({
-                'name': player['name'],
-                'score': round(survival_score, 2),
-                'survival_score': round(survival_score, 2),
-                'avgDeaths': player['avgDeaths'],
-                'kdRatio': round(player['kdRatio'], 2),
-                'avgKAST': round(player['avgKAST'] * 100, 1),
-                'tag': tag
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(immortal_warrior_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+        heap = []
+        for index in candidates:
+            # 之后的候选（排名更低或同分但姓名靠后）都不可能进榜
+            if keys is not None and len(heap) == LEADERBOARD_SIZE and (keys[index], -index) < heap[0][:2]:
+                break
+            entry = scorer(player_info(index), context)
+            if entry is not None:
+                push_leaderboard_entry(heap, index, entry, ascending)
+        leaderboards[board] = sorted_leaderboard(heap)
     
-    return sorted_leaderboard
+    return leaderboards
 
-def calculate_team_glue_leaderboard(players):
-    """计算团队粘合剂榜（按平均KAST降序排列）"""
-    team_glue_leaderboard = []
-    
-    for player in players:
-        # 筛选条件：KAST ≥ 65% 且助攻 ≥ 2（降低KAST要求）
-        tag = ''
-        if player['avgKAST'] >= 0.65 and player['avgAssists'] >= 2:
-            tag = '🤝【节奏引擎】'
-        else:
-            tag = ''
-        if player['avgKAST'] >= 0.55 and player['avgAssists'] >= 2:
-            team_glue_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgKAST'],
-                'avgKAST': player['avgKAST'],
-                'avgAssists': player['avgAssists'],
-                'tag': tag
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(team_glue_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+def score_mvp(player, context):
+    """MVP榜单（按平均Rating+降序排列）"""
+    # 筛选条件：至少1场比赛且Rating+ ≥ 1.0
+    if player['totalMatches'] >= 1 and player['avgRatingPlus'] >= 1.0:
+        return {
+            'name': player['name'],
+            'score': player['avgRatingPlus'],
+            'avgRatingPlus': player['avgRatingPlus'],
+            'totalMatches': player['totalMatches'],
+            'tag': '🏆【官方认证】'
+        }
+    return None
 
-def calculate_sniper_god_leaderboard(players):
-    """计算狙神天梯榜（按平均狙杀数×(平均爆头率/100)加权狙杀效率降序）"""
-    sniper_god_leaderboard = []
-    
-    for player in players:
-        # 计算狙神分数
-        # 由于没有狙击枪回合占比数据，简化为仅使用狙杀数
-        sniper_score = player['avgsniperkills'] * (player['headshotRatio'] / 100)
+def score_headshot_maniac(player, context):
+    """爆头狂魔榜（按平均爆头率降序排列）"""
+    # 筛选条件：爆头率 ≥ 40% 且场均击杀 ≥ 10
+    tag = ''
+    if player['headshotRatio'] >= 60 and player['avgKills'] >= 10:
+        tag = '🔥【kuku爆头开了】'
+    elif player['headshotRatio'] >= 50 and player['avgKills'] >= 10:
+        tag = '💀【颅骨粉碎者】'
+    else:
         tag = ''
-        if player['avgsniperkills'] >=8 and player['headshotRatio'] >= 40:
-            tag = '🎯【千里夺命】'
-        else:
-            tag = ''
-        # 筛选条件：场均狙杀 ≥ 2 且使用狙击枪回合占比 ≥ 30%（简化为狙杀数）
-        if player['avgsniperkills'] >= 5:
-            sniper_god_leaderboard.append({
-                'name': player['name'],
-                'score': round(sniper_score, 2),
-                'avgHeadshots': player['avgHeadshots'],
-                'headshotRatio': player['headshotRatio'],
-                'tag': tag
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(sniper_god_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+    if player['headshotRatio'] >= 40 and player['avgKills'] >= 10:
+        return {
+            'name': player['name'],
+            'score': player['headshotRatio'],
+            'headshotRatio': player['headshotRatio'],
+            'avgKills': player['avgKills'],
+            'tag': tag
+        }
+    return None
+
+def score_first_kill_assassin(player, context):
+    """突破刺客榜（按突破效率指数EI降序排列）"""
+    # 计算突破效率指数EI
+    avg_first_kills = player['avgFirstKills']
+    avg_first_deaths = player['avgFirstDeaths']
+    avg_kd = player['kdRatio']
+    avg_adr = player['avgADR']
+    avg_kast = player['avgKAST']
+    
+    # 首杀成功率 = 平均首杀数 / (平均首杀数 + 平均首死数)
+    first_kill_success_rate = avg_first_kills / (avg_first_kills + avg_first_deaths + 0.1)
+    
+    # EI = (平均首杀数 × 首杀成功率^1.3) × (1 + (平均K/D - 1) / 3) × (1 - 平均首死数 / (平均首杀数 + 平均首死数 + 0.1)) × min(1.0, 平均ADR / 80)
+    ei = (avg_first_kills * (first_kill_success_rate ** 1.3)) * \
+         (1 + (avg_kd - 1) / 3) * \
+         (1 - avg_first_deaths / (avg_first_kills + avg_first_deaths + 0.1)) * \
+         min(1.0, avg_adr / 80)
+    
+    # 筛选条件：总场次 ≥ 1 且有基本的首杀数据
+    if not (player['totalMatches'] >= 1 and (ei >0.3)):
+        return None
     
-    return sorted_leaderboard
+    # 确定特效标签
+    tag = ''
+    if ei >= 0.8 and first_kill_success_rate >= 0.5:
+        tag = '💥【破门专家】'
+    elif avg_first_kills >= 0.7 and first_kill_success_rate < 0.4:
+        tag = '☠️【烈士型先锋】'
+    elif ei >= 0.7 and avg_kast >= 75:
+        tag = '🔄【全能突破手】'
+    elif first_kill_success_rate >= 0.55 and avg_adr >= 85:
+        tag = '🎯【高效尖刀】'
+    elif avg_first_deaths > avg_first_kills and avg_kd < 0.9:
+        tag = '🛑【伪突破手】'
+    else:
+        tag = '🔪【突破手】'
+    
+    return {
+        'name': player['name'],
+        'score': round(ei, 2),
+        'ei': round(ei, 2),
+        'avgFirstKills': avg_first_kills,
+        'avgFirstDeaths': avg_first_deaths,
+        'firstKillSuccessRate': round(first_kill_success_rate * 100, 1),
+        'avgKD': round(avg_kd, 2),
+        'avgADR': round(avg_adr, 1),
+        'avgKAST': round(avg_kast, 1),
+        'tag': tag
+    }
 
-def calculate_economic_destroyer_leaderboard(players):
-    """计算经济破坏王榜（按平均ADR降序排列）"""
-    economic_destroyer_leaderboard = []
+def score_immortal_warrior(player, context):
+    """生存榜（按survival_score降序排列）"""
+    # 筛选条件：场均死亡 ≤ 20 且有一定KAST贡献
+    if not (player['avgDeaths'] <= 20 and player['avgKAST'] >= 0.6):
+        return None
     
-    for player in players:
-        # 筛选条件：ADR ≥ 85 且 Rating+ ≥ 1.0
+    # 计算生存分数：综合考虑死亡数、KAST和Rating+
+    # 公式：生存分数 = (25 - 平均死亡数) * KAST * Rating+ / 25
+    base_survival = max(0, 25 - player['avgDeaths'])
+    survival_score = (base_survival / 25) * player['avgKAST'] * min(2.0, player['avgRatingPlus'])
+    
+    # 确定特效标签
+    tag = ''
+    if player['avgDeaths'] <= 12 and player['avgKAST'] >= 0.7 and player['avgRatingPlus'] >= 1.2:
+        tag = '🛡️【钢铁意志】'
+    elif player['avgDeaths'] <= 15 and player['avgKAST'] >= 0.75 and player['avgRatingPlus'] >= 1.0:
+        tag = '🎯【高效生存者】'
+    elif player['avgDeaths'] >= 18 and player['avgKAST'] >= 0.7:
+        tag = '☠️【送头王】'
+    elif player['avgKAST'] >= 0.65 and player['avgRatingPlus'] < 0.95:
+        tag = '🐢【龟甲战神】'
+    elif player['avgDeaths'] <= 10 and player['kdRatio'] >= 1.5:
+        tag = '⚔️【生存大师】'
+    else:
+        tag = '🔰【普通生存者】'
+    
+    return {
+        'name': player['name'],
+        'score': round(survival_score, 2),
+        'survival_score': round(survival_score, 2),
+        'avgDeaths': player['avgDeaths'],
+        'kdRatio': round(player['kdRatio'], 2),
+        'avgKAST': round(player['avgKAST'] * 100, 1),
+        'tag': tag
+    }
+
+def score_team_glue(player, context):
+    """团队粘合剂榜（按平均KAST降序排列）"""
+    # 筛选条件：KAST ≥ 65% 且助攻 ≥ 2（降低KAST要求）
+    tag = ''
+    if player['avgKAST'] >= 0.65 and player['avgAssists'] >= 2:
+        tag = '🤝【节奏引擎】'
+    else:
         tag = ''
-        if player['avgADR'] >= 110 and player['avgRatingPlus'] >= 1.0:
-            tag = '💥【一键扫荡】'
-        elif player['avgADR'] >= 95 and player['avgRatingPlus'] >= 1.0:
-            tag = '💸【弹药富翁】'
-        else:
-            tag = ''
-        if player['avgADR'] >= 85 and player['avgRatingPlus'] >= 1.0:
-            economic_destroyer_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgADR'],
-                'avgADR': player['avgADR'],
-                'avgRatingPlus': player['avgRatingPlus'],
-                'tag': tag
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(economic_destroyer_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+    if player['avgKAST'] >= 0.55 and player['avgAssists'] >= 2:
+        return {
+            'name': player['name'],
+            'score': player['avgKAST'],
+            'avgKAST': player['avgKAST'],
+            'avgAssists': player['avgAssists'],
+            'tag': tag
+        }
+    return None
 
+def score_sniper_god(player, context):
+    """狙神天梯榜（按平均狙杀数×(平均爆头率/100)加权狙杀效率降序）"""
+    # 计算狙神分数
+    # 由于没有狙击枪回合占比数据，简化为仅使用狙杀数
+    sniper_score = player['avgsniperkills'] * (player['headshotRatio'] / 100)
+    tag = ''
+    if player['avgsniperkills'] >=8 and player['headshotRatio'] >= 40:
+        tag = '🎯【千里夺命】'
+    else:
+        tag = ''
+    # 筛选条件：场均狙杀 ≥ 2 且使用狙击枪回合占比 ≥ 30%（简化为狙杀数）
+    if player['avgsniperkills'] >= 5:
+        return {
+            'name': player['name'],
+            'score': round(sniper_score, 2),
+            'avgHeadshots': player['avgHeadshots'],
+            'headshotRatio': player['headshotRatio'],
+            'tag': tag
+        }
+    return None
 
-def calculate_steady_player_leaderboard(players):
-    """计算稳定如狗榜（按Rating+标准差升序排列）"""
-    # 注意：由于我们没有单场比赛的Rating+数据，无法计算标准差
-    # 这里简化为使用平均Rating+的稳定性，实际应用中需要修改数据收集逻辑
-    steady_player_leaderboard = []
-    
-    for player in players:
-        # 确定特效标签
-        if player['avgRatingPlus'] >= 1.3:
-            tag = '🔪【超级主C】'
-        elif player['avgRatingPlus'] >= 1.1:
-            tag = '📊【人形自走AI】'
-        else:
-            tag = ''
-            
-        # 筛选条件：平均Rating+ ≥ 0.85（简化实现）
-        if player['avgRatingPlus'] >= 1:
-            steady_player_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgRatingPlus'],
-                'avgRatingPlus': player['avgRatingPlus'],
-                'tag': tag
-            })
-    
-    # 排序（由于无法计算标准差，这里按平均Rating+降序排列）
-    sorted_leaderboard = sorted(steady_player_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+def score_economic_destroyer(player, context):
+    """经济破坏王榜（按平均ADR降序排列）"""
+    # 筛选条件：ADR ≥ 85 且 Rating+ ≥ 1.0
+    tag = ''
+    if player['avgADR'] >= 110 and player['avgRatingPlus'] >= 1.0:
+        tag = '💥【一键扫荡】'
+    elif player['avgADR'] >= 95 and player['avgRatingPlus'] >= 1.0:
+        tag = '💸【弹药富翁】'
+    else:
+        tag = ''
+    if player['avgADR'] >= 85 and player['avgRatingPlus'] >= 1.0:
+        return {
+            'name': player['name'],
+            'score': player['avgADR'],
+            'avgADR': player['avgADR'],
+            'avgRatingPlus': player['avgRatingPlus'],
+            'tag': tag
+        }
+    return None
 
 
-def calculate_high_risk_high_reward_leaderboard(players):
-    """计算击杀效率榜（按KES降序排列）"""
-    high_risk_high_reward_leaderboard = []
-    
-    for player in players:
-        # 计算击杀效率分数KES
-        # KES = (平均击杀 × ADR / 80) × min(1.2, 平均K/D) × (平均Rating+ / 1.0) × (平均RWS)
-        kes = (player['avgKills'] * player['avgADR'] / 80) * \
-              min(1, player['kdRatio']) * \
-              (player['avgRatingPlus'] / 1.0) * \
-              (player['avgRWS']/500)
-        
-        # 确定特效标签
+def score_steady_player(player, context):
+    """稳定如狗榜（按单场Rating+标准差升序排列）"""
+    # 确定特效标签
+    if player['avgRatingPlus'] >= 1.3:
+        tag = '🔪【超级主C】'
+    elif player['avgRatingPlus'] >= 1.1:
+        tag = '📊【人形自走AI】'
+    else:
         tag = ''
-        if kes >= 1.8 and player['avgADR'] >= 85:
-            tag = '⚡【高效收割者】'
-        elif player['avgKills'] >= 20 and kes < 1.2:
-            tag = '💥【暴力输出机】'
-        elif kes >= 1.6 and player['kdRatio'] >= 1.1:
-            tag = '🎯【精英杀手】'
-        elif player['avgKills'] >= 18:
-            tag = '🚫【数据泡沫】'
-        else:
-            tag = '🔰【普通杀手】'
         
-        # 进榜条件：平均击杀 ≥ 12
-        if player['avgKills'] >= 12:
-            high_risk_high_reward_leaderboard.append({
-                'name': player['name'],
-                'score': round(kes, 2),
-                'kes': round(kes, 2),
-                'avgKills': player['avgKills'],
-                'avgADR': round(player['avgADR'], 1),
-                'kdRatio': round(player['kdRatio'], 2),
-                'avgRatingPlus': round(player['avgRatingPlus'], 2),
-                'avgRWS': round(player['avgRWS'], 1),
-                'tag': tag
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(high_risk_high_reward_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+    # 筛选条件：场次足够计算有意义的标准差，且平均Rating+ ≥ 1.0
+    if player['totalMatches'] >= STEADY_MIN_MATCHES and player['avgRatingPlus'] >= 1:
+        return {
+            'name': player['name'],
+            'score': player['stdRatingPlus'],
+            'stdRatingPlus': player['stdRatingPlus'],
+            'avgRatingPlus': player['avgRatingPlus'],
+            'totalMatches': player['totalMatches'],
+            'tag': tag
+        }
+    return None
 
 
-def calculate_no_free_wins_leaderboard(players):
-    """计算躺赢绝缘体榜（按胜场中个人Rating+与队伍平均Rating+的差值降序）"""
-    # 注意：由于我们没有队伍级别的数据，无法计算队伍平均Rating+
-    # 这里简化为使用个人平均Rating+，实际应用中需要修改数据收集逻辑
-    no_free_wins_leaderboard = []
-    
-    for player in players:
-        # 筛选条件：平均Rating+ ≥ 1.0（简化实现）
-        if player['avgRatingPlus'] >= 1.0 and player['avgKAST'] >= 0.63 and player["avgRWS"] >= 10:
-            no_free_wins_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgRatingPlus'],
-                'avgRatingPlus': player['avgRatingPlus'],
-                'tag': '🚫【从不混子】'
-            })
-    
-    # 排序（由于无法计算差值，这里按平均Rating+降序排列）
-    sorted_leaderboard = sorted(no_free_wins_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+def score_high_risk_high_reward(player, context):
+    """击杀效率榜（按KES降序排列）"""
+    # 进榜条件：平均击杀 ≥ 12
+    if player['avgKills'] < 12:
+        return None
     
-    return sorted_leaderboard
+    # 计算击杀效率分数KES
+    # KES = (平均击杀 × ADR / 80) × min(1.2, 平均K/D) × (平均Rating+ / 1.0) × (平均RWS)
+    kes = (player['avgKills'] * player['avgADR'] / 80) * \
+          min(1, player['kdRatio']) * \
+          (player['avgRatingPlus'] / 1.0) * \
+          (player['avgRWS']/500)
+    
+    # 确定特效标签
+    tag = ''
+    if kes >= 1.8 and player['avgADR'] >= 85:
+        tag = '⚡【高效收割者】'
+    elif player['avgKills'] >= 20 and kes < 1.2:
+        tag = '💥【暴力输出机】'
+    elif kes >= 1.6 and player['kdRatio'] >= 1.1:
+        tag = '🎯【精英杀手】'
+    elif player['avgKills'] >= 18:
+        tag = '🚫【数据泡沫】'
+    else:
+        tag = '🔰【普通杀手】'
+    
+    return {
+        'name': player['name'],
+        'score': round(kes, 2),
+        'kes': round(kes, 2),
+        'avgKills': player['avgKills'],
+        'avgADR': round(player['avgADR'], 1),
+        'kdRatio': round(player['kdRatio'], 2),
+        'avgRatingPlus': round(player['avgRatingPlus'], 2),
+        'avgRWS': round(player['avgRWS'], 1),
+        'tag': tag
+    }
 
 
-def calculate_rws_dominance_leaderboard(players):
-    """计算RWS统治力榜（按平均RWS降序排列）"""
-    rws_dominance_leaderboard = []
-    
-    for player in players:
-        # 筛选条件：RWS ≥ 12（根据榜单描述）
-        if player['avgRWS'] >= 12:
-            rws_dominance_leaderboard.append({
-                'name': player['name'],
-                'score': player['avgRWS'],
-                'avgRWS': player['avgRWS'],
-                'tag': '👑【残局之神】'
-            })
-    
-    # 排序
-    sorted_leaderboard = sorted(rws_dominance_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+def score_no_free_wins(player, context):
+    """躺赢绝缘体榜（按胜场中个人Rating+与队伍平均Rating+的差值降序）"""
+    # 筛选条件：至少NO_FREE_WINS_MIN_WINS场胜场，且胜场中平均高于队伍平均
+    if player['totalWinMatches'] >= NO_FREE_WINS_MIN_WINS and player['avgWinRatingPlusDiff'] > 0:
+        return {
+            'name': player['name'],
+            'score': player['avgWinRatingPlusDiff'],
+            'avgWinRatingPlusDiff': player['avgWinRatingPlusDiff'],
+            'totalWinMatches': player['totalWinMatches'],
+            'avgRatingPlus': player['avgRatingPlus'],
+            'tag': '🚫【从不混子】'
+        }
+    return None
 
 
-def calculate_adversity_hero_leaderboard(players):
-    """计算逆境英雄榜（在选手败场中，按败场中的平均Rating+降序）"""
-    # 注意：由于我们没有记录每场比赛的胜负情况，无法准确计算败场中的平均Rating+
-    # 这里简化为使用所有比赛的平均Rating+，实际应用中需要修改数据收集逻辑
-    adversity_hero_leaderboard = []
-    
-    # 查询所有选手的比赛记录，统计败场数据
-    player_matches = PlayerMatch.query.all()
+def score_elo_ladder(player, context):
+    """天梯榜（按Elo分降序排列）"""
+    # 筛选条件：至少ELO_MIN_MATCHES场计入Elo的比赛
+    if player['eloMatches'] >= ELO_MIN_MATCHES:
+        return {
+            'name': player['name'],
+            'score': player['eloRating'],
+            'eloRating': player['eloRating'],
+            'eloMatches': player['eloMatches'],
+            'tag': '📈【天梯之巅】'
+        }
+    return None
+
+
+def score_rws_dominance(player, context):
+    """RWS统治力榜（按平均RWS降序排列）"""
+    # 筛选条件：RWS ≥ 12（根据榜单描述）
+    if player['avgRWS'] >= 12:
+        return {
+            'name': player['name'],
+            'score': player['avgRWS'],
+            'avgRWS': player['avgRWS'],
+            'tag': '👑【残局之神】'
+        }
+    return None
+
+
+def calculate_loss_data(stats_rows):
+    """从累计统计记录中取出每名选手败场的Rating+总和与败场数"""
     loss_data = {}
     
-    for pm in player_matches:
-        player_name = pm.player.name
-        match = pm.match
-        
-        # 确定选手所在队伍是否失败
-        player_team = pm.team
-        team_a_win = match.team_a_score > match.team_b_score
-        is_loss = (player_team == 'A' and not team_a_win) or (player_team == 'B' and team_a_win)
-        
-        if is_loss:
-            if player_name not in loss_data:
-                loss_data[player_name] = {
-                    'totalRatingPlus': 0.0,
-                    'totalLossMatches': 0
-                }
-            loss_data[player_name]['totalRatingPlus'] += pm.rating_plus
-            loss_data[player_name]['totalLossMatches'] += 1
+    for stats, player_name in stats_rows:
+        if stats.total_loss_matches:
+            loss_data[player_name] = {
+                'totalRatingPlus': stats.total_loss_rating_plus,
+                'totalLossMatches': stats.total_loss_matches
+            }
     
-    for player in players:
-        player_name = player['name']
+    return loss_data
+
+
+def score_adversity_hero(player, context):
+    """逆境英雄榜（在选手败场中，按败场中的平均Rating+降序）"""
+    loss_data = context['loss_data']
+    player_name = player['name']
+    
+    # 检查该选手是否有败场记录
+    if player_name in loss_data and loss_data[player_name]['totalLossMatches'] >= 1:
+        avg_loss_rating_plus = loss_data[player_name]['totalRatingPlus'] / loss_data[player_name]['totalLossMatches']
         
-        # 检查该选手是否有败场记录
-        if player_name in loss_data and loss_data[player_name]['totalLossMatches'] >= 1:
-            avg_loss_rating_plus = loss_data[player_name]['totalRatingPlus'] / loss_data[player_name]['totalLossMatches']
-            
-            # 筛选条件：至少参与1场败局，且败场Rating+ ≥ 1.1
-            if avg_loss_rating_plus >= 1.1:
-                adversity_hero_leaderboard.append({
-                    'name': player_name,
-                    'score': round(avg_loss_rating_plus, 2),
-                    'avgLossRatingPlus': round(avg_loss_rating_plus, 2),
-                    'totalLossMatches': loss_data[player_name]['totalLossMatches'],
-                    'tag': '🌪️【孤胆救世主】'
-                })
-    
-    # 排序
-    sorted_leaderboard = sorted(adversity_hero_leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-    
-    return sorted_leaderboard
+        # 筛选条件：至少参与1场败局，且败场Rating+ ≥ 1.1
+        if avg_loss_rating_plus >= 1.1:
+            return {
+                'name': player_name,
+                'score': round(avg_loss_rating_plus, 2),
+                'avgLossRatingPlus': round(avg_loss_rating_plus, 2),
+                'totalLossMatches': loss_data[player_name]['totalLossMatches'],
+                'tag': '🌪️【孤胆救世主】'
+            }
+    return None
+
+
+# 榜单预筛选：与评分函数相同的进榜条件和分数公式，对所有选手的列数组一次计算
+# 返回 (分数数组, 进榜掩码)，分数必须与评分函数返回的score完全一致（包括舍入）
+def prefilter_mvp(columns):
+    rating_plus = columns['avgRatingPlus']
+    return rating_plus, (columns['totalMatches'] >= 1) & (rating_plus >= 1.0)
+
+def prefilter_headshot_maniac(columns):
+    headshot_ratio = columns['headshotRatio']
+    return headshot_ratio, (headshot_ratio >= 40) & (columns['avgKills'] >= 10)
+
+def prefilter_first_kill_assassin(columns):
+    avg_first_kills = columns['avgFirstKills']
+    avg_first_deaths = columns['avgFirstDeaths']
+    first_kill_success_rate = avg_first_kills / (avg_first_kills + avg_first_deaths + 0.1)
+    ei = (avg_first_kills * (first_kill_success_rate ** 1.3)) * \
+         (1 + (columns['kdRatio'] - 1) / 3) * \
+         (1 - avg_first_deaths / (avg_first_kills + avg_first_deaths + 0.1)) * \
+         np.minimum(1.0, columns['avgADR'] / 80)
+    return py_round(ei, 2), (columns['totalMatches'] >= 1) & (ei > 0.3)
+
+def prefilter_immortal_warrior(columns):
+    base_survival = np.maximum(0, 25 - columns['avgDeaths'])
+    survival_score = (base_survival / 25) * columns['avgKAST'] * np.minimum(2.0, columns['avgRatingPlus'])
+    return py_round(survival_score, 2), (columns['avgDeaths'] <= 20) & (columns['avgKAST'] >= 0.6)
+
+def prefilter_team_glue(columns):
+    return columns['avgKAST'], (columns['avgKAST'] >= 0.55) & (columns['avgAssists'] >= 2)
+
+def prefilter_sniper_god(columns):
+    sniper_score = columns['avgsniperkills'] * (columns['headshotRatio'] / 100)
+    return py_round(sniper_score, 2), columns['avgsniperkills'] >= 5
+
+def prefilter_economic_destroyer(columns):
+    return columns['avgADR'], (columns['avgADR'] >= 85) & (columns['avgRatingPlus'] >= 1.0)
+
+def prefilter_adversity_hero(columns):
+    loss_matches = columns['totalLossMatches']
+    has_loss = loss_matches >= 1
+    avg_loss_rating_plus = np.divide(columns['totalLossRatingPlus'], loss_matches,
+                                     out=np.zeros(len(loss_matches)), where=has_loss)
+    return py_round(avg_loss_rating_plus, 2), has_loss & (avg_loss_rating_plus >= 1.1)
+
+def prefilter_steady_player(columns):
+    mask = (columns['totalMatches'] >= STEADY_MIN_MATCHES) & (columns['avgRatingPlus'] >= 1)
+    return columns['stdRatingPlus'], mask
+
+def prefilter_high_risk_high_reward(columns):
+    kes = (columns['avgKills'] * columns['avgADR'] / 80) * \
+          np.minimum(1, columns['kdRatio']) * \
+          (columns['avgRatingPlus'] / 1.0) * \
+          (columns['avgRWS'] / 500)
+    return py_round(kes, 2), columns['avgKills'] >= 12
+
+def prefilter_no_free_wins(columns):
+    diff = columns['avgWinRatingPlusDiff']
+    return diff, (columns['totalWinMatches'] >= NO_FREE_WINS_MIN_WINS) & (diff > 0)
+
+def prefilter_rws_dominance(columns):
+    return columns['avgRWS'], columns['avgRWS'] >= 12
+
+def prefilter_elo_ladder(columns):
+    return columns['eloRating'], columns['eloMatches'] >= ELO_MIN_MATCHES
+
+
+# 每个榜单保留的名次数
+LEADERBOARD_SIZE = 10
+
+# 稳定如狗榜的最少场次
+STEADY_MIN_MATCHES = 5
+
+# 躺赢绝缘体榜的最少胜场数
+NO_FREE_WINS_MIN_WINS = 3
+
+# 天梯榜的最少场次
+ELO_MIN_MATCHES = 3
+
+# 按分数升序排列的榜单（其余榜单分数越高排名越前）
+ASCENDING_LEADERBOARDS = {'steady_player'}
+
+# 榜单注册表：榜单键 -> 评分函数（返回榜单条目，不进榜返回None）
+LEADERBOARDS = {
+    'mvp': score_mvp,
+    'headshot_maniac': score_headshot_maniac,
+    'first_kill_assassin': score_first_kill_assassin,
+    'immortal_warrior': score_immortal_warrior,
+    'team_glue': score_team_glue,
+    'sniper_god': score_sniper_god,
+    'economic_destroyer': score_economic_destroyer,
+    'adversity_hero': score_adversity_hero,
+    'steady_player': score_steady_player,
+    'high_risk_high_reward': score_high_risk_high_reward,
+    'no_free_wins': score_no_free_wins,
+    'rws_dominance': score_rws_dominance,
+    'elo_ladder': score_elo_ladder
+}
+
+# 榜单键 -> 向量化预筛选函数（未登记的榜单对所有选手逐个评分）
+LEADERBOARD_PREFILTERS = {
+    'mvp': prefilter_mvp,
+    'headshot_maniac': prefilter_headshot_maniac,
+    'first_kill_assassin': prefilter_first_kill_assassin,
+    'immortal_warrior': prefilter_immortal_warrior,
+    'team_glue': prefilter_team_glue,
+    'sniper_god': prefilter_sniper_god,
+    'economic_destroyer': prefilter_economic_destroyer,
+    'adversity_hero': prefilter_adversity_hero,
+    'steady_player': prefilter_steady_player,
+    'high_risk_high_reward': prefilter_high_risk_high_reward,
+    'no_free_wins': prefilter_no_free_wins,
+    'rws_dominance': prefilter_rws_dominance,
+    'elo_ladder': prefilter_elo_ladder
+}
 
 
 if __name__ == '__main__':
+    app = create_app()
+    init_database(app)
+    # 调试模式的重载器父进程只负责监视文件变化，后台解析线程只在实际处理请求的子进程中启动
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers(app)
     app.run(debug=True, host='0.0.0.0', port=5002)
\ No newline at end of file
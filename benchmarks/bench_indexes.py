@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""索引迁移前后的查询耗时对比
+
+在临时SQLite库中生成数据，分别在无索引（旧库）和执行迁移后，
+测量比赛详情、删除比赛、比赛列表所用SQL的耗时。
+
+用法: python benchmarks/bench_indexes.py [--matches 10000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from models import db
+from migrations import run_migrations
+
+PLAYERS_PER_MATCH = 10
+
+
+def seed(db_path, match_count, seed_value=42):
+    """生成比赛和选手比赛记录"""
+    engine = create_engine(f'sqlite:///{db_path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed_value)
+    connection = sqlite3.connect(db_path)
+    player_count = max(PLAYERS_PER_MATCH, match_count // 30)
+    now = datetime(2025, 1, 1)
+    connection.executemany(
+        'INSERT INTO players (id, name, created_at) VALUES (?, ?, ?)',
+        [(i, f'player{i}', now) for i in range(1, player_count + 1)]
+    )
+
+    matches = []
+    player_matches = []
+    for match_id in range(1, match_count + 1):
+        # 上传顺序与比赛日期不完全一致
+        date = now + timedelta(minutes=match_id * 30 + rng.randint(-600, 600))
+        score_a, score_b = 13, rng.randint(0, 11)
+        matches.append((match_id, f'比赛{match_id}', 'Mirage', date, f'uploads/{match_id}.xlsx',
+                        'TeamA', 'TeamB', score_a, score_b, now))
+        for index, player_id in enumerate(rng.sample(range(1, player_count + 1), PLAYERS_PER_MATCH)):
+            team = 'A' if index < 5 else 'B'
+            player_matches.append((player_id, match_id, team, 'W' if team == 'A' else 'L',
+                                   rng.randint(5, 30), rng.randint(5, 25), rng.randint(0, 10),
+                                   rng.uniform(0.5, 1.8), rng.uniform(40, 130), now))
+
+    connection.executemany(
+        'INSERT INTO matches (id, name, map, date, file_path, team_a_name, team_b_name, '
+        'team_a_score, team_b_score, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', matches)
+    connection.executemany(
+        'INSERT INTO player_matches (player_id, match_id, team, result, kills, deaths, assists, '
+        'rating_plus, adr, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', player_matches)
+    connection.commit()
+    connection.close()
+
+
+def drop_indexes(db_path):
+    """模拟迁移前的旧库：删除迁移创建的索引并重置版本号"""
+    connection = sqlite3.connect(db_path)
+    connection.execute('DROP INDEX IF EXISTS ix_player_matches_match_id')
+    connection.execute('DROP INDEX IF EXISTS ix_matches_date')
+    connection.execute('PRAGMA user_version = 0')
+    connection.commit()
+    connection.close()
+
+
+def timed(func, repeat):
+    """返回单次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run_queries(db_path, match_count, repeat):
+    """测量各接口对应SQL的耗时"""
+    connection = sqlite3.connect(db_path)
+    rng = random.Random(7)
+
+    def match_detail():
+        match_id = rng.randint(1, match_count)
+        connection.execute('SELECT * FROM matches WHERE id = ?', (match_id,)).fetchone()
+        connection.execute('SELECT * FROM player_matches WHERE match_id = ?', (match_id,)).fetchall()
+
+    def delete_match():
+        match_id = rng.randint(1, match_count)
+        connection.execute('SELECT player_id FROM player_matches WHERE match_id = ?', (match_id,)).fetchall()
+        connection.execute('DELETE FROM player_matches WHERE match_id = ?', (match_id,))
+        connection.execute('DELETE FROM matches WHERE id = ?', (match_id,))
+        connection.rollback()
+
+    def match_list():
+        connection.execute('SELECT * FROM matches ORDER BY date DESC').fetchall()
+
+    def match_list_first_page():
+        connection.execute('SELECT * FROM matches ORDER BY date DESC LIMIT 50').fetchall()
+
+    results = {
+        'get_match_detail': timed(match_detail, repeat),
+        'delete_match': timed(delete_match, repeat),
+        'get_matches (全部)': timed(match_list, max(1, repeat // 40)),
+        'get_matches (前50条)': timed(match_list_first_page, repeat),
+    }
+    connection.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='索引迁移前后的查询耗时对比')
+    parser.add_argument('--matches', type=int, default=10000, help='比赛数量（每场10条选手记录）')
+    parser.add_argument('--repeat', type=int, default=200, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        seed(db_path, args.matches)
+        print(f'比赛: {args.matches}, 选手比赛记录: {args.matches * PLAYERS_PER_MATCH}')
+
+        drop_indexes(db_path)
+        before = run_queries(db_path, args.matches, args.repeat)
+
+        engine = create_engine(f'sqlite:///{db_path}')
+        run_migrations(engine)
+        engine.dispose()
+        after = run_queries(db_path, args.matches, args.repeat)
+
+    print(f'{"操作":<24}{"迁移前(ms)":>12}{"迁移后(ms)":>12}')
+    for name in before:
+        print(f'{name:<24}{before[name]:>12.3f}{after[name]:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
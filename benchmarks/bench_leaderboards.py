@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""榜单计算耗时：逐选手评分 vs 列式快照
+
+在临时SQLite库中生成数据，比较：
+- 原实现：读取累计统计表生成每名选手的数据字典，再对每名选手调用所有榜单评分函数；
+- 列式快照：构建快照（每个数据版本一次），之后每次计算榜单只做数组运算和少量候选评分。
+两种方式的榜单结果必须完全一致。
+
+用法: python benchmarks/bench_leaderboards.py [--matches 30000] [--players 1000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine
+
+import app as tracker
+from columnar import PlayerMatchSnapshot
+from models import db
+
+PLAYERS_PER_MATCH = 10
+
+
+def seed(db_path, match_count, player_count, seed_value=42):
+    """生成比赛和选手比赛记录（所有统计字段）"""
+    engine = create_engine(f'sqlite:///{db_path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed_value)
+    connection = sqlite3.connect(db_path)
+    now = datetime(2025, 1, 1)
+    connection.executemany(
+        'INSERT INTO players (id, name, created_at) VALUES (?, ?, ?)',
+        [(i, f'player{i}', now) for i in range(1, player_count + 1)]
+    )
+
+    matches = []
+    player_matches = []
+    for match_id in range(1, match_count + 1):
+        score_a, score_b = rng.choice([(13, rng.randint(0, 11)), (rng.randint(0, 11), 13), (12, 12)])
+        matches.append((match_id, f'比赛{match_id}', 'Mirage', now, f'uploads/{match_id}.xlsx',
+                        'TeamA', 'TeamB', score_a, score_b, now))
+        for index, player_id in enumerate(rng.sample(range(1, player_count + 1), PLAYERS_PER_MATCH)):
+            team = 'A' if index < 5 else 'B'
+            own, other = (score_a, score_b) if team == 'A' else (score_b, score_a)
+            result = 'W' if own > other else 'L' if own < other else 'D'
+            kills = rng.randint(5, 30)
+            player_matches.append((
+                player_id, match_id, team, result, kills, rng.randint(5, 25), rng.randint(0, 10),
+                rng.randint(0, kills), rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 8),
+                round(rng.uniform(0.5, 1.8), 2), round(rng.uniform(40, 130), 1),
+                round(rng.uniform(2, 20), 1), round(rng.uniform(0.4, 0.9), 2), now
+            ))
+
+    connection.executemany(
+        'INSERT INTO matches (id, name, map, date, file_path, team_a_name, team_b_name, '
+        'team_a_score, team_b_score, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', matches)
+    connection.executemany(
+        'INSERT INTO player_matches (player_id, match_id, team, result, kills, deaths, assists, '
+        'headshots, first_kills, first_deaths, sniper_kills, rating_plus, adr, rws, kast, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', player_matches)
+    connection.execute(
+        'INSERT INTO match_team_stats (match_id, team, player_count, avg_rating_plus, avg_adr, avg_kast, total_kills) '
+        'SELECT match_id, team, COUNT(*), AVG(rating_plus), AVG(adr), AVG(kast), SUM(kills) '
+        'FROM player_matches GROUP BY match_id, team')
+    connection.commit()
+    connection.close()
+
+
+def timed(func, repeat):
+    """返回 (单次调用的平均耗时（毫秒）, 最后一次的返回值)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) * 1000 / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='榜单计算耗时：逐选手评分 vs 列式快照')
+    parser.add_argument('--matches', type=int, default=30000, help='比赛数量（每场10条选手记录）')
+    parser.add_argument('--players', type=int, default=1000, help='选手数量')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测量的重复次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'bench.db')
+        seed(db_path, args.matches, args.players)
+
+        bench_app = Flask(__name__)
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+        db.init_app(bench_app)
+
+        with bench_app.app_context():
+            tracker.rebuild_player_stats()
+            db.session.commit()
+
+            def scalar_leaderboards():
+                stats_rows = tracker.query_player_stats()
+                context = {'loss_data': tracker.calculate_loss_data(stats_rows)}
+                return tracker.rank_leaderboards(tracker.calculate_players_data(stats_rows), context)
+
+            def columnar_leaderboards():
+                return tracker.rank_leaderboards_columnar(snapshot, {'loss_data': snapshot.loss_data()})
+
+            scalar_ms, expected = timed(scalar_leaderboards, args.repeat)
+            build_ms, snapshot = timed(lambda: PlayerMatchSnapshot.build(0), max(1, args.repeat // 5))
+            # 每次都用新快照，避免衍生列和选手数据缓存影响结果
+            columnar_ms, actual = timed(
+                lambda: tracker.rank_leaderboards_columnar(
+                    PlayerMatchSnapshot(0, snapshot.rows, snapshot.match_fields, snapshot.names, snapshot.ratings),
+                    {'loss_data': snapshot.loss_data()}),
+                args.repeat)
+            cached_ms, _ = timed(columnar_leaderboards, args.repeat)
+
+            # 上传一场比赛后增量刷新快照（只读取新增的10条记录）
+            connection = db.session.connection().connection
+            connection.execute(
+                'INSERT INTO player_matches (player_id, match_id, team, result, kills, deaths, assists, '
+                'rating_plus, adr, created_at) SELECT player_id, match_id + ?, team, result, kills, deaths, '
+                'assists, rating_plus, adr, created_at FROM player_matches WHERE match_id = 1',
+                (args.matches,))
+            refresh_ms, _ = timed(lambda: PlayerMatchSnapshot.build(1, snapshot), max(1, args.repeat // 5))
+            db.session.rollback()
+
+    print(f'选手比赛记录: {args.matches * PLAYERS_PER_MATCH}, 选手: {args.players}')
+    print(f'{"方式":<32}{"耗时(ms)":>12}')
+    print(f'{"逐选手评分（原实现）":<32}{scalar_ms:>12.3f}')
+    print(f'{"构建快照（每个数据版本一次）":<32}{build_ms:>12.3f}')
+    print(f'{"增量刷新快照（新增一场比赛）":<32}{refresh_ms:>12.3f}')
+    print(f'{"快照榜单（含聚合）":<32}{columnar_ms:>12.3f}')
+    print(f'{"快照榜单（同一快照重复计算）":<32}{cached_ms:>12.3f}')
+    print('结果一致' if actual == expected else '结果不一致！')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""导入应用模块的耗时检查
+
+在临时目录的全新子进程中导入 app，检查：
+- 导入时不加载 pandas、openpyxl（只在解析Excel时导入）；
+- 导入时不创建数据库、上传目录等文件；
+- 应用的导入耗时（含 numpy，不含 flask、flask_sqlalchemy 这些Web框架本身的导入耗时）不超过 --max-ms。
+任一项不满足时退出码为1。tests/test_startup.py 用同样的方法检查。
+
+用法: python benchmarks/bench_startup.py [--repeat 5] [--max-ms 500]
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入时不应加载的模块
+LAZY_MODULES = ('pandas', 'openpyxl')
+
+# 应用导入耗时上限（毫秒）
+MAX_IMPORT_MS = 500
+
+# 子进程：先导入Web框架，再导入 app，分别计时
+IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import flask, flask_sqlalchemy
+dependencies = time.perf_counter()
+import app
+end = time.perf_counter()
+print(json.dumps({
+    'dependencies_ms': (dependencies - start) * 1000,
+    'app_ms': (end - dependencies) * 1000,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+''' % (LAZY_MODULES,)
+
+
+def copy_app_sources(work_dir):
+    """把应用代码（仓库根目录的 *.py）复制到 work_dir"""
+    for path in glob.glob(os.path.join(REPO_DIR, '*.py')):
+        shutil.copy(path, work_dir)
+
+
+def summarize_imports(samples):
+    """返回 (框架导入耗时中位数, 应用导入耗时中位数, 导入时加载了的模块)"""
+    dependencies_ms = statistics.median(sample['dependencies_ms'] for sample in samples)
+    app_ms = statistics.median(sample['app_ms'] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample['loaded']})
+    return dependencies_ms, app_ms, loaded
+
+
+def measure_import(work_dir):
+    """在全新进程中导入一次，返回子进程输出的计时结果（最后一行，之前可能有导入时的输出）"""
+    completed = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=work_dir,
+                               stdout=subprocess.PIPE, check=True)
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入应用模块的耗时检查')
+    parser.add_argument('--repeat', type=int, default=5, help='导入次数（取中位数）')
+    parser.add_argument('--max-ms', type=float, default=MAX_IMPORT_MS, help='应用导入耗时上限（毫秒）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        copy_app_sources(work_dir)
+        before = set(os.listdir(work_dir))
+        samples = [measure_import(work_dir) for _ in range(args.repeat)]
+        created = sorted(set(os.listdir(work_dir)) - before - {'__pycache__'})
+
+    dependencies_ms, app_ms, loaded = summarize_imports(samples)
+
+    print(f'flask/flask_sqlalchemy 导入耗时（中位数）: {dependencies_ms:.1f}ms')
+    print(f'应用导入耗时（中位数，含numpy）: {app_ms:.1f}ms（上限 {args.max_ms:.0f}ms）')
+
+    failures = []
+    if loaded:
+        failures.append(f'导入时加载了: {", ".join(loaded)}')
+    if created:
+        failures.append(f'导入时创建了文件: {", ".join(created)}')
+    if app_ms > args.max_ms:
+        failures.append(f'应用导入耗时 {app_ms:.1f}ms 超过上限 {args.max_ms:.0f}ms')
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print('检查通过')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""基准测试套件：Excel解析、上传入库和统计接口
+
+对每个数据规模：把应用代码复制到临时目录，用 datagen 生成预先填充的数据库和一批比赛Excel文件，
+再在子进程中导入应用（应用使用所在目录下的 cs2_tournament.db）并计时：
+- import_app：导入应用模块（不连接数据库，不导入pandas/openpyxl）；
+- startup：创建应用并执行 init_database，包括迁移和从原始记录回填累计统计、配对、Elo分；
+- parse_excel_data：解析一个Excel文件；
+- upload_file：POST /api/upload（每次上传不同的文件）；
+- calculate_players_data：读取累计统计表生成选手列表；
+- get_leaderboards：GET /api/leaderboards，每次清空响应缓存（重新计算榜单）；
+- get_leaderboards_cached：GET /api/leaderboards，命中响应缓存；
+- get_match_detail：GET /api/matches/<id>。
+
+结果（含提交哈希）保存为JSON，可用 --compare 与其他提交的结果对比。
+
+用法:
+    python benchmarks/bench_suite.py --sizes 1k 10k
+    python benchmarks/bench_suite.py --sizes 1k --compare benchmarks/results/<旧提交>.json
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from datagen import DATABASE_SIZES, generate_workbooks, seed_database
+
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+
+
+def summarize(samples):
+    """耗时样本（毫秒）的统计值"""
+    return {
+        'repeat': len(samples),
+        'mean_ms': round(statistics.mean(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'min_ms': round(min(samples), 3),
+        'max_ms': round(max(samples), 3),
+    }
+
+
+def measure(func, repeat, prepare=None):
+    """调用 func repeat 次，返回每次的耗时（毫秒）；prepare 在每次计时前调用，不计入耗时"""
+    samples = []
+    for index in range(repeat):
+        if prepare is not None:
+            prepare(index)
+        start = time.perf_counter()
+        func(index)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_worker(work_dir, repeat):
+    """在子进程中运行：导入 work_dir 中的应用并逐项计时，返回 {项目: 统计值}"""
+    os.chdir(work_dir)
+    sys.path.insert(0, work_dir)
+    workbooks = sorted(glob.glob(os.path.join(work_dir, 'workbooks', '*.xlsx')))
+    parse_files, upload_files = workbooks[:repeat], workbooks[repeat:]
+
+    results = {}
+    # 应用的初始化和解析过程中的提示信息不混入结果
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        import app as tracker
+        results['import_app'] = summarize([(time.perf_counter() - start) * 1000])
+
+        start = time.perf_counter()
+        application = tracker.create_app()
+        tracker.init_database(application)
+        results['startup'] = summarize([(time.perf_counter() - start) * 1000])
+
+        results['parse_excel_data'] = summarize(measure(
+            lambda index: tracker.parse_excel_data(parse_files[index]), len(parse_files)))
+
+        client = application.test_client()
+
+        def upload(index):
+            with open(upload_files[index], 'rb') as file:
+                response = client.post('/api/upload', data={'file': (file, os.path.basename(upload_files[index]))})
+            if response.status_code != 200:
+                raise RuntimeError(f'上传失败: {response.get_json()}')
+
+        results['upload_file'] = summarize(measure(upload, len(upload_files)))
+
+        with application.app_context():
+            results['calculate_players_data'] = summarize(measure(
+                lambda index: tracker.calculate_players_data(), repeat))
+            match_ids = [match_id for (match_id,) in tracker.db.session.query(tracker.Match.id)]
+
+        def get(url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'请求失败: {url} {response.status_code}')
+
+        # 第一次请求构建列式快照，之后快照只做增量刷新
+        get('/api/leaderboards')
+        results['get_leaderboards'] = summarize(measure(
+            lambda index: get('/api/leaderboards'), repeat,
+            prepare=lambda index: application.extensions['response_cache'].entries.clear()))
+        results['get_leaderboards_cached'] = summarize(measure(lambda index: get('/api/leaderboards'), repeat))
+
+        rng = random.Random(42)
+        sample_ids = [rng.choice(match_ids) for _ in range(repeat)]
+        results['get_match_detail'] = summarize(measure(
+            lambda index: get(f'/api/matches/{sample_ids[index]}'), repeat))
+    return results
+
+
+def run_size(size, repeat):
+    """准备一个数据规模的临时目录并在子进程中计时"""
+    match_count = DATABASE_SIZES[size]
+    with tempfile.TemporaryDirectory() as work_dir:
+        for path in glob.glob(os.path.join(REPO_DIR, '*.py')):
+            shutil.copy(path, work_dir)
+        seed_database(os.path.join(work_dir, 'cs2_tournament.db'), match_count)
+        # 解析和上传各 repeat 个文件，编号接在已有比赛之后，内容与数据库中的比赛不同
+        generate_workbooks(os.path.join(work_dir, 'workbooks'), repeat * 2, seed_value=match_count,
+                           player_count=max(20, match_count // 10), start=match_count + 1)
+
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', work_dir, '--repeat', str(repeat)],
+            stdout=subprocess.PIPE, check=True
+        )
+    return {'matches': match_count, 'results': json.loads(completed.stdout)}
+
+
+def current_commit():
+    """当前提交的哈希，工作区有改动时加 -dirty"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f'{commit}-dirty' if dirty else commit
+
+
+def print_results(report):
+    """打印结果表"""
+    for size, entry in report['sizes'].items():
+        print(f'\n规模 {size}（{entry["matches"]} 场比赛）')
+        print(f'{"项目":<28}{"平均(ms)":>12}{"中位数(ms)":>12}{"最小(ms)":>12}')
+        for name, stats in entry['results'].items():
+            print(f'{name:<28}{stats["mean_ms"]:>12.3f}{stats["median_ms"]:>12.3f}{stats["min_ms"]:>12.3f}')
+
+
+def print_comparison(old_report, report):
+    """按中位数对比两次结果，比值大于1表示变慢"""
+    print(f'\n对比 {old_report["commit"][:12]} -> {report["commit"][:12]}')
+    for size, entry in report['sizes'].items():
+        old_entry = old_report['sizes'].get(size)
+        if old_entry is None:
+            continue
+        print(f'\n规模 {size}')
+        print(f'{"项目":<28}{"旧(ms)":>12}{"新(ms)":>12}{"比值":>10}')
+        for name, stats in entry['results'].items():
+            old_stats = old_entry['results'].get(name)
+            if old_stats is None:
+                continue
+            ratio = stats['median_ms'] / old_stats['median_ms'] if old_stats['median_ms'] else float('inf')
+            print(f'{name:<28}{old_stats["median_ms"]:>12.3f}{stats["median_ms"]:>12.3f}{ratio:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析、上传和统计接口的基准测试')
+    parser.add_argument('--sizes', nargs='+', choices=sorted(DATABASE_SIZES), default=['1k'], help='数据库规模')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测量的次数')
+    parser.add_argument('--output', help='结果文件，默认为 benchmarks/results/<提交哈希>.json')
+    parser.add_argument('--compare', help='与之前保存的结果文件对比')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(run_worker(args.worker, args.repeat), sys.stdout)
+        return
+
+    old_report = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            old_report = json.load(file)
+
+    commit = current_commit()
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        report['sizes'][size] = run_size(size, args.repeat)
+
+    suffix = '-dirty' if commit.endswith('-dirty') else ''
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit[:12]}{suffix}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+
+    print_results(report)
+    if old_report is not None:
+        print_comparison(old_report, report)
+    print(f'\n结果已保存: {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""生成测试数据：垂直布局的比赛Excel文件，以及预先填充的SQLite数据库
+
+Excel 与 parse_vertical_layout 解析的固定布局一致（列名行之后）：
+第0行 比赛名称/地图，第2行 队伍A/比分，第3行 列标题，第4-8行 队伍A选手，
+第11行 队伍B/比分，第12行 列标题，第13-17行 队伍B选手。
+
+数据库只写入 players / matches / player_matches 原始记录，累计统计、队伍汇总、
+选手配对和Elo分由应用启动时的迁移和回填生成（与从旧库升级的流程相同）。
+
+用法:
+    python benchmarks/datagen.py workbooks --count 100 --output /tmp/workbooks
+    python benchmarks/datagen.py database --size 10k --output /tmp/cs2_tournament.db
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from sqlalchemy import create_engine
+
+from models import db, match_result
+
+# 预设的数据库规模 -> 比赛数
+DATABASE_SIZES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+PLAYERS_PER_TEAM = 5
+MAPS = ['Mirage', 'Inferno', 'Nuke', 'Ancient', 'Anubis', 'Vertigo', 'Dust2']
+HEADERS = ['选手名称', '击杀', '死亡', '助攻', '爆头击杀', '首杀', '首死数', 'RWS',
+           'Rating', 'Rating+', 'ADR', '爆头率', 'KAST', '狙杀数']
+
+
+def player_pool_size(match_count):
+    """选手数量：约每10场比赛一名新选手，至少够组两支队伍"""
+    return max(PLAYERS_PER_TEAM * 4, match_count // 10)
+
+
+def random_score(rng):
+    """CS2比分：常规时间先赢13回合，少数比赛加时或打平"""
+    roll = rng.random()
+    if roll < 0.85:
+        score = (13, rng.randint(0, 11))
+    elif roll < 0.97:
+        # 12:12后每段加时6回合，先拿4回合的一方获胜
+        overtime = rng.randint(1, 3) * 3
+        score = (13 + overtime, 9 + overtime + rng.randint(0, 2))
+    else:
+        return 12, 12
+    return score if rng.random() < 0.5 else score[::-1]
+
+
+def random_player_stats(rng, skill, won):
+    """单场选手数据，skill 为选手的长期水平（约0.7-1.3），胜方数据略高"""
+    form = skill * rng.uniform(0.75, 1.25) * (1.08 if won else 0.92)
+    kills = max(0, int(rng.gauss(16 * form, 4)))
+    headshots = int(kills * rng.uniform(0.3, 0.7))
+    rating = round(max(0.2, rng.gauss(form, 0.15)), 2)
+    return {
+        'kills': kills,
+        'deaths': max(1, int(rng.gauss(16 / form, 3))),
+        'assists': max(0, int(rng.gauss(5, 2))),
+        'headshots': headshots,
+        'first_kills': max(0, int(rng.gauss(2.5 * form, 1.2))),
+        'first_deaths': max(0, int(rng.gauss(2.5 / form, 1.2))),
+        'rws': round(max(0.0, rng.gauss(10 * form, 3)), 2),
+        'rating': rating,
+        'rating_plus': round(max(0.2, rating + rng.gauss(0, 0.08)), 2),
+        'adr': round(max(10.0, rng.gauss(78 * form, 15)), 1),
+        'headshot_rate': round(headshots / max(kills, 1), 2),
+        'kast': round(min(1.0, max(0.3, rng.gauss(0.7 * min(form, 1.2), 0.08))), 2),
+        'sniper_kills': max(0, int(rng.gauss(1.5, 2))),
+    }
+
+
+def random_match(rng, number, player_names, player_skills):
+    """生成一场比赛：{'name', 'map', 'teams': [(队伍名, 比分, [(选手名, 数据)])]}"""
+    team_numbers = rng.sample(range(1, 41), 2)
+    team_names = [f'Team{team_number}' for team_number in team_numbers]
+    scores = random_score(rng)
+    roster = rng.sample(range(len(player_names)), PLAYERS_PER_TEAM * 2)
+    teams = []
+    for team_index in range(2):
+        won = scores[team_index] > scores[1 - team_index]
+        members = roster[team_index * PLAYERS_PER_TEAM:(team_index + 1) * PLAYERS_PER_TEAM]
+        teams.append((team_names[team_index], scores[team_index], [
+            (player_names[member], random_player_stats(rng, player_skills[member], won))
+            for member in members
+        ]))
+    return {
+        'name': f'{team_names[0]}对黑{team_names[1]} #{number}',
+        'map': rng.choice(MAPS),
+        'teams': teams,
+    }
+
+
+def random_players(rng, count):
+    """选手名和长期水平"""
+    names = [f'player{index:05d}' for index in range(1, count + 1)]
+    skills = [min(1.3, max(0.7, rng.gauss(1.0, 0.12))) for _ in names]
+    return names, skills
+
+
+def player_row(name, stats):
+    """选手行（列顺序与 HEADERS 一致）"""
+    return [name, stats['kills'], stats['deaths'], stats['assists'], stats['headshots'],
+            stats['first_kills'], stats['first_deaths'], stats['rws'], stats['rating'],
+            stats['rating_plus'], stats['adr'], stats['headshot_rate'], stats['kast'], stats['sniper_kills']]
+
+
+def write_workbook(path, match):
+    """按垂直布局写出一场比赛的Excel文件"""
+    workbook = openpyxl.Workbook()
+    worksheet = workbook.active
+    worksheet.append(['比赛名称', '地图'])
+    worksheet.append([match['name'], match['map']])
+    for team_index, (team_name, score, players) in enumerate(match['teams']):
+        if team_index:
+            # 两支队伍之间的两行分隔
+            worksheet.append(['-'])
+            worksheet.append(['-'])
+        else:
+            worksheet.append(['队伍', '比分'])
+        worksheet.append([team_name, score])
+        worksheet.append(HEADERS)
+        for name, stats in players:
+            worksheet.append(player_row(name, stats))
+    workbook.save(path)
+
+
+def generate_workbooks(output_dir, count, seed_value=42, player_count=None, start=1):
+    """生成 count 个Excel文件，返回文件路径列表；编号从 start 开始，内容各不相同"""
+    rng = random.Random(seed_value)
+    names, skills = random_players(rng, player_count or player_pool_size(count))
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for number in range(start, start + count):
+        path = os.path.join(output_dir, f'match_{number:06d}.xlsx')
+        write_workbook(path, random_match(rng, number, names, skills))
+        paths.append(path)
+    return paths
+
+
+def seed_database(db_path, match_count, seed_value=42):
+    """创建数据库并写入 match_count 场比赛的原始记录，比赛日期按编号递增"""
+    engine = create_engine(f'sqlite:///{db_path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed_value)
+    names, skills = random_players(rng, player_pool_size(match_count))
+    now = datetime.utcnow()
+    start_date = now - timedelta(days=365)
+
+    connection = sqlite3.connect(db_path)
+    connection.executemany(
+        'INSERT INTO players (id, name, created_at) VALUES (?, ?, ?)',
+        [(index, name, now) for index, name in enumerate(names, start=1)]
+    )
+    player_ids = {name: index for index, name in enumerate(names, start=1)}
+
+    # 分批写入，避免一次在内存中保存所有记录
+    batch_size = 5000
+    for batch_start in range(1, match_count + 1, batch_size):
+        matches = []
+        player_matches = []
+        for match_id in range(batch_start, min(batch_start + batch_size, match_count + 1)):
+            match = random_match(rng, match_id, names, skills)
+            (team_a_name, score_a, players_a), (team_b_name, score_b, players_b) = match['teams']
+            date = start_date + timedelta(minutes=match_id * 525600 // max(match_count, 1))
+            matches.append((match_id, match['name'], match['map'], date, f'uploads/match_{match_id:06d}.xlsx',
+                            team_a_name, team_b_name, score_a, score_b, now))
+            for team, players in (('A', players_a), ('B', players_b)):
+                for name, stats in players:
+                    player_matches.append((
+                        player_ids[name], match_id, team, match_result(team, score_a, score_b),
+                        stats['kills'], stats['deaths'], stats['assists'], stats['headshots'],
+                        stats['first_kills'], stats['rws'], stats['rating'], stats['rating_plus'],
+                        stats['adr'], stats['headshot_rate'], stats['kast'], stats['sniper_kills'],
+                        stats['first_deaths'], now
+                    ))
+        connection.executemany(
+            'INSERT INTO matches (id, name, map, date, file_path, team_a_name, team_b_name, '
+            'team_a_score, team_b_score, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', matches)
+        connection.executemany(
+            'INSERT INTO player_matches (player_id, match_id, team, result, kills, deaths, assists, '
+            'headshots, first_kills, rws, rating, rating_plus, adr, headshot_rate, kast, sniper_kills, '
+            'first_deaths, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            player_matches)
+    connection.commit()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成测试用的比赛Excel文件或数据库')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    workbooks_parser = subparsers.add_parser('workbooks', help='生成垂直布局的比赛Excel文件')
+    workbooks_parser.add_argument('--count', type=int, default=100, help='文件数量')
+    workbooks_parser.add_argument('--output', required=True, help='输出目录')
+    workbooks_parser.add_argument('--seed', type=int, default=42, help='随机种子')
+
+    database_parser = subparsers.add_parser('database', help='生成预先填充的SQLite数据库')
+    database_parser.add_argument('--size', choices=sorted(DATABASE_SIZES), default='1k', help='比赛数量')
+    database_parser.add_argument('--matches', type=int, help='自定义比赛数量（覆盖 --size）')
+    database_parser.add_argument('--output', required=True, help='数据库文件路径（不能已存在）')
+    database_parser.add_argument('--seed', type=int, default=42, help='随机种子')
+
+    args = parser.parse_args()
+    if args.command == 'workbooks':
+        paths = generate_workbooks(args.output, args.count, args.seed)
+        print(f'已生成 {len(paths)} 个文件: {args.output}')
+    else:
+        if os.path.exists(args.output):
+            parser.error(f'文件已存在: {args.output}')
+        match_count = args.matches or DATABASE_SIZES[args.size]
+        seed_database(args.output, match_count, args.seed)
+        print(f'已生成 {match_count} 场比赛: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
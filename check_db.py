@@ -1,6 +1,8 @@
-from app import app, db
-from models import Match, Player, PlayerMatch
+from app import create_app
+from models import db, Match, Player, PlayerMatch
 
+# 只读取数据，不启动后台解析线程
+app = create_app({'INGEST_WORKERS': 0})
 with app.app_context():
     print('数据库表结构:', db.metadata.tables.keys())
     print('Match记录数:', Match.query.count())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""player_matches 的列式快照
+
+把所有选手比赛记录一次性读成 NumPy 数组，按选手聚合出累计值和场均数据，
+榜单公式可以直接对整列数组计算。快照与数据版本号绑定，同一版本内所有请求共用一份快照。
+版本变化后下次使用时重建：只有上传时，只读取新增的记录追加到旧数组之后；
+删除过比赛（数据版本表中的删除次数变化）时整体重新读取，因为SQLite会复用被删除的最大记录ID。
+"""
+
+import threading
+from collections.abc import Mapping
+from types import SimpleNamespace
+
+import numpy as np
+
+from models import db, DataVersion, Player, PlayerMatch, PlayerStats
+
+
+def sample_stddev(m2, counts):
+    """由离差平方和数组计算样本标准差，不足2场时为0（与models.sample_stddev一致）"""
+    return np.sqrt(np.divide(m2, counts - 1, out=np.zeros(len(m2)), where=counts >= 2))
+
+
+def py_round(values, ndigits):
+    """与内置round()结果一致的向量化舍入
+
+    np.round 先乘10^n再取整，乘法误差会使 0.35 这类值与 round() 的舍入方向不同；
+    这些恰好落在 .5 附近的元素逐个用 round() 计算。
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in ambiguous:
+        rounded[index] = round(float(values[index]), ndigits)
+    return rounded
+
+
+class LossDataView(Mapping):
+    """按选手名读取败场累计数据（与 calculate_loss_data 的结果格式一致），只在访问时生成条目"""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __getitem__(self, player_name):
+        index = self._snapshot.player_positions[player_name]
+        loss_matches = int(self._snapshot.totals['total_loss_matches'][index])
+        if not loss_matches:
+            raise KeyError(player_name)
+        return {
+            'totalRatingPlus': float(self._snapshot.totals['total_loss_rating_plus'][index]),
+            'totalLossMatches': loss_matches
+        }
+
+    def __iter__(self):
+        for index in np.flatnonzero(self._snapshot.totals['total_loss_matches']):
+            yield self._snapshot.player_names[index]
+
+    def __len__(self):
+        return int(np.count_nonzero(self._snapshot.totals['total_loss_matches']))
+
+
+# fetch_player_match_rows 返回数组中统计字段之前的列数
+LEADING_COLUMNS = 5
+
+
+def fetch_player_match_rows(match_fields, min_row_id=0):
+    """读取id大于min_row_id的选手比赛记录
+
+    返回二维数组，每行依次为：id, player_id, 是否败场, 是否胜场, 胜场Rating+与队伍平均之差, 各统计字段
+    """
+    columns = ', '.join(f'COALESCE(pm.{field}, 0)' for field in match_fields)
+    # 经由SQLAlchemy执行（计入SQL语句指标），再从DBAPI游标直接取出元组，避免为几十万行创建Row对象
+    result = db.session.connection().exec_driver_sql(
+        "SELECT pm.id, pm.player_id, "
+        "CASE WHEN pm.result = 'L' THEN 1 ELSE 0 END, "
+        "CASE WHEN pm.result = 'W' AND t.match_id IS NOT NULL THEN 1 ELSE 0 END, "
+        "CASE WHEN pm.result = 'W' AND t.match_id IS NOT NULL "
+        "THEN COALESCE(pm.rating_plus, 0) - t.avg_rating_plus ELSE 0 END, "
+        f"{columns} FROM player_matches pm "
+        "LEFT JOIN match_team_stats t ON t.match_id = pm.match_id AND t.team = pm.team "
+        "WHERE pm.id > ? ORDER BY pm.id", (min_row_id,))
+    try:
+        return np.array(result.cursor.fetchall(), dtype=np.float64).reshape(-1, len(match_fields) + LEADING_COLUMNS)
+    finally:
+        result.close()
+
+
+class PlayerMatchSnapshot:
+    """选手比赛记录的列式快照，选手按姓名排序（与选手列表顺序一致）"""
+
+    def __init__(self, version, rows, match_fields, names, ratings=None, deletions=0):
+        self.version = version
+        # 生成快照时数据版本表中的删除次数
+        self.deletions = deletions
+        self.rows = rows
+        self.match_fields = match_fields
+        self.names = names
+        # {选手ID: (Elo分, 场次)}，来自累计统计表
+        self.ratings = ratings or {}
+
+        # 按姓名重排选手，player_index 为每条记录所属选手在 player_names 中的位置
+        unique_ids, row_positions = np.unique(rows[:, 1].astype(np.int64), return_inverse=True)
+        order = sorted(range(len(unique_ids)), key=lambda position: names[int(unique_ids[position])])
+        rank = np.empty(len(unique_ids), dtype=np.int64)
+        rank[order] = np.arange(len(unique_ids))
+        self.player_names = [names[int(unique_ids[position])] for position in order]
+        self.player_positions = {name: index for index, name in enumerate(self.player_names)}
+        self.player_index = rank[row_positions]
+
+        # 列名 -> 每条记录的值
+        self.columns = {field: rows[:, column + LEADING_COLUMNS] for column, field in enumerate(match_fields)}
+        self.is_loss = rows[:, 2].astype(bool)
+        self.is_win = rows[:, 3].astype(bool)
+        self.win_rating_plus_diff = rows[:, 4]
+        self.totals = self._aggregate()
+        player_ratings = [self.ratings.get(int(unique_ids[position]), (PlayerStats.INITIAL_ELO_RATING, 0))
+                          for position in order]
+        self.totals['elo_rating'] = np.array([rating for rating, _ in player_ratings], dtype=np.float64)
+        self.totals['elo_matches'] = np.array([count for _, count in player_ratings], dtype=np.int64)
+        self._player_columns = None
+        # 选手位置 -> 选手数据字典，由榜单计算按需填充，同一快照内复用
+        self.player_infos = {}
+
+    @classmethod
+    def build(cls, version, previous=None):
+        """从数据库读取选手比赛记录生成快照
+
+        传入旧快照时只读取新增的记录追加到旧数组之后；之后删除过比赛，或记录总数对不上时整体重新读取。
+        """
+        match_fields = [match_field for _, match_field in PlayerStats.ACCUMULATED_FIELDS]
+        # 先于记录读取删除次数：读取期间发生的删除只会使下次重建时整体重新读取
+        deletions = db.session.query(DataVersion.deletions).filter_by(id=1).scalar() or 0
+        names = {}
+        rows = None
+        if (previous is not None and previous.match_fields == match_fields and len(previous.rows)
+                and previous.deletions == deletions):
+            new_rows = fetch_player_match_rows(match_fields, int(previous.rows[-1, 0]))
+            if PlayerMatch.query.count() == len(previous.rows) + len(new_rows):
+                rows = np.concatenate([previous.rows, new_rows])
+                names = dict(previous.names)
+        if rows is None:
+            rows = fetch_player_match_rows(match_fields)
+
+        missing_ids = list({int(player_id) for player_id in np.unique(rows[:, 1])} - names.keys())
+        for start in range(0, len(missing_ids), 500):
+            names.update(db.session.query(Player.id, Player.name)
+                         .filter(Player.id.in_(missing_ids[start:start + 500])).all())
+
+        # Elo分不是按记录累加的，每次都整表读取
+        ratings = {
+            player_id: (rating, rated_matches)
+            for player_id, rating, rated_matches in db.session.query(
+                PlayerStats.player_id, PlayerStats.elo_rating, PlayerStats.elo_matches)
+        }
+
+        return cls(version, rows, match_fields, names, ratings, deletions)
+
+    def _aggregate(self):
+        """按选手汇总累计值，键名与 PlayerStats 一致"""
+        player_count = len(self.player_names)
+
+        def per_player(weights=None, mask=None):
+            index = self.player_index if mask is None else self.player_index[mask]
+            if weights is not None and mask is not None:
+                weights = weights[mask]
+            return np.bincount(index, weights=weights, minlength=player_count)
+
+        totals = {'total_matches': per_player().astype(np.int64)}
+        for total_field, match_field in PlayerStats.ACCUMULATED_FIELDS:
+            summed = per_player(self.columns[match_field])
+            if isinstance(PlayerMatch.__table__.c[match_field].type, db.Integer):
+                summed = summed.astype(np.int64)
+            totals[total_field] = summed
+        totals['total_loss_matches'] = per_player(mask=self.is_loss).astype(np.int64)
+        totals['total_loss_rating_plus'] = per_player(self.columns['rating_plus'], self.is_loss)
+        totals['total_win_matches'] = per_player(mask=self.is_win).astype(np.int64)
+        totals['total_win_rating_plus_diff'] = per_player(self.win_rating_plus_diff)
+
+        # 单场均值与离差平方和（两遍计算，与Welford增量结果在浮点误差内一致）
+        for field in PlayerStats.VARIANCE_FIELDS:
+            values = self.columns[field]
+            mean = per_player(values) / np.maximum(totals['total_matches'], 1)
+            totals[f'mean_{field}'] = mean
+            totals[f'm2_{field}'] = per_player((values - mean[self.player_index]) ** 2)
+        return totals
+
+    def player_totals(self, index):
+        """单个选手的累计值（属性名与 PlayerStats 一致，可直接传给 build_player_info）"""
+        return SimpleNamespace(**{field: values[index].item() for field, values in self.totals.items()})
+
+    def player_columns(self):
+        """所有选手的场均/衍生数据数组，键名及舍入与 build_player_info 一致"""
+        if self._player_columns is not None:
+            return self._player_columns
+
+        totals = self.totals
+        matches = totals['total_matches']
+        kills = totals['total_kills']
+
+        columns = {
+            'totalMatches': matches,
+            'kdRatio': py_round(kills / np.maximum(totals['total_deaths'], 1), 2),
+            'avgKills': py_round(kills / matches, 1),
+            'avgDeaths': py_round(totals['total_deaths'] / matches, 1),
+            'avgAssists': py_round(totals['total_assists'] / matches, 1),
+            'avgHeadshots': py_round(totals['total_headshots'] / matches, 1),
+            'avgFirstKills': py_round(totals['total_first_kills'] / matches, 1),
+            'avgFirstDeaths': py_round(totals['total_first_deaths'] / matches, 1),
+            'avgRatingPlus': py_round(totals['total_rating_plus'] / matches, 2),
+            'avgADR': py_round(totals['total_adr'] / matches, 1),
+            'avgRWS': py_round(totals['total_rws'] / matches, 1),
+            'avgKAST': py_round(totals['total_kast'] / matches, 1),
+            'headshotRatio': py_round(totals['total_headshots'] / np.maximum(kills, 1) * 100, 1),
+            'avgsniperkills': py_round(totals['total_sniper_kills'] / np.maximum(kills, 1) * 100, 1),
+            'stdRatingPlus': py_round(sample_stddev(totals['m2_rating_plus'], matches), 2),
+            'totalWinMatches': totals['total_win_matches'],
+            'avgWinRatingPlusDiff': py_round(totals['total_win_rating_plus_diff']
+                                             / np.maximum(totals['total_win_matches'], 1), 2),
+            'totalLossMatches': totals['total_loss_matches'],
+            'totalLossRatingPlus': totals['total_loss_rating_plus'],
+            'eloRating': py_round(totals['elo_rating'], 1),
+            'eloMatches': totals['elo_matches'],
+        }
+        self._player_columns = columns
+        return columns
+
+    def loss_data(self):
+        """逆境英雄榜使用的败场数据"""
+        return LossDataView(self)
+
+
+class SnapshotCache:
+    """一个应用（数据库）的当前快照，保存在 app.extensions 中，不同数据库的快照互不影响"""
+
+    def __init__(self):
+        self.snapshot = None
+        self.lock = threading.Lock()
+
+    def get(self, version):
+        """获取指定数据版本的快照，版本变化后重建"""
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self.lock:
+            # 等锁期间其他线程可能已经重建
+            if self.snapshot is None or self.snapshot.version != version:
+                self.snapshot = PlayerMatchSnapshot.build(version, self.snapshot)
+            return self.snapshot
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""比赛数据导出（CSV / NDJSON / Parquet）
+
+按块从数据库游标读取记录（yield_per），每块编码后立即输出，内存占用与导出的总行数无关。
+Parquet 每块写成一个行组，使用 pyarrow 编码（requirements.txt 中的依赖，也是 pandas 读写 Parquet 的引擎）。
+
+命令行用法:
+    python export.py matches --format csv --output matches.csv
+    python export.py player_matches --format parquet --output pm.parquet --map Mirage --date-from 2025-01-01
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, Match, Player, PlayerMatch
+
+# 每次从游标读取并编码的行数（也是Parquet行组的大小）
+EXPORT_CHUNK_SIZE = 5000
+
+# 格式 -> (MIME类型, 文件扩展名)
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# 导出的表 -> 列（不导出服务器上的文件路径）
+EXPORT_TABLES = {
+    'matches': [
+        Match.id, Match.name, Match.map, Match.date, Match.team_a_name, Match.team_b_name,
+        Match.team_a_score, Match.team_b_score, Match.content_hash, Match.created_at,
+    ],
+    'player_matches': [
+        PlayerMatch.id, PlayerMatch.match_id, PlayerMatch.player_id, Player.name.label('player_name'),
+        *[column for name, column in PlayerMatch.__table__.columns.items() if name not in ('id', 'match_id', 'player_id')],
+    ],
+}
+
+
+def export_statement(table, criteria=()):
+    """导出查询：criteria 为作用在 matches（player_matches 导出时已联表）上的筛选条件，按ID排序"""
+    columns = EXPORT_TABLES[table]
+    if table == 'matches':
+        statement = select(*columns)
+    else:
+        statement = select(*columns) \
+            .join(Match, Match.id == PlayerMatch.match_id) \
+            .join(Player, Player.id == PlayerMatch.player_id)
+    return statement.where(*criteria).order_by(columns[0])
+
+
+def iter_chunks(statement, chunk_size=EXPORT_CHUNK_SIZE):
+    """逐块读取查询结果（流式游标，不一次性取出所有行）"""
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def format_value(value):
+    """日期转为ISO格式字符串，其余原样返回"""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return value
+
+
+def encode_csv(columns, chunks):
+    """CSV：首行为列名，空值输出为空字符串"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # 带BOM，Excel打开时能正确识别UTF-8中文
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows([format_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    # 没有数据时也输出列名
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(columns, chunks):
+    """NDJSON：每行一个JSON对象"""
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(columns, map(format_value, row))), ensure_ascii=False) + '\n'
+            for row in rows
+        ).encode('utf-8')
+
+
+class ChunkSink(io.RawIOBase):
+    """只追加的输出流：pyarrow写入的数据暂存在内存中，由生成器按块取走"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_schema(table):
+    """按列类型生成 Parquet 表结构"""
+    import pyarrow as pa
+
+    fields = []
+    for column in EXPORT_TABLES[table]:
+        python_type = column.type.python_type
+        if python_type is int:
+            arrow_type = pa.int64()
+        elif python_type is float:
+            arrow_type = pa.float64()
+        elif python_type is datetime:
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.key, arrow_type))
+    return pa.schema(fields)
+
+
+def encode_parquet(table, chunks):
+    """Parquet：每块一个行组，写完一个行组就输出已生成的字节"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(table)
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    # 文件尾（元数据）
+    yield sink.drain()
+
+
+def check_export_format(export_format):
+    """校验导出格式，不支持或缺少依赖时抛出 ValueError"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'不支持的导出格式: {export_format}')
+    if export_format == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError('导出Parquet需要安装pyarrow') from None
+
+
+def stream_export(table, export_format, criteria=(), chunk_size=EXPORT_CHUNK_SIZE):
+    """生成导出文件内容（bytes块）"""
+    columns = [column.key for column in EXPORT_TABLES[table]]
+    chunks = iter_chunks(export_statement(table, criteria), chunk_size)
+    if export_format == 'csv':
+        return encode_csv(columns, chunks)
+    if export_format == 'ndjson':
+        return encode_ndjson(columns, chunks)
+    return encode_parquet(table, chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出比赛数据')
+    parser.add_argument('table', choices=sorted(EXPORT_TABLES), help='导出的表')
+    parser.add_argument('--format', default='csv', choices=sorted(EXPORT_FORMATS), help='导出格式')
+    parser.add_argument('--output', help='输出文件，默认输出到标准输出')
+    parser.add_argument('--map', help='按地图筛选')
+    parser.add_argument('--team', help='按队伍名称筛选')
+    parser.add_argument('--date-from', help='开始日期（YYYY-MM-DD）')
+    parser.add_argument('--date-to', help='结束日期（YYYY-MM-DD，包含当天）')
+    parser.add_argument('--player', help='按选手筛选（仅 player_matches）')
+    args = parser.parse_args()
+
+    from app import create_app, export_filter_criteria
+    # 只导出数据，不启动后台解析线程（否则导出结束时会丢下领取了的上传任务）
+    app = create_app({'INGEST_WORKERS': 0})
+
+    filters = {key: value for key, value in {
+        'map': args.map, 'team': args.team, 'date_from': args.date_from,
+        'date_to': args.date_to, 'player': args.player,
+    }.items() if value}
+
+    with app.app_context():
+        try:
+            check_export_format(args.format)
+            criteria = export_filter_criteria(args.table, filters)
+        except ValueError as e:
+            parser.error(str(e))
+
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for data in stream_export(args.table, args.format, criteria):
+                output.write(data)
+        finally:
+            if args.output:
+                output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""gunicorn配置（生产模式）
+
+工作模型：
+- 多个工作进程各自持有SQLite连接池。数据库为WAL模式，读请求互不阻塞，也不会被上传的写事务阻塞；
+- 写事务（上传、删除）由SQLite串行执行，等待写锁的请求在 busy_timeout 内排队而不是报错；
+- 每个工作进程导入 wsgi.py 时启动自己的后台解析线程（数据库需已由 init_db.py 建表和迁移），任务队列保存在数据库中，所有进程共享；
+  进程异常退出时，它处理中的任务在心跳超时后由其他进程重新排队；
+- 榜单/选手统计的响应缓存按数据库中的数据版本号失效，任一进程写入后其他进程下次请求即重新计算。
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5002')
+
+# 每个进程一个SQLite写者，进程数过多只会增加写锁排队，读多写少时按CPU核数即可
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4))
+
+# 批量上传需要解析上百个文件
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# 不预加载应用：SQLite连接不能在fork之后跨进程复用，每个工作进程自行导入并连接数据库
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
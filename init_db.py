@@ -5,13 +5,11 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app import app, db
-from models import Match, Player, PlayerMatch
-
-# 确保使用绝对路径创建数据库
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'cs2_tournament.db')
-
-with app.app_context():
-    db.create_all()
-    print('数据库表创建完成')
-    print(f'数据库路径: {app.config["SQLALCHEMY_DATABASE_URI"]}')
\ No newline at end of file
+from app import create_app, init_database
+
+# 只建表和迁移，不启动后台解析线程
+app = create_app({'INGEST_WORKERS': 0})
+version = init_database(app)
+print('数据库表创建完成')
+print(f'数据库迁移完成，当前版本: {version}')
+print(f'数据库路径: {app.config["SQLALCHEMY_DATABASE_URI"]}')
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""上传解析后台任务队列
+
+任务持久化在数据库 ingest_jobs 表中，进程重启后未完成的任务会继续处理。
+create_app 为每个应用启动固定数量的后台线程，通过带条件的 UPDATE 原子地领取任务，
+多个进程共享同一个SQLite文件时同一任务只会被处理一次。
+处理中的任务由所在进程定期更新心跳时间，心跳超时（进程异常退出）的任务由任一进程重新排队；
+已领取达到次数上限的任务（如文件每次都导致进程崩溃）不再排队，标记为失败。
+"""
+
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from models import db, IngestJob
+
+PENDING_STATUSES = ('queued', 'running')
+
+
+class IngestWorkers:
+    """一个应用的后台处理线程，保存在 app.extensions 中"""
+
+    def __init__(self):
+        self.threads = []
+        self.wakeup = threading.Event()
+        # 本进程正在处理的任务ID，由心跳线程定期更新心跳时间
+        self.running = set()
+        self.lock = threading.Lock()
+
+
+def pending_job_count():
+    """排队中和处理中的任务数"""
+    return IngestJob.query.filter(IngestJob.status.in_(PENDING_STATUSES)).count()
+
+
+def enqueue_job(filename, file_path, content_hash=None):
+    """创建任务并唤醒后台线程"""
+    job = IngestJob(status='queued', stage='排队中', progress=0, filename=filename, file_path=file_path,
+                    content_hash=content_hash)
+    db.session.add(job)
+    db.session.commit()
+    current_app.extensions['ingest_workers'].wakeup.set()
+    return job
+
+
+def update_job_progress(job, stage, progress):
+    """更新任务阶段和进度并立即提交，供轮询接口读取"""
+    job.stage = stage
+    job.progress = progress
+    db.session.commit()
+
+
+def claim_next_job():
+    """原子地领取最早的排队任务，没有任务时返回None"""
+    now = datetime.utcnow()
+    next_job = select(IngestJob.id).where(IngestJob.status == 'queued') \
+        .order_by(IngestJob.id).limit(1).scalar_subquery()
+    job_id = db.session.execute(
+        update(IngestJob)
+        .where(IngestJob.id == next_job, IngestJob.status == 'queued')
+        .values(status='running', stage='等待处理', started_at=now, heartbeat_at=now,
+                attempts=IngestJob.attempts + 1)
+        .returning(IngestJob.id)
+    ).scalar()
+    db.session.commit()
+    return job_id
+
+
+def fail_job(job_id, error):
+    """标记任务失败并删除上传文件"""
+    db.session.rollback()
+    job = db.session.get(IngestJob, job_id)
+    if job is None:
+        return
+    job.status = 'failed'
+    job.stage = '失败'
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+    if job.file_path and os.path.exists(job.file_path):
+        os.remove(job.file_path)
+
+
+def touch_jobs(job_ids):
+    """更新处理中任务的心跳时间"""
+    if not job_ids:
+        return
+    db.session.execute(
+        update(IngestJob)
+        .where(IngestJob.id.in_(job_ids), IngestJob.status == 'running')
+        .values(heartbeat_at=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def requeue_stale_jobs(stale_seconds, max_attempts):
+    """将心跳超时的处理中任务（进程异常退出遗留）重新排队，返回重新排队的任务数
+
+    已领取 max_attempts 次的任务不再排队，标记为失败。
+    """
+    deadline = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    # 升级前领取的任务没有心跳时间，按开始时间判断
+    stale = (IngestJob.status == 'running',
+             func.coalesce(IngestJob.heartbeat_at, IngestJob.started_at) < deadline)
+    exhausted = db.session.scalars(select(IngestJob.id).where(*stale, IngestJob.attempts >= max_attempts)).all()
+    for job_id in exhausted:
+        fail_job(job_id, f'处理{max_attempts}次均未完成（处理进程异常退出）')
+
+    result = db.session.execute(
+        update(IngestJob)
+        .where(*stale, IngestJob.attempts < max_attempts)
+        .values(status='queued', stage='排队中', progress=0, started_at=None, heartbeat_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def worker_loop(app, handler, poll_interval):
+    """后台线程主循环：领取任务并交给handler处理"""
+    workers = app.extensions['ingest_workers']
+    while True:
+        job_id = None
+        try:
+            with app.app_context():
+                job_id = claim_next_job()
+                if job_id is not None:
+                    with workers.lock:
+                        workers.running.add(job_id)
+                    try:
+                        handler(job_id)
+                    except Exception as e:
+                        traceback.print_exc()
+                        fail_job(job_id, str(e))
+                    finally:
+                        with workers.lock:
+                            workers.running.discard(job_id)
+        except Exception:
+            # 数据库暂时不可用等情况，稍后重试
+            traceback.print_exc()
+            time.sleep(poll_interval)
+
+        if job_id is None:
+            workers.wakeup.wait(poll_interval)
+            workers.wakeup.clear()
+
+
+def heartbeat_loop(app, heartbeat_interval, stale_seconds, max_attempts):
+    """心跳线程主循环：更新本进程处理中任务的心跳时间，并重新排队心跳超时的任务"""
+    workers = app.extensions['ingest_workers']
+    while True:
+        try:
+            with app.app_context():
+                with workers.lock:
+                    running = list(workers.running)
+                touch_jobs(running)
+                if requeue_stale_jobs(stale_seconds, max_attempts):
+                    workers.wakeup.set()
+        except Exception:
+            traceback.print_exc()
+        time.sleep(heartbeat_interval)
+
+
+def start_ingest_workers(app, handler, count, poll_interval=1.0, heartbeat_interval=10, stale_seconds=120,
+                         max_attempts=3):
+    """为应用启动后台处理线程和心跳线程，count为0时不启动"""
+    workers = app.extensions['ingest_workers']
+    if count <= 0 or workers.threads:
+        return
+
+    threads = [threading.Thread(target=heartbeat_loop, args=(app, heartbeat_interval, stale_seconds, max_attempts),
+                                name='ingest-heartbeat', daemon=True)]
+    for index in range(count):
+        threads.append(threading.Thread(target=worker_loop, args=(app, handler, poll_interval),
+                                        name=f'ingest-worker-{index}', daemon=True))
+    for thread in threads:
+        thread.start()
+    workers.threads.extend(threads)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""运行指标：请求耗时、SQL语句统计、Excel导入各阶段耗时（Prometheus文本格式输出）
+
+- 每个请求按路由模板记录耗时直方图，以及本次请求执行的SQL语句数和SQL总耗时；
+- SQL语句通过SQLAlchemy的 before/after_cursor_execute 事件计时，请求之外（后台解析线程、启动时的迁移）的语句只计入总数；
+- Excel导入分阶段计时：read（读取文件）、match_info（比赛信息）、team_parse（队伍和选手）、db_write（写入数据库）。
+  标准垂直布局的比赛信息与队伍在同一遍解析中读取，计入 team_parse；
+- 请求耗时超过慢请求阈值时，生成包含耗时最多的SQL语句的明细，由调用方写入日志。
+
+指标保存在进程内存中，多进程部署时每个工作进程各自统计；批量上传在子进程中解析的文件，各阶段耗时随解析结果传回后计入。
+流式响应（数据导出）只统计到开始输出为止的耗时。
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+from sqlalchemy import event
+
+# 耗时直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求SQL语句数的桶上限
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# 慢请求明细中列出的SQL语句数，以及每条语句保留的字符数
+SLOW_REQUEST_TOP_QUERIES = 10
+SQL_TEXT_LIMIT = 200
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_lock = threading.Lock()
+_request_state = threading.local()
+_ingest_state = threading.local()
+
+
+class Histogram:
+    """直方图：各桶计数（非累计）、观测值总和、观测次数"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+
+def format_label_value(value):
+    """转义标签值中的反斜杠、引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    """生成 {name="value",...}，没有标签时为空字符串"""
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{format_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_number(value):
+    """整数值不带小数点"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class MetricFamily:
+    """同名指标：{标签值元组: 计数或直方图}，kind 为 counter 或 histogram"""
+
+    def __init__(self, name, help_text, kind, label_names=(), buckets=None):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = label_names
+        self.buckets = buckets
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def observe(self, labels, value):
+        with _lock:
+            histogram = self.values.get(labels)
+            if histogram is None:
+                histogram = self.values[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def render(self):
+        """Prometheus文本格式的行"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted(self.values.items()):
+            pairs = list(zip(self.label_names, labels))
+            if self.kind == 'counter':
+                lines.append(f'{self.name}{format_labels(pairs)} {format_number(value)}')
+                continue
+            cumulative = 0
+            for bucket, count in zip(value.buckets, value.counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{format_labels(pairs + [("le", format_number(float(bucket)))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{format_labels(pairs + [("le", "+Inf")])} {value.count}')
+            lines.append(f'{self.name}_sum{format_labels(pairs)} {format_number(value.total)}')
+            lines.append(f'{self.name}_count{format_labels(pairs)} {value.count}')
+        return lines
+
+
+REQUEST_DURATION = MetricFamily(
+    'http_request_duration_seconds', '请求处理耗时（秒）', 'histogram', ('method', 'route', 'status'), LATENCY_BUCKETS)
+REQUEST_SQL_QUERIES = MetricFamily(
+    'http_request_sql_queries', '每个请求执行的SQL语句数', 'histogram', ('method', 'route'), QUERY_COUNT_BUCKETS)
+REQUEST_SQL_DURATION = MetricFamily(
+    'http_request_sql_duration_seconds', '每个请求的SQL语句总耗时（秒）', 'histogram', ('method', 'route'), LATENCY_BUCKETS)
+SLOW_REQUESTS = MetricFamily(
+    'http_slow_requests_total', '超过慢请求阈值的请求数', 'counter', ('method', 'route'))
+SQL_STATEMENTS = MetricFamily(
+    'sql_statements_total', 'SQL语句数（context为request或background）', 'counter', ('context',))
+SQL_SECONDS = MetricFamily(
+    'sql_statement_seconds_total', 'SQL语句总耗时（秒）', 'counter', ('context',))
+INGEST_STAGE_DURATION = MetricFamily(
+    'ingest_stage_duration_seconds', 'Excel导入各阶段耗时（秒）', 'histogram', ('stage',), LATENCY_BUCKETS)
+
+METRIC_FAMILIES = (REQUEST_DURATION, REQUEST_SQL_QUERIES, REQUEST_SQL_DURATION, SLOW_REQUESTS,
+                   SQL_STATEMENTS, SQL_SECONDS, INGEST_STAGE_DURATION)
+
+
+def render_metrics():
+    """所有指标的Prometheus文本"""
+    with _lock:
+        lines = [line for family in METRIC_FAMILIES for line in family.render()]
+    return '\n'.join(lines) + '\n'
+
+
+def instrument_engine(engine):
+    """为引擎注册SQL语句计时事件"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        record_sql_statement(statement, time.perf_counter() - context._metrics_start)
+
+
+def record_sql_statement(statement, duration):
+    """记录一条SQL语句；在请求中执行时同时记入本次请求的明细"""
+    queries = getattr(_request_state, 'queries', None)
+    context = 'background' if queries is None else 'request'
+    SQL_STATEMENTS.inc((context,))
+    SQL_SECONDS.inc((context,), duration)
+    if queries is not None:
+        queries.append((statement, duration))
+
+
+@contextlib.contextmanager
+def ingest_stage(stage):
+    """导入阶段计时，可用作 with 语句或函数装饰器"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        INGEST_STAGE_DURATION.observe((stage,), duration)
+        timings = getattr(_ingest_state, 'timings', None)
+        if timings is not None:
+            timings.append((stage, duration))
+
+
+@contextlib.contextmanager
+def collect_ingest_stages():
+    """收集本线程的导入阶段耗时 [(阶段, 秒)]，在解析子进程中使用，由主进程用 record_ingest_stages 记录"""
+    _ingest_state.timings = timings = []
+    try:
+        yield timings
+    finally:
+        _ingest_state.timings = None
+
+
+def record_ingest_stages(timings):
+    """记录子进程传回的导入阶段耗时"""
+    for stage, duration in timings:
+        INGEST_STAGE_DURATION.observe((stage,), duration)
+
+
+def start_request():
+    """开始记录当前线程的请求"""
+    _request_state.start = time.perf_counter()
+    _request_state.queries = []
+
+
+def finish_request(method, route, status, slow_request_ms=None):
+    """记录请求耗时和SQL统计；超过慢请求阈值（毫秒）时返回慢请求明细，否则返回None"""
+    queries = getattr(_request_state, 'queries', None)
+    if queries is None:
+        return None
+    _request_state.queries = None
+    duration = time.perf_counter() - _request_state.start
+    sql_duration = sum(query_duration for _, query_duration in queries)
+
+    REQUEST_DURATION.observe((method, route, str(status)), duration)
+    REQUEST_SQL_QUERIES.observe((method, route), len(queries))
+    REQUEST_SQL_DURATION.observe((method, route), sql_duration)
+
+    if slow_request_ms is None or duration * 1000 < slow_request_ms:
+        return None
+    SLOW_REQUESTS.inc((method, route))
+    return format_slow_request(method, route, status, duration, sql_duration, queries)
+
+
+def format_slow_request(method, route, status, duration, sql_duration, queries):
+    """慢请求明细：总耗时、SQL耗时，以及按总耗时排序的SQL语句（相同语句合并）"""
+    grouped = {}
+    for statement, query_duration in queries:
+        text = ' '.join(statement.split())[:SQL_TEXT_LIMIT]
+        count, total = grouped.get(text, (0, 0.0))
+        grouped[text] = (count + 1, total + query_duration)
+
+    lines = [f'慢请求 {method} {route} {status}: 耗时 {duration * 1000:.1f}ms，'
+             f'SQL {len(queries)} 条共 {sql_duration * 1000:.1f}ms']
+    top = sorted(grouped.items(), key=lambda item: item[1][1], reverse=True)[:SLOW_REQUEST_TOP_QUERIES]
+    for text, (count, total) in top:
+        lines.append(f'  {total * 1000:8.1f}ms  x{count:<4} {text}')
+    return '\n'.join(lines)
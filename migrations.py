@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""数据库迁移
+
+db.create_all() 只会创建缺失的表，无法给已有表加列或索引。这里按版本号顺序执行迁移，
+已执行到的版本记录在SQLite文件头的 PRAGMA user_version 中。
+
+每个迁移都会先检查目标列/索引是否存在，因此对 create_all 新建的库同样安全。
+新增迁移时在 MIGRATIONS 末尾追加，版本号递增，已发布的迁移不要修改。
+"""
+
+
+def column_names(cursor, table):
+    """获取表的所有列名"""
+    return {row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()}
+
+
+def add_column(cursor, table, column, definition):
+    """列不存在时添加列，返回是否新增"""
+    if column in column_names(cursor, table):
+        return False
+    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    return True
+
+
+def migrate_player_match_result(cursor):
+    """player_matches 增加胜负列并按比分回填"""
+    if add_column(cursor, 'player_matches', 'result', 'VARCHAR(1)'):
+        cursor.execute("""
+            UPDATE player_matches SET result = (
+                SELECT CASE
+                    WHEN (CASE WHEN player_matches.team = 'A' THEN m.team_a_score ELSE m.team_b_score END)
+                       > (CASE WHEN player_matches.team = 'A' THEN m.team_b_score ELSE m.team_a_score END) THEN 'W'
+                    WHEN (CASE WHEN player_matches.team = 'A' THEN m.team_a_score ELSE m.team_b_score END)
+                       < (CASE WHEN player_matches.team = 'A' THEN m.team_b_score ELSE m.team_a_score END) THEN 'L'
+                    ELSE 'D' END
+                FROM matches m WHERE m.id = player_matches.match_id)
+        """)
+
+
+def migrate_player_stats_loss_totals(cursor):
+    """player_stats 增加败场累计列"""
+    added = add_column(cursor, 'player_stats', 'total_loss_matches', 'INTEGER NOT NULL DEFAULT 0')
+    added |= add_column(cursor, 'player_stats', 'total_loss_rating_plus', 'FLOAT NOT NULL DEFAULT 0.0')
+    if added:
+        # 清空后由应用启动时整体重建
+        cursor.execute('DELETE FROM player_stats')
+
+
+def migrate_match_indexes(cursor):
+    """比赛详情/删除按 match_id 查询，比赛列表按 date 排序"""
+    # player_id 的查询由 (player_id, match_id) 唯一约束自带的索引覆盖
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_player_matches_match_id ON player_matches (match_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_matches_date ON matches (date)')
+
+
+def migrate_match_map_index(cursor):
+    """比赛列表按地图筛选并按日期分页"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_matches_map_date ON matches (map, date)')
+
+
+def migrate_content_hash(cursor):
+    """matches / ingest_jobs 增加文件内容哈希列，用于识别重复上传"""
+    add_column(cursor, 'matches', 'content_hash', 'VARCHAR(64)')
+    add_column(cursor, 'ingest_jobs', 'content_hash', 'VARCHAR(64)')
+    # 已有比赛的哈希为NULL，不受唯一约束影响
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS ix_matches_content_hash ON matches (content_hash)')
+
+
+def migrate_player_stats_variance(cursor):
+    """player_stats 增加单场均值和离差平方和列（Rating+、ADR、KAST）"""
+    added = False
+    for field in ('rating_plus', 'adr', 'kast'):
+        added |= add_column(cursor, 'player_stats', f'mean_{field}', 'FLOAT NOT NULL DEFAULT 0.0')
+        added |= add_column(cursor, 'player_stats', f'm2_{field}', 'FLOAT NOT NULL DEFAULT 0.0')
+    if added:
+        # 清空后由应用启动时整体重建
+        cursor.execute('DELETE FROM player_stats')
+
+
+def migrate_match_team_stats(cursor):
+    """回填每场比赛每支队伍的汇总数据，player_stats 增加胜场与队伍平均差值列"""
+    # match_team_stats 表由 db.create_all() 创建
+    cursor.execute("""
+        INSERT OR IGNORE INTO match_team_stats
+            (match_id, team, player_count, avg_rating_plus, avg_adr, avg_kast, total_kills)
+        SELECT match_id, team, COUNT(*), AVG(COALESCE(rating_plus, 0)), AVG(COALESCE(adr, 0)),
+               AVG(COALESCE(kast, 0)), SUM(COALESCE(kills, 0))
+        FROM player_matches GROUP BY match_id, team
+    """)
+    added = add_column(cursor, 'player_stats', 'total_win_matches', 'INTEGER NOT NULL DEFAULT 0')
+    added |= add_column(cursor, 'player_stats', 'total_win_rating_plus_diff', 'FLOAT NOT NULL DEFAULT 0.0')
+    if added:
+        # 清空后由应用启动时整体重建
+        cursor.execute('DELETE FROM player_stats')
+
+
+def migrate_player_pair_stats(cursor):
+    """回填选手两两之间的队友/对手累计数据"""
+    # player_pair_stats 表由 db.create_all() 创建
+    cursor.execute("""
+        INSERT OR IGNORE INTO player_pair_stats
+            (player_id, relation, other_player_id, matches, wins, total_rating_plus, total_other_rating_plus)
+        SELECT a.player_id, CASE WHEN a.team = b.team THEN 'T' ELSE 'O' END, b.player_id, COUNT(*),
+               SUM(CASE WHEN a.result = 'W' THEN 1 ELSE 0 END),
+               SUM(COALESCE(a.rating_plus, 0)), SUM(COALESCE(b.rating_plus, 0))
+        FROM player_matches a
+        JOIN player_matches b ON b.match_id = a.match_id AND b.player_id != a.player_id
+        GROUP BY a.player_id, CASE WHEN a.team = b.team THEN 'T' ELSE 'O' END, b.player_id
+    """)
+
+
+def migrate_player_stats_elo(cursor):
+    """player_stats 增加Elo分列"""
+    # rating_history 表由 db.create_all() 创建
+    added = add_column(cursor, 'player_stats', 'elo_rating', 'FLOAT NOT NULL DEFAULT 1500.0')
+    added |= add_column(cursor, 'player_stats', 'elo_matches', 'INTEGER NOT NULL DEFAULT 0')
+    if added:
+        # 清空后由应用启动时整体重建（同时按比赛顺序计算Elo分）
+        cursor.execute('DELETE FROM player_stats')
+
+
+def migrate_ingest_job_heartbeat(cursor):
+    """ingest_jobs 增加心跳时间列"""
+    add_column(cursor, 'ingest_jobs', 'heartbeat_at', 'DATETIME')
+
+
+def migrate_data_version_deletions(cursor):
+    """data_version 增加删除次数列"""
+    add_column(cursor, 'data_version', 'deletions', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def migrate_ingest_job_attempts(cursor):
+    """ingest_jobs 增加处理次数列"""
+    add_column(cursor, 'ingest_jobs', 'attempts', 'INTEGER NOT NULL DEFAULT 0')
+
+
+# (版本号, 说明, 迁移函数)
+MIGRATIONS = [
+    (1, 'player_matches.result 胜负列', migrate_player_match_result),
+    (2, 'player_stats 败场累计列', migrate_player_stats_loss_totals),
+    (3, 'player_matches.match_id / matches.date 索引', migrate_match_indexes),
+    (4, 'matches (map, date) 索引', migrate_match_map_index),
+    (5, 'matches.content_hash / ingest_jobs.content_hash 文件内容哈希', migrate_content_hash),
+    (6, 'player_stats 单场均值/离差平方和列', migrate_player_stats_variance),
+    (7, 'match_team_stats 队伍汇总数据回填', migrate_match_team_stats),
+    (8, 'player_pair_stats 选手配对数据回填', migrate_player_pair_stats),
+    (9, 'player_stats Elo分列', migrate_player_stats_elo),
+    (10, 'ingest_jobs.heartbeat_at 任务心跳时间', migrate_ingest_job_heartbeat),
+    (11, 'data_version.deletions 删除次数', migrate_data_version_deletions),
+    (12, 'ingest_jobs.attempts 处理次数', migrate_ingest_job_attempts),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def database_version(engine):
+    """数据库已执行到的迁移版本号，新数据库为0"""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def run_migrations(engine):
+    """执行所有未执行的迁移，返回执行后的版本号
+
+    需要在 db.create_all() 之后调用。整个过程在一个 BEGIN IMMEDIATE 事务中完成，
+    多个进程同时启动时只会有一个执行迁移，失败则全部回滚。
+    """
+    raw_connection = engine.raw_connection()
+    try:
+        sqlite_connection = raw_connection.driver_connection
+        isolation_level = sqlite_connection.isolation_level
+        # 手动控制事务，使DDL也包含在事务内
+        sqlite_connection.isolation_level = None
+        cursor = sqlite_connection.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            current_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            for version, description, migrate in MIGRATIONS:
+                if version <= current_version:
+                    continue
+                print(f'执行数据库迁移 {version}: {description}')
+                migrate(cursor)
+                current_version = version
+            cursor.execute(f'PRAGMA user_version = {current_version}')
+            cursor.execute('COMMIT')
+        except Exception:
+            if sqlite_connection.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            cursor.close()
+            sqlite_connection.isolation_level = isolation_level
+    finally:
+        raw_connection.close()
+
+    return current_version
@@ -3,6 +3,7 @@
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import math
 
 db = SQLAlchemy()
 
@@ -13,8 +14,9 @@ class Match(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False, comment='比赛名称')
     map = db.Column(db.String(100), nullable=False, comment='地图')
-    date = db.Column(db.DateTime, default=datetime.utcnow, comment='比赛日期')
+    date = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='比赛日期')
     file_path = db.Column(db.String(500), nullable=False, comment='Excel文件路径')
+    content_hash = db.Column(db.String(64), unique=True, index=True, comment='Excel文件内容SHA-256')
     
     # 队伍信息
     team_a_name = db.Column(db.String(100), nullable=False, comment='队伍A名称')
@@ -26,6 +28,10 @@ class Match(db.Model):
     
     # 关联关系
     player_matches = db.relationship('PlayerMatch', backref='match', lazy=True, cascade='all, delete-orphan')
+    team_stats = db.relationship('MatchTeamStats', lazy=True, cascade='all, delete-orphan')
+    
+    # 按地图筛选时仍按日期顺序分页
+    __table_args__ = (db.Index('ix_matches_map_date', 'map', 'date'),)
     
     def to_dict(self):
         return {
@@ -59,14 +65,24 @@ class Player(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
+def match_result(team, team_a_score, team_b_score):
+    """根据比分计算指定队伍的比赛结果（W/L/D）"""
+    own_score, other_score = (team_a_score, team_b_score) if team == 'A' else (team_b_score, team_a_score)
+    if own_score > other_score:
+        return 'W'
+    if own_score < other_score:
+        return 'L'
+    return 'D'
+
 class PlayerMatch(db.Model):
     """选手比赛记录模型"""
     __tablename__ = 'player_matches'
     
     id = db.Column(db.Integer, primary_key=True)
     player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
-    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False, index=True)
     team = db.Column(db.String(1), nullable=False, comment='队伍标识 A/B')
+    result = db.Column(db.String(1), comment='比赛结果 W胜/L负/D平')
     
     # 比赛数据
     kills = db.Column(db.Integer, default=0, comment='击杀数')
@@ -96,6 +112,7 @@ class PlayerMatch(db.Model):
             'player_id': self.player_id,
             'match_id': self.match_id,
             'team': self.team,
+            'result': self.result,
             'kills': self.kills,
             'deaths': self.deaths,
             'assists': self.assists,
@@ -111,4 +128,277 @@ class PlayerMatch(db.Model):
             'first_deaths': self.first_deaths,
             'kd_ratio': round(self.kills / max(self.deaths, 1), 2),
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        }
+
+def sample_stddev(m2, count):
+    """由离差平方和计算样本标准差，不足2场时为0"""
+    if count < 2:
+        return 0.0
+    # SQL按平方和计算的离差平方和可能因浮点误差略小于0
+    return math.sqrt(max(m2, 0.0) / (count - 1))
+
+class MatchTeamStats(db.Model):
+    """每场比赛每支队伍的汇总数据（上传时计算一次）"""
+    __tablename__ = 'match_team_stats'
+    
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), primary_key=True)
+    team = db.Column(db.String(1), primary_key=True, comment='队伍标识 A/B')
+    player_count = db.Column(db.Integer, nullable=False, default=0, comment='选手人数')
+    avg_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='队伍平均Rating+')
+    avg_adr = db.Column(db.Float, nullable=False, default=0.0, comment='队伍平均ADR')
+    avg_kast = db.Column(db.Float, nullable=False, default=0.0, comment='队伍平均KAST')
+    total_kills = db.Column(db.Integer, nullable=False, default=0, comment='队伍总击杀')
+    
+    def to_dict(self):
+        return {
+            'team': self.team,
+            'player_count': self.player_count,
+            'avg_rating_plus': self.avg_rating_plus,
+            'avg_adr': self.avg_adr,
+            'avg_kast': self.avg_kast,
+            'total_kills': self.total_kills
+        }
+
+class PlayerStats(db.Model):
+    """选手累计统计模型（上传/删除比赛时增量维护）"""
+    __tablename__ = 'player_stats'
+    
+    # 累计字段 -> PlayerMatch 对应字段
+    ACCUMULATED_FIELDS = (
+        ('total_kills', 'kills'),
+        ('total_deaths', 'deaths'),
+        ('total_assists', 'assists'),
+        ('total_headshots', 'headshots'),
+        ('total_first_kills', 'first_kills'),
+        ('total_first_deaths', 'first_deaths'),
+        ('total_sniper_kills', 'sniper_kills'),
+        ('total_rating_plus', 'rating_plus'),
+        ('total_adr', 'adr'),
+        ('total_rws', 'rws'),
+        ('total_kast', 'kast'),
+    )
+    
+    # 维护单场均值和离差平方和（Welford算法）的字段，用于计算标准差
+    VARIANCE_FIELDS = ('rating_plus', 'adr', 'kast')
+    
+    # 没有参加过比赛的选手的Elo分
+    INITIAL_ELO_RATING = 1500.0
+    
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    total_matches = db.Column(db.Integer, nullable=False, default=0, comment='比赛场次')
+    
+    total_kills = db.Column(db.Integer, nullable=False, default=0, comment='总击杀')
+    total_deaths = db.Column(db.Integer, nullable=False, default=0, comment='总死亡')
+    total_assists = db.Column(db.Integer, nullable=False, default=0, comment='总助攻')
+    total_headshots = db.Column(db.Integer, nullable=False, default=0, comment='总爆头')
+    total_first_kills = db.Column(db.Integer, nullable=False, default=0, comment='总首杀')
+    total_first_deaths = db.Column(db.Integer, nullable=False, default=0, comment='总首死')
+    total_sniper_kills = db.Column(db.Integer, nullable=False, default=0, comment='总狙杀')
+    total_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='Rating+总和')
+    total_adr = db.Column(db.Float, nullable=False, default=0.0, comment='ADR总和')
+    total_rws = db.Column(db.Float, nullable=False, default=0.0, comment='RWS总和')
+    total_kast = db.Column(db.Float, nullable=False, default=0.0, comment='KAST总和')
+    
+    # 仅败场的累计数据
+    total_loss_matches = db.Column(db.Integer, nullable=False, default=0, comment='败场数')
+    total_loss_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='败场Rating+总和')
+    
+    # 胜场中个人Rating+与本队平均Rating+之差的累计
+    total_win_matches = db.Column(db.Integer, nullable=False, default=0, comment='胜场数')
+    total_win_rating_plus_diff = db.Column(db.Float, nullable=False, default=0.0,
+                                           comment='胜场Rating+与队伍平均差值总和')
+    
+    # 单场数据的均值与离差平方和
+    mean_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='单场Rating+均值')
+    m2_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='单场Rating+离差平方和')
+    mean_adr = db.Column(db.Float, nullable=False, default=0.0, comment='单场ADR均值')
+    m2_adr = db.Column(db.Float, nullable=False, default=0.0, comment='单场ADR离差平方和')
+    mean_kast = db.Column(db.Float, nullable=False, default=0.0, comment='单场KAST均值')
+    m2_kast = db.Column(db.Float, nullable=False, default=0.0, comment='单场KAST离差平方和')
+    
+    # 按比赛日期顺序计算的Elo分（由 rating.py 维护）
+    elo_rating = db.Column(db.Float, nullable=False, default=INITIAL_ELO_RATING, comment='当前Elo分')
+    elo_matches = db.Column(db.Integer, nullable=False, default=0, comment='计入Elo的场次')
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # 关联关系
+    player = db.relationship('Player', backref=db.backref('stats', uselist=False))
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # 新建记录时所有累计值从0开始，避免flush前出现None
+        if self.total_matches is None:
+            self.reset()
+    
+    def reset(self):
+        """清零所有累计值"""
+        self.total_matches = 0
+        for total_field, _ in self.ACCUMULATED_FIELDS:
+            setattr(self, total_field, 0)
+        self.total_loss_matches = 0
+        self.total_loss_rating_plus = 0.0
+        self.total_win_matches = 0
+        self.total_win_rating_plus_diff = 0.0
+        for field in self.VARIANCE_FIELDS:
+            setattr(self, f'mean_{field}', 0.0)
+            setattr(self, f'm2_{field}', 0.0)
+        self.elo_rating = self.INITIAL_ELO_RATING
+        self.elo_matches = 0
+    
+    def add_variance_sample(self, count, player_match):
+        """均值/离差平方和加入一场数据，count为加入后的场次"""
+        for field in self.VARIANCE_FIELDS:
+            value = getattr(player_match, field) or 0
+            mean = getattr(self, f'mean_{field}')
+            delta = value - mean
+            mean += delta / count
+            setattr(self, f'mean_{field}', mean)
+            setattr(self, f'm2_{field}', getattr(self, f'm2_{field}') + delta * (value - mean))
+    
+    def remove_variance_sample(self, count, player_match):
+        """均值/离差平方和移除一场数据（add_variance_sample的逆运算），count为移除前的场次"""
+        for field in self.VARIANCE_FIELDS:
+            if count <= 1:
+                setattr(self, f'mean_{field}', 0.0)
+                setattr(self, f'm2_{field}', 0.0)
+                continue
+            value = getattr(player_match, field) or 0
+            mean = getattr(self, f'mean_{field}')
+            new_mean = (count * mean - value) / (count - 1)
+            m2 = getattr(self, f'm2_{field}') - (value - new_mean) * (value - mean)
+            setattr(self, f'mean_{field}', new_mean)
+            # 浮点误差可能使结果略小于0
+            setattr(self, f'm2_{field}', max(m2, 0.0))
+    
+    def accumulate(self, player_match, team_stats=None):
+        """累加一条选手比赛记录，team_stats为该选手所在队伍本场的汇总数据"""
+        for total_field, match_field in self.ACCUMULATED_FIELDS:
+            value = getattr(player_match, match_field) or 0
+            setattr(self, total_field, getattr(self, total_field) + value)
+        self.total_matches += 1
+        self.add_variance_sample(self.total_matches, player_match)
+        
+        if player_match.result == 'L':
+            self.total_loss_matches += 1
+            self.total_loss_rating_plus += player_match.rating_plus or 0
+        elif player_match.result == 'W' and team_stats is not None:
+            self.total_win_matches += 1
+            self.total_win_rating_plus_diff += (player_match.rating_plus or 0) - team_stats.avg_rating_plus
+
+class PlayerPairStats(db.Model):
+    """两名选手同场比赛的累计数据（队友/对手，上传/删除比赛时增量维护）
+
+    每对选手双向各存一行（player_id 为视角选手），按 player_id 查询时走主键索引。
+    """
+    __tablename__ = 'player_pair_stats'
+    
+    TEAMMATE = 'T'
+    OPPONENT = 'O'
+    
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    relation = db.Column(db.String(1), primary_key=True, comment='关系 T队友/O对手')
+    other_player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    matches = db.Column(db.Integer, nullable=False, default=0, comment='同场次数')
+    wins = db.Column(db.Integer, nullable=False, default=0, comment='视角选手胜场数')
+    total_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='视角选手Rating+总和')
+    total_other_rating_plus = db.Column(db.Float, nullable=False, default=0.0, comment='另一名选手Rating+总和')
+    
+    @staticmethod
+    def match_pairs(members):
+        """一场比赛的选手记录（含player_id/team/result/rating_plus）生成的双向配对累计值
+        
+        返回 {(player_id, relation, other_player_id): [场次, 胜场, Rating+, 对方Rating+]}
+        """
+        pairs = {}
+        for member in members:
+            for other in members:
+                if other['player_id'] == member['player_id']:
+                    continue
+                relation = PlayerPairStats.TEAMMATE if other['team'] == member['team'] else PlayerPairStats.OPPONENT
+                pairs[(member['player_id'], relation, other['player_id'])] = [
+                    1,
+                    1 if member['result'] == 'W' else 0,
+                    member['rating_plus'] or 0,
+                    other['rating_plus'] or 0
+                ]
+        return pairs
+
+class RatingHistory(db.Model):
+    """选手每场比赛前后的Elo分（按比赛日期顺序，用于从某一日期开始重算）"""
+    __tablename__ = 'rating_history'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), nullable=False)
+    match_date = db.Column(db.DateTime, nullable=False, comment='比赛日期（与matches.date一致）')
+    rated_matches = db.Column(db.Integer, nullable=False, comment='计入本场后的Elo场次')
+    rating_before = db.Column(db.Float, nullable=False, comment='赛前Elo分')
+    rating_after = db.Column(db.Float, nullable=False, comment='赛后Elo分')
+    
+    __table_args__ = (
+        db.Index('ix_rating_history_match_date', 'match_date', 'match_id'),
+        db.Index('ix_rating_history_player', 'player_id', 'rated_matches'),
+    )
+    
+    def to_dict(self):
+        return {
+            'match_id': self.match_id,
+            'match_date': self.match_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'rating_before': round(self.rating_before, 1),
+            'rating_after': round(self.rating_after, 1),
+            'rating_change': round(self.rating_after - self.rating_before, 1)
+        }
+
+class DataVersion(db.Model):
+    """数据版本模型（每次写入比赛数据时递增，多进程共享用于缓存失效）"""
+    __tablename__ = 'data_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, comment='数据版本号')
+    deletions = db.Column(db.Integer, nullable=False, default=0, comment='删除比赛的次数')
+
+class IngestJob(db.Model):
+    """上传解析任务模型（后台任务队列）"""
+    __tablename__ = 'ingest_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True,
+                       comment='任务状态 queued/running/done/failed')
+    stage = db.Column(db.String(50), comment='当前阶段')
+    progress = db.Column(db.Integer, nullable=False, default=0, comment='进度 0-100')
+    filename = db.Column(db.String(200), nullable=False, comment='原始文件名')
+    file_path = db.Column(db.String(500), nullable=False, comment='Excel文件路径')
+    content_hash = db.Column(db.String(64), comment='Excel文件内容SHA-256')
+    error = db.Column(db.Text, comment='错误信息')
+    match_id = db.Column(db.Integer, comment='导入成功后的比赛ID')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已领取处理的次数')
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, comment='开始处理时间')
+    heartbeat_at = db.Column(db.DateTime, comment='处理进程最近一次心跳时间')
+    finished_at = db.Column(db.DateTime, comment='处理完成时间')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'filename': self.filename,
+            'error': self.error,
+            'match_id': self.match_id,
+            'attempts': self.attempts,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+class ParseCache(db.Model):
+    """Excel解析结果缓存（按文件内容哈希索引，相同文件无需重复解析）"""
+    __tablename__ = 'parse_cache'
+    
+    content_hash = db.Column(db.String(64), primary_key=True, comment='Excel文件内容SHA-256')
+    parser_version = db.Column(db.Integer, nullable=False, comment='生成结果的解析逻辑版本')
+    parsed_data = db.Column(db.Text, nullable=False, comment='解析结果JSON')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
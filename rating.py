@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""按比赛日期顺序计算的选手Elo分
+
+每场比赛以双方选手的平均Elo分作为队伍分，按比分判定胜负（平局记0.5），同队选手的分数变化相同。
+比赛按 (date, id) 排序：新比赛排在所有已计算的比赛之后时只计算新比赛；
+插入更早的比赛或删除比赛时，从该比赛的位置开始，以 rating_history 中此前的赛后分为起点重算之后的所有比赛。
+当前分数和场次保存在 player_stats.elo_rating / elo_matches。
+"""
+
+from sqlalchemy import and_, func, or_
+
+from models import db, Match, PlayerMatch, PlayerStats, RatingHistory
+
+# 单场最大分数变化
+ELO_K_FACTOR = 32
+# 分差达到该值时强队期望得分约为0.91
+ELO_SCALE = 400
+
+
+def expected_score(rating, opponent_rating):
+    """Elo期望得分"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / ELO_SCALE))
+
+
+def actual_score(score, opponent_score):
+    """实际得分：胜1，负0，平0.5"""
+    if score > opponent_score:
+        return 1.0
+    if score < opponent_score:
+        return 0.0
+    return 0.5
+
+
+def team_rating_change(team_rating, opponent_rating, score, opponent_score):
+    """一支队伍本场的Elo分变化（对手的变化为其相反数）"""
+    return ELO_K_FACTOR * (actual_score(score, opponent_score) - expected_score(team_rating, opponent_rating))
+
+
+def rate_match(match, roster, ratings, counts):
+    """计算一场比赛并更新 ratings / counts（{选手ID: Elo分 / 场次}），返回本场的 rating_history 记录
+
+    roster 为 [(选手ID, 队伍标识A/B)]，只有一方有选手的比赛不计算。
+    """
+    teams = {'A': [], 'B': []}
+    for player_id, team in roster:
+        teams[team].append(player_id)
+    if not teams['A'] or not teams['B']:
+        return []
+
+    averages = {
+        team: sum(ratings.get(player_id, PlayerStats.INITIAL_ELO_RATING) for player_id in player_ids) / len(player_ids)
+        for team, player_ids in teams.items()
+    }
+    change_a = team_rating_change(averages['A'], averages['B'], match.team_a_score or 0, match.team_b_score or 0)
+
+    history = []
+    for team, change in (('A', change_a), ('B', -change_a)):
+        for player_id in teams[team]:
+            before = ratings.get(player_id, PlayerStats.INITIAL_ELO_RATING)
+            ratings[player_id] = before + change
+            counts[player_id] = counts.get(player_id, 0) + 1
+            history.append({
+                'player_id': player_id,
+                'match_id': match.id,
+                'match_date': match.date,
+                'rated_matches': counts[player_id],
+                'rating_before': before,
+                'rating_after': ratings[player_id]
+            })
+    return history
+
+
+def at_or_after(date_column, match_id_column, match_date, match_id):
+    """(日期, 比赛ID) 不早于指定比赛的条件"""
+    return or_(date_column > match_date, and_(date_column == match_date, match_id_column >= match_id))
+
+
+def load_rosters(criteria):
+    """按条件查询比赛的选手名单，返回 {比赛ID: [(选手ID, 队伍标识)]}"""
+    rosters = {}
+    rows = db.session.query(PlayerMatch.match_id, PlayerMatch.player_id, PlayerMatch.team) \
+        .join(Match, Match.id == PlayerMatch.match_id) \
+        .filter(*criteria) \
+        .order_by(PlayerMatch.id)
+    for match_id, player_id, team in rows:
+        rosters.setdefault(match_id, []).append((player_id, team))
+    return rosters
+
+
+def store_player_ratings(player_ids, ratings, counts):
+    """将计算结果写入选手累计统计记录（没有统计记录的选手跳过）"""
+    player_ids = list(player_ids)
+    for start in range(0, len(player_ids), 500):
+        batch = player_ids[start:start + 500]
+        for stats in PlayerStats.query.filter(PlayerStats.player_id.in_(batch)).all():
+            stats.elo_rating = ratings.get(stats.player_id, PlayerStats.INITIAL_ELO_RATING)
+            stats.elo_matches = counts.get(stats.player_id, 0)
+
+
+def rate_new_matches(matches):
+    """为刚写入（已flush）的比赛计算Elo（不提交事务）
+
+    已有排在这些比赛之后的计算结果时改为从最早的新比赛开始重算。
+    """
+    if not matches:
+        return
+    first = min(matches, key=lambda match: (match.date, match.id))
+    later = db.session.query(RatingHistory.id) \
+        .filter(at_or_after(RatingHistory.match_date, RatingHistory.match_id, first.date, first.id)) \
+        .first()
+    if later is not None:
+        replay_ratings_from(first.date, first.id)
+        return
+
+    rosters = load_rosters([Match.id.in_([match.id for match in matches])])
+    player_ids = list({player_id for roster in rosters.values() for player_id, _ in roster})
+    ratings, counts = {}, {}
+    for start in range(0, len(player_ids), 500):
+        batch = player_ids[start:start + 500]
+        for player_id, rating, rated_matches in db.session.query(
+                PlayerStats.player_id, PlayerStats.elo_rating, PlayerStats.elo_matches) \
+                .filter(PlayerStats.player_id.in_(batch)):
+            ratings[player_id] = rating
+            counts[player_id] = rated_matches
+
+    history = []
+    for match in sorted(matches, key=lambda match: (match.date, match.id)):
+        history.extend(rate_match(match, rosters.get(match.id, []), ratings, counts))
+    if history:
+        db.session.execute(RatingHistory.__table__.insert(), history)
+    store_player_ratings(player_ids, ratings, counts)
+
+
+def replay_ratings_from(match_date=None, match_id=None):
+    """删除指定比赛位置（含）之后的计算结果并按顺序重算，不指定时全部重算（不提交事务）"""
+    if match_date is None:
+        history_criteria = []
+        match_criteria = []
+    else:
+        history_criteria = [at_or_after(RatingHistory.match_date, RatingHistory.match_id, match_date, match_id)]
+        match_criteria = [at_or_after(Match.date, Match.id, match_date, match_id)]
+
+    # 受影响的选手：被删除的结果涉及的选手，以及需要重算的比赛中的选手
+    player_ids = {
+        player_id
+        for (player_id,) in db.session.query(RatingHistory.player_id).filter(*history_criteria).distinct()
+    }
+    db.session.query(RatingHistory).filter(*history_criteria).delete(synchronize_session=False)
+
+    rosters = load_rosters(match_criteria)
+    player_ids.update(player_id for roster in rosters.values() for player_id, _ in roster)
+
+    # 起点：每名受影响选手剩余（即此前）的最后一条赛后分
+    ratings, counts = {}, {}
+    if match_date is not None:
+        player_id_list = list(player_ids)
+        for start in range(0, len(player_id_list), 500):
+            batch = player_id_list[start:start + 500]
+            latest = db.session.query(RatingHistory.player_id,
+                                      func.max(RatingHistory.rated_matches).label('rated_matches')) \
+                .filter(RatingHistory.player_id.in_(batch)) \
+                .group_by(RatingHistory.player_id) \
+                .subquery()
+            rows = db.session.query(RatingHistory.player_id, RatingHistory.rated_matches, RatingHistory.rating_after) \
+                .join(latest, and_(RatingHistory.player_id == latest.c.player_id,
+                                   RatingHistory.rated_matches == latest.c.rated_matches))
+            for player_id, rated_matches, rating in rows:
+                ratings[player_id] = rating
+                counts[player_id] = rated_matches
+
+    history = []
+    matches = db.session.query(Match.id, Match.date, Match.team_a_score, Match.team_b_score) \
+        .filter(*match_criteria) \
+        .order_by(Match.date, Match.id)
+    for match in matches:
+        history.extend(rate_match(match, rosters.get(match.id, []), ratings, counts))
+    if history:
+        db.session.execute(RatingHistory.__table__.insert(), history)
+    store_player_ratings(player_ids, ratings, counts)
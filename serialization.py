@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""API响应的序列化与压缩
+
+- JSON：安装了 orjson 时用它编码（比标准库快数倍），否则回退到标准库 json，两者输出的数据相同；
+- 压缩：按 Accept-Encoding 协商 br（需安装 brotli）或 gzip，小于 MIN_COMPRESS_SIZE 的响应不压缩；
+- MessagePack：/api/players、/api/leaderboards 可通过 ?format=msgpack 或 Accept: application/msgpack 获取（需安装 msgpack）。
+
+日期在SQL中格式化为字符串（见 sql_date_text），响应数据中不出现 datetime 对象。
+"""
+
+import gzip
+import json
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import func
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# 比赛日期的显示格式（SQLite strftime格式）
+MATCH_DATE_FORMAT = '%Y-%m-%d %H:%M'
+
+# 小于该字节数的响应不压缩（压缩收益小于额外的CPU开销）
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 会被压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/msgpack', 'text/html'}
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+
+def sql_date_text(column, date_format=MATCH_DATE_FORMAT):
+    """在SQL中把日期列格式化为字符串，避免逐行调用 strftime"""
+    return func.strftime(date_format, column)
+
+
+def encode_json(data):
+    """编码为UTF-8 JSON字节串（键排序，与 jsonify 一致）"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def encode_msgpack(data):
+    """编码为MessagePack字节串"""
+    return msgpack.packb(data, use_bin_type=True)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON提供器：jsonify 使用 encode_json 生成响应体"""
+
+    ensure_ascii = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return encode_json(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(encode_json(obj), mimetype=self.mimetype)
+
+
+def available_encodings():
+    """服务端支持的压缩方式，按优先顺序排列"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encodings):
+    """根据请求的 Accept-Encoding 选择压缩方式，不压缩返回None"""
+    for encoding in available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    """按指定方式压缩，小响应或不压缩时原样返回"""
+    if encoding is None or len(data) < MIN_COMPRESS_SIZE:
+        return data
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def set_encoded_body(response, data, encoding):
+    """设置响应体，实际压缩了才加 Content-Encoding"""
+    body = compress(data, encoding)
+    response.set_data(body)
+    if body is not data:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+
+def compress_response(response, accept_encodings):
+    """压缩普通（非流式、未压缩）响应"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    set_encoded_body(response, response.get_data(), negotiate_encoding(accept_encodings))
+    return response
+
+
+def wants_msgpack(request):
+    """请求是否要求MessagePack格式"""
+    if request.args.get('format') == 'msgpack':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE, 'application/x-msgpack'])
+    return best in (MSGPACK_MIMETYPE, 'application/x-msgpack')
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""SQLite连接参数
+
+每个新连接建立时设置一次PRAGMA：
+- WAL日志模式下读操作不会被写事务阻塞，上传入库时榜单、比赛列表等查询照常进行；
+- synchronous=NORMAL 在WAL模式下只在检查点时fsync，断电最多丢失最近提交的事务，不会损坏数据库；
+- busy_timeout 让并发写入排队等待写锁，而不是立即报 database is locked。
+"""
+
+from sqlalchemy import event
+
+# PRAGMA名 -> 值，按顺序执行
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30000,  # 毫秒
+    'cache_size': -65536,  # 负数表示KiB，即每个连接64MB页缓存
+    'temp_store': 'MEMORY',
+}
+
+# 传给 create_engine 的连接池参数（Flask-SQLAlchemy 的 SQLALCHEMY_ENGINE_OPTIONS）
+SQLITE_ENGINE_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'connect_args': {
+        'timeout': 30,  # 秒，Python sqlite3 驱动层面的锁等待
+        'check_same_thread': False,  # 连接由连接池在线程间复用
+    },
+}
+
+# 只适用于连接池（QueuePool）的参数，内存数据库使用 StaticPool，不接受这些参数
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def is_memory_database(uri):
+    """是否为SQLite内存数据库（sqlite:// 或 :memory:）"""
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def engine_options_for(uri, options=None):
+    """按数据库URI调整引擎参数：内存数据库去掉连接池参数"""
+    options = SQLITE_ENGINE_OPTIONS if options is None else options
+    if not is_memory_database(uri):
+        return options
+    return {name: value for name, value in options.items() if name not in QUEUE_POOL_OPTIONS}
+
+
+def configure_sqlite(engine, pragmas=None):
+    """为引擎注册连接事件，新建的每个连接都会设置PRAGMA"""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
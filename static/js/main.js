@@ -2,6 +2,7 @@
 
 // 全局变量
 let matches = [];
+let nextMatchCursor = null;
 let selectedMatch = null;
 let currentTab = 'match-history';
 let currentSubTab = 'player-data';
@@ -19,11 +20,17 @@ function initializePage() {
     showTab('match-history');
 }
 
-// 加载比赛数据
-async function loadMatches() {
+// 加载比赛数据（loadMore为true时追加下一页）
+async function loadMatches(loadMore = false) {
     try {
-        const response = await fetch('/api/matches');
-        matches = await response.json();
+        let url = '/api/matches';
+        if (loadMore && nextMatchCursor) {
+            url += `?cursor=${encodeURIComponent(nextMatchCursor)}`;
+        }
+        const response = await fetch(url);
+        const page = await response.json();
+        matches = loadMore ? matches.concat(page) : page;
+        nextMatchCursor = response.headers.get('X-Next-Cursor');
         renderMatchList();
     } catch (error) {
         console.error('加载比赛数据失败:', error);
@@ -129,6 +136,15 @@ function renderMatchList() {
         card.addEventListener('click', () => selectMatch(index));
         container.appendChild(card);
     });
+
+    // 还有更多比赛时显示加载按钮
+    if (nextMatchCursor) {
+        const loadMoreBtn = document.createElement('button');
+        loadMoreBtn.className = 'load-more-btn';
+        loadMoreBtn.textContent = '加载更多';
+        loadMoreBtn.addEventListener('click', () => loadMatches(true));
+        container.appendChild(loadMoreBtn);
+    }
 }
 
 // 选择比赛
@@ -309,16 +325,22 @@ async function handleFileUpload(event) {
     formData.append('file', file);
 
     try {
-        const response = await fetch('/api/upload', {
+        // 文件先进入后台处理队列，再轮询任务状态
+        const response = await fetch('/api/jobs', {
             method: 'POST',
             body: formData
         });
         
         const result = await response.json();
         
-        if (response.ok) {
-            showNotification('比赛记录上传成功！', 'success');
+        if (response.ok && result.duplicate) {
+            showNotification(result.message, 'success');
             loadMatches();
+        } else if (response.ok) {
+            showNotification('文件已上传，正在解析...', 'success');
+            waitForIngestJob(result.job_id);
+        } else if (response.status === 429) {
+            showNotification(result.error || '上传任务过多，请稍后重试', 'error');
         } else {
             showNotification(result.error || '文件上传失败', 'error');
         }
@@ -331,12 +353,32 @@ async function handleFileUpload(event) {
     event.target.value = '';
 }
 
+// 轮询上传任务直到完成或失败
+async function waitForIngestJob(jobId) {
+    try {
+        const response = await fetch(`/api/jobs/${jobId}`, { cache: 'no-cache' });
+        const job = await response.json();
+
+        if (job.status === 'done') {
+            showNotification('比赛记录上传成功！', 'success');
+            loadMatches();
+        } else if (job.status === 'failed') {
+            showNotification(job.error || '文件解析失败', 'error');
+        } else {
+            setTimeout(() => waitForIngestJob(jobId), 1000);
+        }
+    } catch (error) {
+        console.error('查询上传任务失败:', error);
+        showNotification('查询上传任务失败', 'error');
+    }
+}
+
 // 渲染选手数据
 async function renderPlayerData() {
     const container = document.getElementById('playerStatsTable');
     
     try {
-        const response = await fetch('/api/players');
+        const response = await fetch('/api/players', { cache: 'no-cache' });
         const playersData = await response.json();
         
         if (playersData.length === 0) {
@@ -361,6 +403,7 @@ async function renderPlayerData() {
                         <th>平均ADR</th>
                         <th>平均RWS</th>
                         <th>平均KAST</th>
+                        <th>Elo</th>
                     </tr>
                 </thead>
                 <tbody>
@@ -382,6 +425,7 @@ async function renderPlayerData() {
                     <td>${player.avgADR || 0}</td>
                     <td>${player.avgRWS || 0}</td>
                     <td>${player.avgKAST || 0}%</td>
+                    <td>${player.eloRating || 0}</td>
                 </tr>
             `;
         });
@@ -400,7 +444,7 @@ async function renderLeaderboards() {
     const container = document.getElementById('leaderboardsContent');
     
     try {
-        const response = await fetch('/api/leaderboards');
+        const response = await fetch('/api/leaderboards', { cache: 'no-cache' });
         const leaderboards = await response.json();
         
         container.innerHTML = `
@@ -463,9 +507,9 @@ async function renderLeaderboards() {
             <div class="leaderboard">
                 <div class="leaderboard-title">
                     <span>稳定如狗榜</span>
-                    <span class="metric-desc">按Rating+标准差升序排列</span>
+                    <span class="metric-desc">按单场Rating+标准差升序排列（至少5场）</span>
                 </div>
-                ${renderGenericLeaderboard(leaderboards.steady_player, 'avgRatingPlus', '', '', '')}
+                ${renderGenericLeaderboard(leaderboards.steady_player, 'stdRatingPlus', 'avgRatingPlus', '', ' 均值')}
             </div>
             
             <div class="leaderboard">
@@ -481,7 +525,7 @@ async function renderLeaderboards() {
                     <span>躺赢绝缘体榜</span>
                     <span class="metric-desc">按胜场中个人Rating+与队伍平均Rating+差值降序排列</span>
                 </div>
-                ${renderGenericLeaderboard(leaderboards.no_free_wins, 'avgRatingPlus', '', '', '')}
+                ${renderGenericLeaderboard(leaderboards.no_free_wins, 'avgWinRatingPlusDiff', 'totalWinMatches', '', ' 胜场')}
             </div>
             
             <div class="leaderboard">
@@ -499,6 +543,14 @@ async function renderLeaderboards() {
                 </div>
                 ${renderGenericLeaderboard(leaderboards.rws_dominance, 'avgRWS', '', '', '')}
             </div>
+            
+            <div class="leaderboard">
+                <div class="leaderboard-title">
+                    <span>天梯榜</span>
+                    <span class="metric-desc">按比赛胜负计算的Elo分降序排列（至少3场）</span>
+                </div>
+                ${renderGenericLeaderboard(leaderboards.elo_ladder, 'eloRating', 'eloMatches', '', ' 场')}
+            </div>
         `;
         
     } catch (error) {
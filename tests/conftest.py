@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""测试夹具：每个测试使用独立的临时SQLite数据库和上传目录，Excel文件由 benchmarks/datagen.py 生成"""
+
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+from app import create_app, init_database
+from datagen import generate_workbooks
+from models import db
+
+
+def make_app(tmp_path, name='test.db', **config):
+    """创建使用临时数据库的应用并建表"""
+    application = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / name}',
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'BULK_PARSE_WORKERS': 1,
+        'INGEST_WORKERS': 0,
+        **config,
+    })
+    init_database(application)
+    return application
+
+
+@pytest.fixture
+def app(tmp_path):
+    application = make_app(tmp_path)
+    yield application
+    with application.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def workbooks(tmp_path):
+    """生成Excel文件：workbooks(数量, start=起始编号)，编号不同的文件内容不同"""
+    def generate(count, start=1):
+        return generate_workbooks(str(tmp_path / 'workbooks'), count, seed_value=start, player_count=20, start=start)
+    return generate
+
+
+def upload(client, path):
+    """上传一个Excel文件，返回响应"""
+    with open(path, 'rb') as file:
+        return client.post('/api/upload', data={'file': (file, os.path.basename(path))})
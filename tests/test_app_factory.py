@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+from app import create_app, init_database
+from conftest import make_app, upload
+
+
+def test_in_memory_database(tmp_path):
+    """内存数据库使用 StaticPool，不能传入连接池参数"""
+    application = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+                              'INGEST_WORKERS': 0})
+    init_database(application)
+    client = application.test_client()
+
+    assert 'pool_size' not in application.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert client.get('/api/players').get_json() == []
+    assert client.get('/api/leaderboards').status_code == 200
+
+
+def test_caches_are_per_app(tmp_path, workbooks):
+    """两个应用使用不同的数据库，数据版本号相同时也不能返回对方的缓存数据"""
+    first = make_app(tmp_path, 'first.db')
+    second = make_app(tmp_path, 'second.db')
+    first_path, second_path = workbooks(2)
+    assert upload(first.test_client(), first_path).status_code == 200
+    assert upload(second.test_client(), second_path).status_code == 200
+
+    for url in ('/api/players', '/api/leaderboards'):
+        first_data = first.test_client().get(url).get_json()
+        second_data = second.test_client().get(url).get_json()
+        assert first_data != second_data
+        # 再次请求（命中缓存）仍是各自的数据
+        assert first.test_client().get(url).get_json() == first_data
+        assert second.test_client().get(url).get_json() == second_data
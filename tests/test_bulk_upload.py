@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import zipfile
+
+import pytest
+
+from conftest import make_app
+from metrics import INGEST_STAGE_DURATION
+
+
+def make_zip(entries):
+    """生成ZIP压缩包：entries 为 [(文件名, 内容)]"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def upload_zip(application, buffer):
+    return application.test_client().post('/api/upload/bulk', data={'files': (buffer, 'matches.zip')})
+
+
+def uploaded_files(application):
+    folder = application.config['UPLOAD_FOLDER']
+    return os.listdir(folder) if os.path.isdir(folder) else []
+
+
+def test_bulk_upload_zip(tmp_path, workbooks):
+    application = make_app(tmp_path)
+    paths = workbooks(3)
+    entries = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            entries.append((f'matches/{os.path.basename(path)}', file.read()))
+    response = upload_zip(application, make_zip(entries + [('readme.txt', b'x')]))
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert sum(result['success'] for result in results) == 3
+    assert len(uploaded_files(application)) == 3
+
+
+@pytest.mark.parametrize('config, error', [
+    ({'BULK_MAX_FILES': 3}, '单次最多上传3个文件'),
+    ({'BULK_MAX_EXTRACT_SIZE': 1024 * 1024}, 'ZIP解压后总大小超过1MB'),
+])
+def test_bulk_upload_limits_checked_before_extracting(tmp_path, config, error):
+    """超过文件数或解压后总大小上限时拒绝整个请求，不解压任何文件"""
+    application = make_app(tmp_path, **config)
+    # 每个条目解压后 400KB，压缩后很小
+    buffer = make_zip([(f'match_{index}.xlsx', b'\0' * 400 * 1024) for index in range(4)])
+    response = upload_zip(application, buffer)
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    assert uploaded_files(application) == []
+
+
+def stage_count(stage):
+    histogram = INGEST_STAGE_DURATION.values.get((stage,))
+    return histogram.count if histogram else 0
+
+
+def test_bulk_upload_parallel_parse_records_stage_metrics(tmp_path, workbooks):
+    """多进程解析时子进程的各阶段耗时传回主进程记录"""
+    application = make_app(tmp_path, BULK_PARSE_WORKERS=2)
+    paths = workbooks(3)
+    before = stage_count('read')
+    files = [(open(path, 'rb'), os.path.basename(path)) for path in paths]
+    try:
+        response = application.test_client().post('/api/upload/bulk', data={'files': files})
+    finally:
+        for file, _ in files:
+            file.close()
+
+    assert response.status_code == 200
+    assert response.get_json()['imported'] == 3
+    assert stage_count('read') == before + 3
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import sys
+
+import pyarrow.parquet as pq
+
+import export
+from conftest import upload
+from jobs import enqueue_job
+from models import db, IngestJob
+
+
+def test_parquet_export_matches_csv(client, workbooks):
+    """Parquet导出与CSV导出的记录一致"""
+    for path in workbooks(3):
+        assert upload(client, path).status_code == 200
+
+    for table in ('matches', 'player_matches'):
+        response = client.get(f'/api/export/{table}?format=parquet')
+        assert response.status_code == 200
+        assert response.content_type == 'application/vnd.apache.parquet'
+        exported = pq.read_table(io.BytesIO(response.data))
+
+        # CSV带BOM（便于Excel打开）
+        text = client.get(f'/api/export/{table}?format=csv').data.decode('utf-8-sig')
+        rows = list(csv.DictReader(io.StringIO(text)))
+        assert exported.num_rows == len(rows) > 0
+        assert exported.column_names == list(rows[0])
+        assert exported.column('id').to_pylist() == [int(row['id']) for row in rows]
+
+
+def test_export_cli_leaves_queued_jobs(app, client, workbooks, tmp_path, monkeypatch):
+    """命令行导出不处理排队中的上传任务"""
+    paths = workbooks(2)
+    assert upload(client, paths[0]).status_code == 200
+    with app.app_context():
+        job_id = enqueue_job('queued.xlsx', paths[1]).id
+
+    output = tmp_path / 'matches.csv'
+    monkeypatch.setenv('CS2_SQLALCHEMY_DATABASE_URI', app.config['SQLALCHEMY_DATABASE_URI'])
+    monkeypatch.setenv('CS2_UPLOAD_FOLDER', app.config['UPLOAD_FOLDER'])
+    monkeypatch.setattr(sys, 'argv', ['export.py', 'matches', '--output', str(output)])
+    export.main()
+
+    assert len(output.read_text(encoding='utf-8-sig').splitlines()) == 2
+    with app.app_context():
+        job = db.session.get(IngestJob, job_id)
+        assert job.status == 'queued' and job.attempts == 0
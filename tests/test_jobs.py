@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import time
+from datetime import datetime, timedelta
+
+from app import start_background_workers
+from conftest import make_app
+from jobs import claim_next_job, enqueue_job, requeue_stale_jobs, touch_jobs
+from models import db, IngestJob
+
+
+def test_workers_start_with_app(tmp_path, workbooks):
+    """启动后台线程后即处理重启前排队的任务，不需要先请求 /api/jobs"""
+    application = make_app(tmp_path)
+    path = workbooks(1)[0]
+    file_path = str(tmp_path / 'uploads' / 'queued.xlsx')
+    shutil.copy(path, file_path)
+    with application.app_context():
+        job_id = enqueue_job('queued.xlsx', file_path).id
+
+    restarted = make_app(tmp_path, INGEST_WORKERS=1)
+    # 创建应用（命令行脚本也会创建）不启动后台线程，由服务入口显式启动
+    assert restarted.extensions['ingest_workers'].threads == []
+    start_background_workers(restarted)
+    deadline = time.monotonic() + 30
+    with restarted.app_context():
+        while True:
+            job = db.session.get(IngestJob, job_id)
+            if job.status in ('done', 'failed') or time.monotonic() > deadline:
+                break
+            db.session.expire_all()
+            time.sleep(0.1)
+        assert job.status == 'done'
+        assert job.match_id is not None
+
+
+def test_requeue_uses_heartbeat(app):
+    """开始时间很早但心跳正常的任务不重新排队，心跳超时的任务重新排队"""
+    now = datetime.utcnow()
+    long_ago = now - timedelta(hours=1)
+    with app.app_context():
+        alive = IngestJob(status='running', filename='alive.xlsx', file_path='alive.xlsx',
+                          started_at=long_ago, heartbeat_at=long_ago)
+        stale = IngestJob(status='running', filename='stale.xlsx', file_path='stale.xlsx',
+                          started_at=long_ago, heartbeat_at=long_ago)
+        legacy = IngestJob(status='running', filename='legacy.xlsx', file_path='legacy.xlsx', started_at=long_ago)
+        db.session.add_all([alive, stale, legacy])
+        db.session.commit()
+
+        touch_jobs([alive.id])
+        assert requeue_stale_jobs(120, 3) == 2
+        db.session.expire_all()
+        assert alive.status == 'running'
+        assert stale.status == 'queued' and stale.heartbeat_at is None
+        assert legacy.status == 'queued'
+
+
+def test_job_failed_after_max_attempts(app, tmp_path):
+    """每次处理都中断（心跳超时）的任务在达到次数上限后标记为失败，不再重新排队"""
+    file_path = tmp_path / 'uploads' / 'crash.xlsx'
+    file_path.write_bytes(b'x')
+    with app.app_context():
+        job_id = enqueue_job('crash.xlsx', str(file_path)).id
+        for attempt in range(1, 4):
+            assert claim_next_job() == job_id
+            job = db.session.get(IngestJob, job_id)
+            assert job.attempts == attempt
+            # 模拟处理进程崩溃：心跳不再更新
+            job.heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+            db.session.commit()
+            requeue_stale_jobs(120, 3)
+            db.session.expire_all()
+
+        job = db.session.get(IngestJob, job_id)
+        assert job.status == 'failed'
+        assert claim_next_job() is None
+    assert not file_path.exists()
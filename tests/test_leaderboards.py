@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from sqlalchemy import event
+
+from app import calculate_loss_data, calculate_players_data, query_player_stats, rank_leaderboards
+from conftest import upload
+from models import db
+
+
+def scalar_leaderboards(app):
+    """不使用列式快照，由累计统计表逐个选手计算的榜单"""
+    with app.app_context():
+        rows = query_player_stats()
+        leaderboards = rank_leaderboards(calculate_players_data(rows), {'loss_data': calculate_loss_data(rows)})
+    return json.loads(json.dumps(leaderboards))
+
+
+def test_leaderboards_after_delete_then_upload(app, client, workbooks):
+    """删除最新的比赛后再上传：新记录复用被删除记录的ID，快照必须整体重建"""
+    paths = workbooks(11)
+    match_ids = [upload(client, path).get_json()['match_id'] for path in paths[:10]]
+    assert client.get('/api/leaderboards').get_json() == scalar_leaderboards(app)
+
+    assert client.delete(f'/api/matches/{match_ids[-1]}').status_code == 200
+    assert upload(client, paths[10]).status_code == 200
+    assert client.get('/api/leaderboards').get_json() == scalar_leaderboards(app)
+
+
+def test_snapshot_query_is_instrumented(app, client, workbooks):
+    """生成列式快照的查询经过引擎执行，计入SQL语句指标"""
+    for path in workbooks(2):
+        assert upload(client, path).status_code == 200
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'after_cursor_execute', listener)
+    try:
+        assert client.get('/api/leaderboards').status_code == 200
+    finally:
+        event.remove(engine, 'after_cursor_execute', listener)
+    assert any('FROM player_matches pm' in statement for statement in statements)
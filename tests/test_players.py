@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from sqlalchemy import event, func
+
+from app import rebuild_player_stats
+from conftest import make_app, upload
+from datagen import generate_workbooks, seed_database
+from models import db, Match, PlayerMatch, PlayerStats, sample_stddev
+
+
+def count_statements(application, url):
+    """请求一次 url，返回执行的SQL语句数"""
+    statements = []
+    with application.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = application.test_client().get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_players_statement_count_does_not_grow(tmp_path):
+    """选手统计的SQL语句数与比赛数无关"""
+    counts = {}
+    for match_count in (50, 100):
+        name = f'players_{match_count}.db'
+        seed_database(str(tmp_path / name), match_count)
+        application = make_app(tmp_path, name)
+        counts[match_count] = [count_statements(application, url)
+                               for url in ('/api/players', '/api/players?map=Mirage&min_matches=2')]
+    assert counts[50] == counts[100]
+
+
+def variance_stats():
+    """{选手ID: {字段: 值}}：场次、各字段的均值、离差平方和、样本标准差"""
+    result = {}
+    for stats in PlayerStats.query:
+        values = {'total_matches': stats.total_matches}
+        for field in PlayerStats.VARIANCE_FIELDS:
+            m2 = getattr(stats, f'm2_{field}')
+            values[f'mean_{field}'] = getattr(stats, f'mean_{field}')
+            values[f'm2_{field}'] = m2
+            values[f'std_{field}'] = sample_stddev(m2, stats.total_matches)
+        result[stats.player_id] = values
+    return result
+
+
+def assert_matches_rebuild(application):
+    """删除比赛后按Welford逆运算更新的均值/离差平方和与整体重建的结果一致"""
+    with application.app_context():
+        incremental = variance_stats()
+        rebuild_player_stats()
+        db.session.flush()
+        rebuilt = variance_stats()
+        db.session.rollback()
+    assert incremental.keys() == rebuilt.keys()
+    for player_id, values in rebuilt.items():
+        assert incremental[player_id] == pytest.approx(values, rel=1e-9, abs=1e-9), player_id
+
+
+def test_delete_match_variance_matches_rebuild(app, client, tmp_path):
+    """依次删除第一场、中间一场、最后一场比赛，以及使某个选手只剩一场的比赛"""
+    # 选手池较大，部分选手只参加两三场
+    paths = generate_workbooks(str(tmp_path / 'workbooks'), 8, seed_value=7, player_count=40)
+    match_ids = [upload(client, path).get_json()['match_id'] for path in paths]
+
+    for match_id in (match_ids[0], match_ids[4], match_ids[-1]):
+        assert client.delete(f'/api/matches/{match_id}').status_code == 200
+        assert_matches_rebuild(app)
+
+    with app.app_context():
+        player_id, match_id = db.session.query(PlayerMatch.player_id, func.min(PlayerMatch.match_id)) \
+            .group_by(PlayerMatch.player_id).having(func.count() == 2).first()
+    assert client.delete(f'/api/matches/{match_id}').status_code == 200
+    assert_matches_rebuild(app)
+    with app.app_context():
+        stats = db.session.get(PlayerStats, player_id)
+        assert stats.total_matches == 1
+        assert stats.m2_rating_plus == pytest.approx(0, abs=1e-9) and sample_stddev(stats.m2_rating_plus, 1) == 0
+        assert stats.mean_rating_plus == pytest.approx(
+            db.session.query(PlayerMatch.rating_plus).filter_by(player_id=player_id).scalar() or 0)
+        assert Match.query.count() == 4
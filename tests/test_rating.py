@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from conftest import upload
+from models import db, Match, PlayerStats, RatingHistory
+from rating import replay_ratings_from
+
+
+def rating_state():
+    """(Elo历史记录列表, {选手ID: (Elo分, 场次)})"""
+    history = [
+        (row.player_id, row.match_id, row.match_date, row.rated_matches, row.rating_before, row.rating_after)
+        for row in RatingHistory.query.order_by(RatingHistory.player_id, RatingHistory.rated_matches)
+    ]
+    ratings = {stats.player_id: (stats.elo_rating, stats.elo_matches) for stats in PlayerStats.query}
+    return history, ratings
+
+
+def test_delete_middle_match_replays_ratings(app, client, workbooks):
+    """删除中间的比赛后部分重算的Elo结果与从头重算一致"""
+    for path in workbooks(8):
+        assert upload(client, path).status_code == 200
+    with app.app_context():
+        ordered = [match_id for (match_id,) in db.session.query(Match.id).order_by(Match.date, Match.id)]
+    deleted_id = ordered[len(ordered) // 2]
+
+    assert client.delete(f'/api/matches/{deleted_id}').status_code == 200
+
+    with app.app_context():
+        history, ratings = rating_state()
+        replay_ratings_from()
+        db.session.flush()
+        expected_history, expected_ratings = rating_state()
+        db.session.rollback()
+
+    assert all(match_id != deleted_id for _, match_id, *_ in history)
+    assert len(history) == len(expected_history)
+    for row, expected in zip(history, expected_history):
+        assert row[:4] == expected[:4]
+        assert row[4:] == pytest.approx(expected[4:])
+    assert ratings.keys() == expected_ratings.keys()
+    for player_id, (rating, rated_matches) in expected_ratings.items():
+        assert ratings[player_id] == (pytest.approx(rating), rated_matches)
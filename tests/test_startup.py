@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+"""导入 app 模块的耗时与副作用（在全新子进程中导入）"""
+
+import os
+
+from bench_startup import LAZY_MODULES, MAX_IMPORT_MS, copy_app_sources, measure_import, summarize_imports
+
+
+def test_import_app(tmp_path):
+    copy_app_sources(str(tmp_path))
+    before = set(os.listdir(tmp_path))
+    samples = [measure_import(str(tmp_path)) for _ in range(3)]
+    created = set(os.listdir(tmp_path)) - before - {'__pycache__'}
+    _, app_ms, loaded = summarize_imports(samples)
+
+    # 不导入 pandas/openpyxl，不创建数据库和目录
+    assert not loaded, f'导入时加载了 {loaded}（应只在解析Excel时导入 {LAZY_MODULES}）'
+    assert not created
+    assert app_ms <= MAX_IMPORT_MS, f'导入耗时 {app_ms:.1f}ms 超过 {MAX_IMPORT_MS}ms'
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""生产环境WSGI入口
+
+gunicorn -c gunicorn.conf.py wsgi:application
+
+不建表、不执行迁移，部署或升级后先运行 python init_db.py。
+"""
+
+from app import create_app, start_background_workers
+
+application = create_app()
+start_background_workers(application)